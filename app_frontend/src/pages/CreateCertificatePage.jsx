@@ -546,6 +546,24 @@ export const CreateCertificatePage = () => {
         if (fieldsError) throw fieldsError;
       }
 
+      if (templateId) {
+        // Normalize the template image and field layout now instead of on the first mint
+        let ingestResponse = null;
+        try {
+          ingestResponse = await fetch(`${BACKEND_URL}/api/templates/${templateId}/ingest`, { method: "POST" });
+        } catch (ingestErr) {
+          console.warn("Template ingestion failed; it will run on first render", ingestErr);
+        }
+        if (ingestResponse?.status === 400) {
+          // The template image is unusable (bad file or a dead URL); every render would fail the same way
+          const { detail } = await ingestResponse.json().catch(() => ({}));
+          throw new Error(detail || "Template image could not be processed");
+        }
+        if (ingestResponse && !ingestResponse.ok) {
+          console.warn("Template ingestion failed; it will run on first render", ingestResponse.status);
+        }
+      }
+
       if (templateId) {
         const { error: updateErr } = await supabase
           .from("groups")
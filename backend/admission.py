@@ -0,0 +1,273 @@
+"""
+Admission control for the public verify and claim endpoints
+
+Both endpoints are unauthenticated and cost a database round trip plus
+signature work per call, so AdmissionMiddleware screens them before routing:
+
+- per-client-IP token buckets for verify and claim, and a per-join-code bucket
+  for claim (one leaked code cannot mint unbounded certificates);
+- adaptive load shedding: pressure is the larger of event-loop lag / target lag
+  and in-flight requests / capacity. From pressure 1 uncached work is shed with
+  a probability that reaches 100% at SHED_FULL_PRESSURE; verifications that can
+  be answered from the response cache are only shed past CRITICAL_PRESSURE,
+  since they cost almost nothing to serve.
+
+Rejections are 429 with a Retry-After header. Requests to other paths are only
+counted towards the in-flight total.
+"""
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from metrics import record_admission_rejection
+
+VERIFY_PREFIX = "/api/certificates/verify/"
+CLAIM_PATH = "/api/certificates/claim"
+
+SHED_FULL_PRESSURE = 1.5
+CRITICAL_PRESSURE = 3.0
+MAX_CLAIM_BODY = 64 * 1024
+
+
+class TokenBucketLimiter:
+    """One token bucket per key, refilled at `rate` per second up to `burst`; least recently used keys are dropped"""
+
+    def __init__(self, rate: float, burst: float, maxsize: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """(allowed, seconds until `cost` tokens are available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a sleep(interval); smoothed with an EWMA"""
+
+    def __init__(self, interval: float = 0.05, smoothing: float = 0.3):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lag += self.smoothing * (lag - self.lag)
+            self.max_lag = max(self.max_lag, lag)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        is_cached_verification: Callable[[str], bool],
+        verify_rate: float = 20.0,
+        verify_burst: float = 40.0,
+        claim_rate: float = 2.0,
+        claim_burst: float = 60.0,
+        join_code_rate: float = 10.0,
+        join_code_burst: float = 100.0,
+        target_lag: float = 0.1,
+        max_in_flight: int = 256,
+        proxy_hops: int = 0,
+    ):
+        self.is_cached_verification = is_cached_verification
+        self.verify_limiter = TokenBucketLimiter(verify_rate, verify_burst)
+        self.claim_limiter = TokenBucketLimiter(claim_rate, claim_burst)
+        self.join_code_limiter = TokenBucketLimiter(join_code_rate, join_code_burst)
+        self.target_lag = target_lag
+        self.max_in_flight = max_in_flight
+        self.proxy_hops = proxy_hops
+        self.lag_monitor = LoopLagMonitor()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    async def start(self):
+        await self.lag_monitor.start()
+
+    async def stop(self):
+        await self.lag_monitor.stop()
+
+    @property
+    def pressure(self) -> float:
+        return max(self.lag_monitor.lag / self.target_lag, self.in_flight / self.max_in_flight)
+
+    def client_ip(self, scope) -> str:
+        """The address `proxy_hops` entries from the right of X-Forwarded-For (what our proxy saw), else the peer"""
+        if self.proxy_hops > 0:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                    if hops:
+                        return hops[max(0, len(hops) - self.proxy_hops)]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def should_shed(self, cached: bool) -> bool:
+        pressure = self.pressure
+        if cached:
+            return pressure >= CRITICAL_PRESSURE
+        if pressure < 1.0:
+            return False
+        return random.random() < (pressure - 1.0) / (SHED_FULL_PRESSURE - 1.0)
+
+    def shed_retry_after(self) -> float:
+        return max(1.0, self.lag_monitor.lag * 10)
+
+    def reject(self, route: str, reason: str) -> None:
+        key = f"{route}:{reason}"
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+        record_admission_rejection(route, reason)
+
+    def check_verify(self, scope) -> Optional[Tuple[str, float]]:
+        """None to admit, or (detail, retry_after)"""
+        certificate_id = scope["path"][len(VERIFY_PREFIX):]
+        cached = self.is_cached_verification(certificate_id)
+        if self.should_shed(cached):
+            self.reject("verify", "shed")
+            return "Server busy, retry shortly", self.shed_retry_after()
+        # Cached answers cost a fraction of a database lookup
+        allowed, retry_after = self.verify_limiter.acquire(self.client_ip(scope), 0.25 if cached else 1.0)
+        if not allowed:
+            self.reject("verify", "ip_rate")
+            return "Too many verification requests", retry_after
+        return None
+
+    def check_claim(self, scope, join_code: Optional[str]) -> Optional[Tuple[str, float]]:
+        if self.should_shed(False):
+            self.reject("claim", "shed")
+            return "Server busy, retry shortly", self.shed_retry_after()
+        allowed, retry_after = self.claim_limiter.acquire(self.client_ip(scope))
+        if not allowed:
+            self.reject("claim", "ip_rate")
+            return "Too many claim requests", retry_after
+        if join_code:
+            allowed, retry_after = self.join_code_limiter.acquire(join_code)
+            if not allowed:
+                self.reject("claim", "join_code_rate")
+                return "Too many claims for this join code", retry_after
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "loop_lag_ms": round(self.lag_monitor.lag * 1000, 2),
+            "max_loop_lag_ms": round(self.lag_monitor.max_lag * 1000, 2),
+            "pressure": round(self.pressure, 3),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "tracked_clients": len(self.verify_limiter) + len(self.claim_limiter),
+            "tracked_join_codes": len(self.join_code_limiter),
+        }
+
+
+async def read_body(receive) -> Tuple[bytes, list]:
+    """Drain the request body, keeping the messages so the app can receive them again"""
+    messages, chunks, size = [], [], 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if not message.get("more_body") or size > MAX_CLAIM_BODY:
+            break
+    return b"".join(chunks), messages
+
+
+def join_code_from_body(body: bytes) -> Optional[str]:
+    if len(body) > MAX_CLAIM_BODY:
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    code = payload.get("join_code") if isinstance(payload, dict) else None
+    return code if isinstance(code, str) else None
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        path, method = scope["path"], scope["method"]
+        rejection, screened = None, True
+        if method == "GET" and path.startswith(VERIFY_PREFIX):
+            rejection = controller.check_verify(scope)
+        elif method == "POST" and path == CLAIM_PATH:
+            body, messages = await read_body(receive)
+            rejection = controller.check_claim(scope, join_code_from_body(body))
+
+            async def replay():
+                return messages.pop(0) if messages else await receive()
+
+            receive = replay
+        else:
+            screened = False
+
+        if rejection is not None:
+            detail, retry_after = rejection
+            body = json.dumps({"detail": detail}).encode()
+            await send({"type": "http.response.start", "status": 429, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        if screened:
+            controller.admitted += 1
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
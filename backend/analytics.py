@@ -0,0 +1,146 @@
+"""
+Verification analytics rollups
+
+Scans are counted in memory per (certificate, day) as the verification log
+writer persists them, and flushed periodically into verification_daily_rollups
+through the increment_verification_rollups() function, so counts are added
+atomically even with several workers. The log rows are inserted with
+rolled_up = false and the same function call marks the ones a flush counted,
+so a crash before the flush loses nothing: compaction counts those rows later.
+Dashboards read only the rollup table (plus the not-yet-flushed deltas of this
+process). A compaction job folds raw certificate_verifications rows that were
+never counted (e.g. written before rollups existed) into the rollups and
+deletes raw rows past retention. Compaction never reaches rows younger than
+the retention period (at least MIN_RETENTION_DAYS), so it cannot race the
+flushes of other workers or wipe the recent audit log.
+
+Days are UTC dates, both here (from the UTC verified_at timestamp) and in the
+compaction SQL. record() runs on the log writer's worker thread, so the delta
+table is guarded by a lock.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Far longer than any flush interval: rows this young may still be counted by a worker's pending deltas
+MIN_RETENTION_DAYS = 1
+
+
+class VerificationRollups:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        flush_interval: float = 30.0,
+        retention_days: int = 90,
+        compaction_interval: float = 6 * 3600,
+    ):
+        self.client_factory = client_factory
+        self.flush_interval = flush_interval
+        self.retention_days = max(retention_days, MIN_RETENTION_DAYS)
+        self.compaction_interval = compaction_interval
+
+        # (certificate_pk, day) -> [group_id, count]
+        self._deltas: Dict[Tuple[str, str], list] = {}
+        # certificate_verifications ids behind the deltas, marked rolled_up by the flush
+        self._log_ids: List[str] = []
+        self._lock = threading.Lock()
+        self._tasks = []
+
+    def record(self, certificate_pk: str, group_id: Optional[str], day: str, count: int = 1,
+               log_id: Optional[str] = None, log_ids: Iterable[str] = ()):
+        key = (certificate_pk, day)
+        with self._lock:
+            entry = self._deltas.get(key)
+            if entry is None:
+                self._deltas[key] = [group_id, count]
+            else:
+                entry[1] += count
+            if log_id is not None:
+                self._log_ids.append(log_id)
+            self._log_ids.extend(log_ids)
+
+    def _take_deltas(self) -> Tuple[Dict[Tuple[str, str], list], List[str]]:
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            log_ids, self._log_ids = self._log_ids, []
+        return deltas, log_ids
+
+    def pending_for_certificate(self, certificate_pk: str) -> Dict[str, int]:
+        with self._lock:
+            return {day: entry[1] for (pk, day), entry in self._deltas.items() if pk == certificate_pk}
+
+    def pending_for_group(self, group_id: str) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            return {key: entry[1] for key, entry in self._deltas.items() if entry[0] == group_id}
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks.append(asyncio.create_task(self._every(self.flush_interval, self.flush)))
+            if self.compaction_interval > 0:
+                self._tasks.append(asyncio.create_task(self._every(self.compaction_interval, self.compact)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        try:
+            await self.flush()
+        except Exception as e:
+            # Shutdown goes on; compaction still counts the rows this flush would have marked
+            print(f"Final analytics flush failed: {e}")
+
+    async def _every(self, interval: float, job: Callable):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await job()
+            except Exception as e:
+                print(f"Analytics job {job.__name__} failed: {e}")
+
+    async def flush(self):
+        deltas, log_ids = self._take_deltas()
+        if not deltas:
+            return
+        rows = [
+            {"certificate_pk": pk, "day": day, "group_id": entry[0] or "", "scan_count": entry[1]}
+            for (pk, day), entry in deltas.items()
+        ]
+        try:
+            await asyncio.to_thread(
+                lambda: self.client_factory().rpc(
+                    "increment_verification_rollups", {"rows": rows, "log_ids": log_ids}
+                ).execute()
+            )
+        except Exception:
+            # Put the counts back so the next flush retries them
+            for index, ((pk, day), (group_id, count)) in enumerate(deltas.items()):
+                self.record(pk, group_id, day, count, log_ids=log_ids if index == 0 else ())
+            raise
+
+    async def compact(self, older_than_days: Optional[int] = None) -> int:
+        days = self.retention_days if older_than_days is None else older_than_days
+        if days < self.retention_days:
+            raise ValueError(f"older_than_days must be at least the retention period ({self.retention_days} days)")
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        response = await asyncio.to_thread(
+            lambda: self.client_factory().rpc("compact_certificate_verifications", {"older_than": cutoff}).execute()
+        )
+        return response.data or 0
+
+
+def summarize_days(rows, pending: Dict[str, int]) -> Dict[str, Any]:
+    """Merge rollup rows ({"day", "scan_count"}) with unflushed per-day deltas"""
+    per_day = defaultdict(int)
+    for row in rows:
+        per_day[row["day"]] += row["scan_count"]
+    for day, count in pending.items():
+        per_day[day] += count
+    daily = [{"day": day, "scans": per_day[day]} for day in sorted(per_day)]
+    return {"total_scans": sum(per_day.values()), "daily": daily}
@@ -0,0 +1,158 @@
+"""
+Buffered writer for certificate_verifications
+
+The verify/log endpoints only enqueue an event. A background task drains the
+queue and writes multi-row inserts whenever `batch_size` events are waiting or
+`flush_interval` seconds have passed. The queue is bounded: when it is full the
+oldest event is dropped and counted, so a scan storm can never grow memory or
+stall the request path.
+"""
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from cache import LRUCache
+
+
+class VerificationLogWriter:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        pk_cache: LRUCache,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        rollups: Optional[Any] = None,
+    ):
+        self.client_factory = client_factory
+        self.pk_cache = pk_cache
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rollups = rollups
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def enqueue(self, event: Dict[str, Any]) -> bool:
+        """Queue an event without blocking; returns False if an older event was dropped"""
+        accepted = True
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+            accepted = False
+        self._queue.append(event)
+        self.enqueued += 1
+        if self._wakeup is not None and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return accepted
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Drain whatever is left before the process exits
+        while self._queue:
+            await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue:
+                await self.flush()
+                if len(self._queue) < self.batch_size:
+                    break
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    async def flush(self):
+        batch = self._take_batch()
+        if not batch:
+            return
+        try:
+            rows = await asyncio.to_thread(self._write_batch, batch)
+            self.written += rows
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Verification log flush failed ({len(batch)} events): {e}")
+
+    def _resolve_certificates(self, client: Any, certificate_ids: List[str]):
+        """Fill the PK cache for IDs it does not know yet, in one query"""
+        missing = [cid for cid in set(certificate_ids) if self.pk_cache.get(cid) is None]
+        if not missing:
+            return
+        response = client.table("certificates").select("id, certificate_id, group_id").in_("certificate_id", missing).execute()
+        found = set()
+        for row in response.data or []:
+            found.add(row["certificate_id"])
+            self.pk_cache.set(row["certificate_id"], {"id": row["id"], "group_id": row.get("group_id")})
+        # Remember misses briefly so repeated scans of a bad ID don't re-query every flush
+        for cid in set(missing) - found:
+            self.pk_cache.set(cid, {}, ttl=60)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        client = self.client_factory()
+        self._resolve_certificates(client, [event["certificate_id"] for event in batch])
+
+        rows = []
+        counted = []
+        for event in batch:
+            cert = self.pk_cache.get(event["certificate_id"])
+            if not cert:
+                continue  # Unknown certificate, nothing to attach the scan to
+            rows.append({
+                "certificate_pk": cert["id"],
+                "verified_at": event["verified_at"],
+                "verifier_ip": event.get("verifier_ip", ""),
+                "verifier_user_agent": event.get("verifier_user_agent", ""),
+                "trust_score": event.get("trust_score", 0),
+                "result_text": event.get("result_text", "Verification accessed"),
+                # Set by the rollup flush that counts the row, in the same transaction
+                "rolled_up": False,
+            })
+            counted.append((cert["id"], cert.get("group_id"), event["verified_at"][:10]))
+
+        if rows:
+            response = client.table("certificate_verifications").insert(rows).execute()
+            if self.rollups is not None:
+                inserted = response.data or []
+                for index, (certificate_pk, group_id, day) in enumerate(counted):
+                    log_id = inserted[index].get("id") if index < len(inserted) else None
+                    self.rollups.record(certificate_pk, group_id, day, log_id=log_id)
+        return len(rows)
@@ -0,0 +1,529 @@
+"""
+In-process stand-ins for Supabase and Crossmint
+
+FakeSupabase implements the part of the supabase-py client the API uses:
+PostgREST-style table queries (select/insert/update/delete with eq, neq,
+comparison, in_, or_ and JSON-path filters, ordering, limits, single(),
+exact/estimated counts), the rpc() functions from schema.sql and storage
+uploads. Rows live in memory; an optional per-call latency emulates the
+network round trip (the real client is synchronous, so the fake blocks too).
+
+Like PostgREST, it rejects columns the table does not have: the column sets
+are parsed from the repository's SQL files (SCHEMA_FILES), and selects
+(including `alias:column->>key` projections), filters, inserts and updates
+naming anything else raise FakeAPIError. Tables no SQL file defines accept
+the columns their rows were seeded with. Generated columns (GENERATED_COLUMNS)
+are recomputed whenever a row is inserted or updated, and tables with an
+update_updated_at_column() trigger get updated_at set the same way.
+
+FakeCrossmint is an httpx transport that answers the Crossmint endpoints the
+API calls, with configurable latency, 5xx error rate and 429 rate limiting.
+Install it with `server.crossmint_transport = FakeCrossmint(...).transport`.
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+# Every schema a deployment may have run: the backend schema plus the root setup scripts
+SCHEMA_FILES = [
+    os.path.join(BACKEND_DIR, "schema.sql"),
+    os.path.join(REPO_DIR, "PRODUCTION_SCHEMA.sql"),
+    os.path.join(REPO_DIR, "PRODUCTION_SCHEMA_FIXED.sql"),
+    os.path.join(REPO_DIR, "SUBSCRIPTION_SCHEMA.sql"),
+    os.path.join(REPO_DIR, "ADD_MISSING_COLUMNS.sql"),
+]
+TABLE_CONSTRAINTS = {"PRIMARY", "UNIQUE", "CONSTRAINT", "FOREIGN", "CHECK", "EXCLUDE"}
+# table -> column -> expression of the GENERATED ALWAYS AS ... STORED columns in schema.sql
+GENERATED_COLUMNS: Dict[str, Dict[str, Callable[[Dict[str, Any]], Any]]] = {
+    "certificates": {
+        "recipient_email_normalized": lambda row: _lower(_resolve(row, "canonical_payload->>recipientEmail")),
+    },
+}
+
+
+class FakeAPIError(Exception):
+    """Raised where postgrest raises APIError (e.g. single() without exactly one row)"""
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _resolve(row: Dict[str, Any], column: str) -> Any:
+    """Column value, following PostgREST JSON paths like canonical_payload->>recipientEmail"""
+    parts = re.split(r"->>?", column)
+    value = row.get(parts[0].strip())
+    for key in parts[1:]:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key.strip().strip("'"))
+    return value
+
+
+def _lower(value: Any) -> Optional[str]:
+    return value.lower() if isinstance(value, str) else None
+
+
+def _generate(table: str, row: Dict[str, Any]):
+    for column, expression in GENERATED_COLUMNS.get(table, {}).items():
+        row[column] = expression(row)
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if op == "eq":
+        return left == right or (left is not None and str(left) == str(right))
+    if op == "neq":
+        return not _compare("eq", left, right)
+    if left is None:
+        return False
+    left, right = str(left), str(right)
+    return {"lt": left < right, "lte": left <= right, "gt": left > right, "gte": left >= right}[op]
+
+
+def _column_name(expression: str) -> str:
+    """Base column of a filter or projection expression such as canonical_payload->>issuerWallet"""
+    return re.split(r"->>?", expression)[0].strip()
+
+
+def parse_select(columns: str) -> List[Tuple[str, str]]:
+    """PostgREST select list as (output key, source expression) pairs"""
+    parsed = []
+    for item in _split_top_level(columns):
+        item = item.strip()
+        if not item:
+            continue
+        alias, separator, expression = item.partition(":")
+        if not separator:
+            expression = alias
+            # A JSON path is returned under its last key, like PostgREST does
+            alias = re.split(r"->>?", expression)[-1].strip().strip("'")
+        parsed.append((alias.strip(), expression.strip()))
+    return parsed
+
+
+def load_schema_columns(paths: Iterable[str] = SCHEMA_FILES) -> Dict[str, Set[str]]:
+    """table -> column names from the CREATE TABLE and ALTER TABLE ... ADD COLUMN statements of `paths`"""
+    tables: Dict[str, Set[str]] = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            sql = re.sub(r"--[^\n]*", "", f.read())
+        for statement in sql.split(";"):
+            statement = statement.strip()
+            created = re.match(r"CREATE TABLE\s+(?:IF NOT EXISTS\s+)?(?:public\.)?(\w+)\s*\((.*)\)\s*$",
+                               statement, re.IGNORECASE | re.DOTALL)
+            if created:
+                columns = tables.setdefault(created.group(1), set())
+                for definition in _split_top_level(created.group(2)):
+                    name = definition.split()[0] if definition.split() else ""
+                    if name and name.upper() not in TABLE_CONSTRAINTS:
+                        columns.add(name.strip('"'))
+                continue
+            altered = re.match(r"ALTER TABLE\s+(?:IF EXISTS\s+)?(?:ONLY\s+)?(?:public\.)?(\w+)\s+(.*)$",
+                               statement, re.IGNORECASE | re.DOTALL)
+            if altered:
+                added = re.findall(r"ADD COLUMN\s+(?:IF NOT EXISTS\s+)?(\w+)", altered.group(2), re.IGNORECASE)
+                if added:
+                    tables.setdefault(altered.group(1), set()).update(added)
+    return tables
+
+
+def load_updated_at_tables(paths: Iterable[str] = SCHEMA_FILES) -> Set[str]:
+    """Tables whose updated_at a BEFORE UPDATE trigger maintains (update_updated_at_column())"""
+    tables: Set[str] = set()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            sql = f.read()
+        tables.update(re.findall(
+            r"CREATE TRIGGER\s+\w+\s+BEFORE UPDATE ON\s+(?:public\.)?(\w+)\s+FOR EACH ROW EXECUTE FUNCTION update_updated_at_column",
+            sql, re.IGNORECASE,
+        ))
+    return tables
+
+
+def _split_top_level(expression: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, []
+    i = 0
+    while i < len(expression):
+        char = expression[i]
+        if char == "\\" and quoted:
+            current.append(expression[i:i + 2])
+            i += 2
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current))
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _parse_logic(expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate for a PostgREST or=/and= expression such as `a.lt.1,and(a.eq.1,id.lt."x")`"""
+    expression = expression.strip()
+    for combinator, combine in (("and(", all), ("or(", any)):
+        if expression.startswith(combinator) and expression.endswith(")"):
+            terms = [_parse_logic(term) for term in _split_top_level(expression[len(combinator):-1])]
+            return lambda row: combine(term(row) for term in terms)
+    column, op, value = expression.split(".", 2)
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return lambda row: _compare(op, _resolve(row, column), value)
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.operation = "select"
+        self.columns = "*"
+        self.count_mode: Optional[str] = None
+        self.payload: Any = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.orders: List[tuple] = []
+        self.row_limit: Optional[int] = None
+        self.expect_single = False
+
+    # Operations
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self.columns, self.count_mode = columns, count
+        return self
+
+    def insert(self, payload):
+        self.operation, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, **kwargs):
+        self.operation, self.payload = "upsert", payload
+        return self
+
+    def update(self, payload: Dict[str, Any]):
+        self.operation, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    # Filters
+    def _filter(self, op: str, column: str, value: Any):
+        self.db.check_columns(self.table, [_column_name(column)])
+        self.filters.append(lambda row: _compare(op, _resolve(row, column), value))
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter("eq", column, value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter("neq", column, value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter("lt", column, value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter("lte", column, value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter("gt", column, value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter("gte", column, value)
+
+    def in_(self, column: str, values: List[Any]):
+        allowed = {str(value) for value in values}
+        self.filters.append(lambda row: str(_resolve(row, column)) in allowed)
+        return self
+
+    def or_(self, expression: str):
+        self.filters.append(_parse_logic(f"or({expression})"))
+        return self
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int):
+        self.row_limit = count
+        return self
+
+    def single(self):
+        self.expect_single = True
+        return self
+
+    def _project(self, row: Dict[str, Any], columns: List[Tuple[str, str]]) -> Dict[str, Any]:
+        if not columns:
+            return dict(row)
+        return {alias: _resolve(row, expression) for alias, expression in columns}
+
+    def _projection(self) -> List[Tuple[str, str]]:
+        """Parsed select list ([] for *), rejecting unknown columns like PostgREST does"""
+        if self.columns.strip() == "*":
+            return []
+        columns = parse_select(self.columns)
+        self.db.check_columns(self.table, [_column_name(expression) for _, expression in columns])
+        return columns
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(predicate(row) for predicate in self.filters)
+
+    def _insert(self, rows: List[Dict[str, Any]], upsert: bool) -> List[Dict[str, Any]]:
+        table = self.db.tables.setdefault(self.table, [])
+        inserted = []
+        for payload in rows:
+            row = {"id": str(uuid.uuid4()), "created_at": _now(), **payload}
+            if self.table in self.db.updated_at_tables:
+                row.setdefault("updated_at", row["created_at"])
+            existing = next((r for r in table if r["id"] == row["id"]), None) if upsert else None
+            if existing is not None:
+                existing.update(row)
+                row = existing
+            else:
+                table.append(row)
+            _generate(self.table, row)
+            inserted.append(dict(row))
+        return inserted
+
+    def execute(self) -> FakeResponse:
+        self.db.simulate_latency()
+        with self.db.lock:
+            self.db.calls[f"{self.operation}:{self.table}"] += 1
+            table = self.db.tables.setdefault(self.table, [])
+            if self.operation in ("insert", "upsert"):
+                rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                self.db.check_columns(self.table, [column for row in rows for column in row], writing=True)
+                return FakeResponse(self._insert(rows, self.operation == "upsert"))
+            if self.operation == "update":
+                self.db.check_columns(self.table, list(self.payload), writing=True)
+
+            matched = [row for row in table if self._matches(row)]
+            if self.operation == "update":
+                touched = {"updated_at": _now()} if self.table in self.db.updated_at_tables else {}
+                for row in matched:
+                    row.update({**self.payload, **touched})
+                    _generate(self.table, row)
+                return FakeResponse([dict(row) for row in matched])
+            if self.operation == "delete":
+                self.db.tables[self.table] = [row for row in table if row not in matched]
+                return FakeResponse([dict(row) for row in matched])
+
+            for column, desc in reversed(self.orders):
+                matched.sort(key=lambda row: (_resolve(row, column) is not None, str(_resolve(row, column) or "")), reverse=desc)
+            count = len(matched) if self.count_mode else None
+            if self.row_limit is not None:
+                matched = matched[:self.row_limit]
+            projection = self._projection()
+            rows = [self._project(row, projection) for row in matched]
+            if self.expect_single:
+                if len(rows) != 1:
+                    raise FakeAPIError(f"JSON object requested, multiple (or no) rows returned ({len(rows)})")
+                return FakeResponse(rows[0], count)
+            return FakeResponse(rows, count)
+
+
+class FakeRpc:
+    def __init__(self, db: "FakeSupabase", name: str, params: Dict[str, Any]):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self) -> FakeResponse:
+        self.db.simulate_latency()
+        handler = self.db.rpc_handlers.get(self.name)
+        if handler is None:
+            raise FakeAPIError(f"Could not find the function public.{self.name}")
+        with self.db.lock:
+            self.db.calls[f"rpc:{self.name}"] += 1
+            return FakeResponse(handler(self.db, self.params))
+
+
+class FakeBucket:
+    def __init__(self, db: "FakeSupabase", name: str):
+        self.db, self.name = db, name
+
+    def upload(self, path: str, data, file_options: Optional[Dict[str, str]] = None):
+        self.db.simulate_latency()
+        with self.db.lock:
+            self.db.calls[f"storage:{self.name}"] += 1
+            self.db.objects[(self.name, path)] = data.read() if hasattr(data, "read") else bytes(data)
+        return {"Key": f"{self.name}/{path}"}
+
+    def exists(self, path: str) -> bool:
+        self.db.simulate_latency()
+        with self.db.lock:
+            self.db.calls[f"storage:{self.name}"] += 1
+            return (self.name, path) in self.db.objects
+
+    def get_public_url(self, path: str) -> str:
+        return f"{self.db.url}/storage/v1/object/public/{self.name}/{path}"
+
+
+class FakeStorage:
+    def __init__(self, db: "FakeSupabase"):
+        self.db = db
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self.db, bucket)
+
+
+def _increment_verification_rollups(db: "FakeSupabase", params: Dict[str, Any]):
+    table = db.tables.setdefault("verification_daily_rollups", [])
+    for delta in params.get("rows", []):
+        key = (delta.get("certificate_pk"), delta.get("day"))
+        row = next((r for r in table if (r.get("certificate_pk"), r.get("day")) == key), None)
+        if row is None:
+            table.append({**delta})
+        else:
+            row["scan_count"] = row.get("scan_count", 0) + delta.get("scan_count", 0)
+    log_ids = set(params.get("log_ids") or [])
+    for row in db.tables.get("certificate_verifications", []):
+        if row.get("id") in log_ids:
+            row["rolled_up"] = True
+    return None
+
+
+def _merge_template_render_assets(db: "FakeSupabase", params: Dict[str, Any]):
+    for row in db.tables.get("certificate_templates", []):
+        if row.get("id") == params.get("template_id"):
+            row["render_assets"] = {**(row.get("render_assets") or {}), **(params.get("assets") or {})}
+            row["updated_at"] = datetime.utcnow().isoformat()
+            return row["render_assets"]
+    return None
+
+
+def _compact_certificate_verifications(db: "FakeSupabase", params: Dict[str, Any]):
+    table = db.tables.setdefault("certificate_verifications", [])
+    keep = [row for row in table if str(row.get("verified_at", "")) >= str(params.get("older_than"))]
+    removed = len(table) - len(keep)
+    db.tables["certificate_verifications"] = keep
+    return removed
+
+
+class FakeSupabase:
+    """Drop-in for the supabase-py Client as used by server.py (`server.supabase = FakeSupabase()`)"""
+
+    def __init__(self, latency: float = 0.0, url: str = "http://fake-supabase.local",
+                 schema: Optional[Dict[str, Set[str]]] = None):
+        self.url = url
+        self.latency = latency
+        self.schema = load_schema_columns() if schema is None else schema
+        self.updated_at_tables = load_updated_at_tables() if schema is None else set()
+        # Columns of tables no schema file defines, learned from seeded rows
+        self.seeded_columns: Dict[str, Set[str]] = {}
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.objects: Dict[tuple, bytes] = {}
+        self.calls: Counter = Counter()
+        self.lock = threading.RLock()
+        self.storage = FakeStorage(self)
+        self.rpc_handlers: Dict[str, Callable] = {
+            "increment_verification_rollups": _increment_verification_rollups,
+            "compact_certificate_verifications": _compact_certificate_verifications,
+            "merge_template_render_assets": _merge_template_render_assets,
+        }
+
+    def simulate_latency(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
+
+    def check_columns(self, table: str, columns: Iterable[str], writing: bool = False):
+        known = self.schema.get(table)
+        if known is None:
+            if writing:
+                return
+            known = self.seeded_columns.get(table, set()) | {"id", "created_at"}
+        for column in columns:
+            if column not in known:
+                if writing:
+                    raise FakeAPIError(f"Could not find the '{column}' column of '{table}' in the schema cache")
+                raise FakeAPIError(f"column {table}.{column} does not exist")
+
+    def seed(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if table not in self.schema:
+            self.seeded_columns.setdefault(table, set()).update(column for row in rows for column in row)
+        return self.table(table).insert(rows).execute().data
+
+
+class FakeCrossmint:
+    """Crossmint NFT API stub; pass `.transport` to httpx clients"""
+
+    def __init__(self, latency: float = 0.25, jitter: float = 0.1, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.responses: Counter = Counter()
+        self.nfts: Dict[str, Dict[str, Any]] = {}
+        self.transport = httpx.MockTransport(self.handle)
+
+    def _respond(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        self.responses[status] += 1
+        return httpx.Response(status, json=body, headers=headers)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(delay)
+
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return self._respond(429, {"error": True, "message": "Too many requests"}, {"Retry-After": "1"})
+        if roll < self.rate_limit_rate + self.error_rate:
+            return self._respond(500, {"error": True, "message": "Internal error"})
+
+        path = request.url.path
+        if request.method == "POST" and path.endswith("/nfts"):
+            nft_id = str(uuid.uuid4())
+            nft = {
+                "id": nft_id,
+                "onChain": {
+                    "status": "pending",
+                    "chain": "polygon",
+                    "contractAddress": "0x" + "c0" * 20,
+                },
+                "actionId": str(uuid.uuid4()),
+            }
+            self.nfts[nft_id] = nft
+            return self._respond(200, nft)
+        if request.method == "POST" and path.endswith("/collections"):
+            return self._respond(200, {"id": str(uuid.uuid4()), "contractAddress": "0x" + "c0" * 20})
+        if request.method == "GET" and "/nfts/" in path:
+            nft = self.nfts.get(path.rsplit("/", 1)[-1])
+            if nft is None:
+                return self._respond(404, {"error": True, "message": "NFT not found"})
+            return self._respond(200, {**nft, "onChain": {**nft["onChain"], "status": "success", "tokenId": "1"}})
+        return self._respond(404, {"error": True, "message": f"No route for {request.method} {path}"})
@@ -0,0 +1,98 @@
+"""
+Deterministic, network-free inputs for the benchmarks
+
+Template images are drawn in memory at the resolutions we see in practice
+(the 800x560 design canvas, a 2x retina export and an A4 scan at 300 dpi), and
+the certificate row is signed with a fixed throwaway key so every run hashes
+and verifies exactly the same bytes.
+"""
+from io import BytesIO
+from typing import Dict, List
+
+# (name, width, height)
+TEMPLATE_SIZES = [
+    ("design_800x560", 800, 560),
+    ("retina_1600x1120", 1600, 1120),
+    ("a4_300dpi_3508x2480", 3508, 2480),
+]
+
+# Field positions are in the 800x560 design space, like rows of template_fields
+TEMPLATE_FIELDS: List[Dict] = [
+    {"type": "text", "label": "Recipient Name", "x": 150, "y": 200, "width": 500, "height": 60},
+    {"type": "text", "label": "Course Name", "x": 150, "y": 290, "width": 500, "height": 40},
+    {"type": "text", "label": "Issue Date", "x": 150, "y": 350, "width": 240, "height": 30},
+    {"type": "qr", "label": "QR", "x": 640, "y": 400, "width": 120, "height": 120},
+]
+
+FIELD_DATA = {
+    "Recipient Name": "Alexandra Montgomery-Fitzgerald",
+    "Course Name": "Applied Cryptography and Distributed Ledgers",
+    "Issue Date": "2026-01-15",
+}
+
+# Throwaway key, only ever used for benchmarking
+ISSUER_PRIVATE_KEY = "0x" + "4c" * 32
+
+VERIFICATION_URL = "http://localhost:3000/verify/CERT-01J0000000000000000000000"
+
+
+def make_template(width: int, height: int) -> bytes:
+    """A PNG with a gradient, border and seal, roughly as compressible as a real template"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (width, height), (250, 247, 240))
+    draw = ImageDraw.Draw(image)
+    for y in range(0, height, 4):
+        shade = 235 - int(40 * y / height)
+        draw.rectangle([0, y, width, y + 3], fill=(shade, shade - 10, shade - 30))
+    border = max(4, width // 80)
+    draw.rectangle([border, border, width - border, height - border], outline=(120, 90, 40), width=border)
+    radius = width // 12
+    draw.ellipse([width // 10, height - radius * 2 - border * 4, width // 10 + radius * 2, height - border * 4],
+                 fill=(180, 140, 60), outline=(120, 90, 40), width=border // 2 or 1)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def certificate_data(issuer_wallet: str) -> Dict:
+    return {
+        "certificateId": "CERT-01J0000000000000000000000",
+        "recipientName": FIELD_DATA["Recipient Name"],
+        "recipientEmail": "alexandra@example.com",
+        "studentId": "S-000123",
+        "courseName": FIELD_DATA["Course Name"],
+        "issuerName": "Benchmark Instructor",
+        "issuerWallet": issuer_wallet,
+        "issueDate": "2026-01-15T10:00:00",
+        "groupId": "00000000-0000-0000-0000-000000000001",
+        "verificationUrl": VERIFICATION_URL,
+        "fieldData": FIELD_DATA,
+    }
+
+
+def certificate_row(create_canonical_payload, hash_message, sign_message) -> Dict:
+    """A minted certificates row as the verify endpoint would read it"""
+    from eth_account import Account
+
+    issuer_wallet = Account.from_key(ISSUER_PRIVATE_KEY).address
+    data = certificate_data(issuer_wallet)
+    canonical_payload = create_canonical_payload(data)
+    return {
+        "id": "00000000-0000-0000-0000-00000000c0de",
+        "group_id": data["groupId"],
+        "certificate_id": data["certificateId"],
+        "status": "minted",
+        "canonical_payload": data,
+        "canonical_payload_text": canonical_payload,
+        "certificate_hash": hash_message(canonical_payload),
+        "issuer_signature": sign_message(canonical_payload, ISSUER_PRIVATE_KEY),
+        "nft_id": "nft-benchmark",
+        "contract_address": "0x0000000000000000000000000000000000000001",
+        "token_id": "1",
+        "blockchain_tx": "0xbenchmark",
+        "recipient_wallet": issuer_wallet,
+        "issued_at": data["issueDate"],
+        "ipfs_url": "https://example.com/certificate.jpg",
+        "qr_code_image": None,
+    }
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the certificate hot paths
+
+Usage:
+    python benchmarks/hot_paths.py                      # run and print
+    python benchmarks/hot_paths.py --save               # write the baseline
+    python benchmarks/hot_paths.py --compare            # fail (exit 1) on regressions
+    python benchmarks/hot_paths.py --filter render --rounds 9 --tolerance 0.2
+
+Covers QR generation, text fitting, template ingestion and certificate rendering (fixture
+templates at several resolutions), canonical payload, hashing, signing, signature verification and
+the full verification document build + serialization. Nothing touches the
+network or the database.
+
+Baselines are per machine: regenerate them with --save on the machine that
+runs --compare (e.g. the CI runner) after an intentional performance change.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baselines", "hot_paths.json")
+
+# Keep benchmark runs out of the shared cache the API workers use
+os.environ.setdefault("SHARED_CACHE_BACKEND", "none")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+
+def build_benchmarks() -> List[Tuple[str, Callable[[], object]]]:
+    import orjson
+    import server
+    import fixtures
+    from eth_account import Account
+    from crypto_utils import sign_message_with_account
+    from template_ingest import RENDER_PROFILES, compute_field_layout, ingest_template
+
+    qr_code = server.generate_qr_code(fixtures.VERIFICATION_URL)
+    cert = fixtures.certificate_row(server.create_canonical_payload, server.hash_message, server.sign_message)
+    data = cert["canonical_payload"]
+    canonical_payload = server.create_canonical_payload(data)
+    # What the issuer signer does once the instructor's key is cached
+    issuer_account = Account.from_key(fixtures.ISSUER_PRIVATE_KEY)
+
+    def verify_document():
+        checks = server.run_verification_checks(cert)
+        return orjson.dumps(server.build_verification_response(cert, cert["certificate_id"], checks))
+
+    def verify_compact():
+        checks = server.run_verification_checks(cert)
+        return orjson.dumps(server.build_compact_verification_response(cert, cert["certificate_id"], checks))
+
+    benchmarks = [
+        ("qr.generate", lambda: server.generate_qr_code(fixtures.VERIFICATION_URL)),
+        ("payload.canonical", lambda: server.create_canonical_payload(data)),
+        ("crypto.hash", lambda: server.hash_message(canonical_payload)),
+        ("crypto.sign", lambda: server.sign_message(canonical_payload, fixtures.ISSUER_PRIVATE_KEY)),
+        ("crypto.sign_cached_account", lambda: sign_message_with_account(canonical_payload, issuer_account)),
+        ("crypto.verify_signature", lambda: server.verify_signature(canonical_payload, cert["issuer_signature"], data["issuerWallet"])),
+        ("verify.full_document", verify_document),
+        ("verify.compact_document", verify_compact),
+    ]
+    # Fitting one field value to its box, per text field of every render
+    name_box, course_box = compute_field_layout(fixtures.TEMPLATE_FIELDS, (1600, 1120))[:2]
+    wrapped_course_box = dict(course_box, wrap=True, max_lines=2)
+    benchmarks += [
+        ("text.fit_single_line", lambda: server.text_layout.fit(fixtures.FIELD_DATA["Recipient Name"], name_box)),
+        ("text.fit_wrapped", lambda: server.text_layout.fit(fixtures.FIELD_DATA["Course Name"], wrapped_course_box)),
+    ]
+    for name, width, height in fixtures.TEMPLATE_SIZES:
+        template = fixtures.make_template(width, height)
+        benchmarks.append((
+            f"template.ingest.{name}",
+            lambda template=template: ingest_template(template, fixtures.TEMPLATE_FIELDS, RENDER_PROFILES["standard"]),
+        ))
+        # Renders start from the ingested base, whatever the upload's resolution was
+        ingested = ingest_template(template, fixtures.TEMPLATE_FIELDS, RENDER_PROFILES["standard"])
+        benchmarks.append((
+            f"render.{name}",
+            lambda ingested=ingested: server.render_certificate_image(
+                ingested.image, ingested.layout, fixtures.FIELD_DATA, qr_code
+            ),
+        ))
+    return benchmarks
+
+
+def measure(fn: Callable[[], object], rounds: int, min_round_time: float) -> Dict[str, float]:
+    """Per-call timings in microseconds over `rounds` rounds of auto-sized loops"""
+    fn()  # warm caches (fonts, lazy imports)
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops * 1e6)
+    return {
+        "median_us": round(statistics.median(samples), 2),
+        "min_us": round(min(samples), 2),
+        "max_us": round(max(samples), 2),
+        "loops": loops,
+        "rounds": rounds,
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        limit = reference["median_us"] * (1 + tolerance)
+        if result["median_us"] > limit:
+            regressions.append(
+                f"{name}: {result['median_us']:.1f} us vs baseline {reference['median_us']:.1f} us "
+                f"(+{(result['median_us'] / reference['median_us'] - 1) * 100:.0f}%, allowed +{tolerance * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark render, QR, hash, sign and verify without network")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-round-time", type=float, default=0.05, help="Seconds per round (sets the loop count)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--compare", action="store_true", help="Exit 1 if any median regressed beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in build_benchmarks():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(fn, args.rounds, args.min_round_time)
+        if not args.json:
+            result = results[name]
+            print(f"{name:36s} {result['median_us']:12.1f} us  (min {result['min_us']:.1f}, {result['loops']} loops)")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.save:
+        existing = {}
+        if os.path.exists(args.baseline) and args.filter:
+            with open(args.baseline) as f:
+                existing = json.load(f).get("results", {})
+        document = {
+            "meta": {
+                "created_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "processor_count": os.cpu_count(),
+            },
+            "results": {**existing, **results},
+        }
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"❌ No baseline at {args.baseline}; run with --save first")
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"✅ No regressions beyond {args.tolerance * 100:.0f}% of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Import-time (cold start) benchmark for the API process
+
+Usage:
+    python benchmarks/import_time.py [--runs 5] [--module server] [--max-ms 1500] [--json]
+
+Each run imports the module in a fresh interpreter with `-X importtime` and
+records the wall time of the import plus the slowest top-level dependencies.
+With --max-ms the script exits 1 when the median exceeds the budget, so it can
+guard startup latency in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported lazily by the API; their presence after import is a regression
+HEAVY_MODULES = ["eth_account", "web3", "supabase", "httpx", "PIL", "qrcode", "reportlab", "requests"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print("__RESULT__", elapsed, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    """(module, cumulative microseconds) for top-level imports, slowest first"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only direct imports of the probed module (one level of indentation)
+        if name.startswith("  ") and not name.startswith("    "):
+            modules.append((name.strip(), int(cumulative)))
+    return sorted(modules, key=lambda item: item[1], reverse=True)
+
+
+def run_once(module: str) -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    marker = next(line for line in result.stdout.splitlines() if line.startswith("__RESULT__"))
+    _, elapsed, loaded = marker.split(" ", 2)
+    return {
+        "ms": float(elapsed) * 1000,
+        "heavy_loaded": [name for name in loaded.split(",") if name],
+        "top_imports": parse_importtime(result.stderr)[:10],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the API module")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    # The first run also warms the bytecode cache and is not counted
+    run_once(args.module)
+    runs = [run_once(args.module) for _ in range(args.runs)]
+    timings = [run["ms"] for run in runs]
+    report = {
+        "module": args.module,
+        "runs": args.runs,
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "heavy_loaded": runs[-1]["heavy_loaded"],
+        "top_imports": [{"module": name, "ms": round(us / 1000, 1)} for name, us in runs[-1]["top_imports"]],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: median {report['median_ms']} ms (min {report['min_ms']}, max {report['max_ms']}) over {args.runs} runs")
+        for item in report["top_imports"]:
+            print(f"  {item['ms']:8.1f} ms  {item['module']}")
+        if report["heavy_loaded"]:
+            print(f"⚠️  Eagerly loaded heavy modules: {', '.join(report['heavy_loaded'])}")
+
+    if args.max_ms is not None and report["median_ms"] > args.max_ms:
+        print(f"❌ Median import time {report['median_ms']} ms exceeds budget of {args.max_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Load generator for the mint, claim and verify endpoints against fake services
+
+Usage:
+    python benchmarks/load_test.py                              # all scenarios
+    python benchmarks/load_test.py --scenario verify --verifications 5000 --concurrency 200
+    python benchmarks/load_test.py --db-latency-ms 5 --crossmint-latency-ms 400 --crossmint-429-rate 0.05
+
+The app runs in-process (httpx ASGI transport, lifespan included) with
+FakeSupabase as its database and FakeCrossmint behind every Crossmint call, so
+nothing leaves the machine. Scenarios:
+
+  claim    a cohort claim burst: every student of a group claims at once
+  verify   a verification storm over the issued certificates (full and compact
+           views, plus a share of never-issued IDs: valid ULIDs dated before the
+           index watermark, answered by the Bloom filter, and fresh ones that
+           still reach the database)
+  mint     a batch mint of pending certificate rows through /api/certificates/mint
+
+For every endpoint the report shows request count, non-2xx responses, p50/p99/max
+latency and throughput over the scenario's wall time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+
+os.environ.setdefault("SHARED_CACHE_BACKEND", "none")
+# Every simulated client shares one address; measure the endpoints, not the rate limits
+os.environ.setdefault("ADMISSION_ENABLED", "0")
+# Deferred mints from injected Crossmint errors must not leak into the next run
+os.environ.setdefault("MINT_QUEUE_PATH", os.path.join(tempfile.mkdtemp(prefix="certichain-load-"), "mint-queue.sqlite3"))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+TEMPLATE_URL = "http://fake-storage.local/templates/load-test.png"
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+
+    async def call(self, label: str, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            status = response.status_code
+        except Exception:
+            response, status = None, 599
+        self.samples[label].append((time.perf_counter() - start, status))
+        return response
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(recorder: Recorder, wall_time: float) -> Dict[str, Dict]:
+    summary = {}
+    for label, samples in recorder.samples.items():
+        latencies = [latency for latency, _ in samples]
+        summary[label] = {
+            "requests": len(samples),
+            "errors": sum(1 for _, status in samples if status >= 400),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(max(latencies) * 1000, 1),
+            "throughput_rps": round(len(samples) / wall_time, 1) if wall_time else 0.0,
+        }
+    return summary
+
+
+def seed(db, fixtures, students: int, mints: int) -> Dict:
+    from eth_account import Account
+
+    issuer_wallet = Account.from_key(fixtures.ISSUER_PRIVATE_KEY).address
+    instructor = db.seed("instructors", [{
+        "user_id": "load-test-user",
+        "name": "Load Test Instructor",
+        "wallet_address": issuer_wallet,
+        "private_key_encrypted": fixtures.ISSUER_PRIVATE_KEY,
+        "subscription_type": "pro",
+        "mint_credits": 10 ** 9,
+        "total_certificates_issued": 0,
+    }])[0]
+    template = db.seed("certificate_templates", [{"pdf_url": TEMPLATE_URL}])[0]
+    db.seed("template_fields", [{**field, "template_id": template["id"]} for field in fixtures.TEMPLATE_FIELDS])
+    group = db.seed("groups", [{
+        "name": "Load Test Cohort",
+        "join_code": "LOADTEST",
+        "instructor_id": instructor["id"],
+        "template_id": template["id"],
+        "status": "active",
+    }])[0]
+    pending = db.seed("certificates", [{
+        "group_id": group["id"],
+        "status": "pending",
+        "verification_url": "",
+    } for _ in range(mints)])
+    return {"instructor": instructor, "template": template, "group": group, "pending": pending, "students": students}
+
+
+async def run_claim_burst(client, recorder: Recorder, world: Dict, concurrency: int) -> List[str]:
+    semaphore = asyncio.Semaphore(concurrency)
+    issued: List[str] = []
+
+    async def claim(index: int):
+        async with semaphore:
+            response = await recorder.call("POST /api/certificates/claim", client.post("/api/certificates/claim", json={
+                "join_code": world["group"]["join_code"],
+                "recipient_name": f"Student {index:05d}",
+                "recipient_email": f"student{index:05d}@example.com",
+                "student_id": f"S-{index:05d}",
+            }))
+            if response is not None and response.status_code == 200:
+                issued.append(response.json()["certificate_id"])
+
+    await asyncio.gather(*(claim(i) for i in range(world["students"])))
+    return issued
+
+
+def unminted_certificate_id(rng: random.Random, max_age_days: float = 30.0) -> str:
+    """A valid ULID certificate ID dated up to `max_age_days` back, so never issued in this run"""
+    from ids import CERTIFICATE_ID_PREFIX, encode_base32
+
+    created_ms = int((time.time() - rng.uniform(3600, max_age_days * 86400)) * 1000)
+    return f"{CERTIFICATE_ID_PREFIX}{encode_base32((created_ms << 80) | rng.getrandbits(80), 26)}"
+
+
+async def run_verification_storm(client, recorder: Recorder, certificate_ids: List[str], total: int,
+                                 concurrency: int, unknown_share: float):
+    from ids import generate_certificate_id
+
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(42)
+
+    async def verify(_):
+        if not certificate_ids or rng.random() < unknown_share:
+            # Mostly IDs from before the index watermark (answered by the Bloom filter),
+            # some fresh ones (newer than the watermark, so they reach the database)
+            if rng.random() < 0.8:
+                certificate_id, label = unminted_certificate_id(rng), "GET /api/certificates/verify (unknown, indexed)"
+            else:
+                certificate_id, label = generate_certificate_id(), "GET /api/certificates/verify (unknown, recent)"
+            url = f"/api/certificates/verify/{certificate_id}"
+        elif rng.random() < 0.3:
+            certificate_id = rng.choice(certificate_ids)
+            url, label = f"/api/certificates/verify/{certificate_id}?view=compact", "GET /api/certificates/verify?view=compact"
+        else:
+            certificate_id = rng.choice(certificate_ids)
+            url, label = f"/api/certificates/verify/{certificate_id}", "GET /api/certificates/verify"
+        async with semaphore:
+            await recorder.call(label, client.get(url))
+
+    await asyncio.gather(*(verify(i) for i in range(total)))
+
+
+async def run_batch_mint(client, recorder: Recorder, world: Dict, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def mint(index: int, row: Dict):
+        async with semaphore:
+            await recorder.call("POST /api/certificates/mint", client.post("/api/certificates/mint", json={
+                "certificate_db_id": row["id"],
+                "group_id": world["group"]["id"],
+                "template_id": world["template"]["id"],
+                "field_data": {"Recipient Name": f"Batch Learner {index:05d}", "Course Name": "Load Test Cohort", "Issue Date": "2026-01-15"},
+                "recipient_email": f"batch{index:05d}@example.com",
+                "recipient_name": f"Batch Learner {index:05d}",
+            }))
+
+    await asyncio.gather(*(mint(i, row) for i, row in enumerate(world["pending"])))
+
+
+def print_report(title: str, summary: Dict[str, Dict], wall_time: float):
+    print(f"\n{title} ({wall_time:.2f}s)")
+    print(f"  {'endpoint':48s} {'reqs':>6s} {'errs':>5s} {'p50 ms':>8s} {'p99 ms':>8s} {'max ms':>8s} {'req/s':>8s}")
+    for label, row in sorted(summary.items()):
+        print(f"  {label:48s} {row['requests']:6d} {row['errors']:5d} {row['p50_ms']:8.1f} "
+              f"{row['p99_ms']:8.1f} {row['max_ms']:8.1f} {row['throughput_rps']:8.1f}")
+
+
+async def main_async(args) -> Dict:
+    import httpx
+    import fixtures
+    import server
+    from fake_services import FakeCrossmint, FakeSupabase
+
+    db = FakeSupabase(latency=args.db_latency_ms / 1000)
+    crossmint = FakeCrossmint(
+        latency=args.crossmint_latency_ms / 1000,
+        jitter=args.crossmint_latency_ms / 4000,
+        error_rate=args.crossmint_error_rate,
+        rate_limit_rate=args.crossmint_429_rate,
+        seed=7,
+    )
+    server.supabase = db
+    server.crossmint_transport = crossmint.transport
+    server.template_image_cache.set(TEMPLATE_URL, fixtures.make_template(800, 560))
+    world = seed(db, fixtures, args.students, args.mints)
+
+    scenarios = ["claim", "verify", "mint"] if args.scenario == "all" else [args.scenario]
+    report = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.lifespan(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=300.0) as client:
+            issued: List[str] = []
+            for scenario in scenarios:
+                recorder = Recorder()
+                start = time.perf_counter()
+                if scenario == "claim":
+                    issued = await run_claim_burst(client, recorder, world, args.concurrency)
+                elif scenario == "verify":
+                    if not issued:
+                        issued = await run_claim_burst(client, Recorder(), world, args.concurrency)
+                    await run_verification_storm(client, recorder, issued, args.verifications,
+                                                 args.concurrency, args.unknown_share)
+                elif scenario == "mint":
+                    await run_batch_mint(client, recorder, world, args.concurrency)
+                wall_time = time.perf_counter() - start
+                report[scenario] = {"wall_time_s": round(wall_time, 3), "endpoints": summarize(recorder, wall_time)}
+                if not args.json:
+                    print_report(scenario, report[scenario]["endpoints"], wall_time)
+
+    report["crossmint_responses"] = {str(status): count for status, count in sorted(crossmint.responses.items())}
+    report["database_calls"] = dict(db.calls.most_common(10))
+    report["index_rejections"] = server.certificate_index.rejections
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Drive claim/verify/mint load against in-process fake services")
+    parser.add_argument("--scenario", choices=["all", "claim", "verify", "mint"], default="all")
+    parser.add_argument("--students", type=int, default=200, help="Claims in the cohort burst")
+    parser.add_argument("--verifications", type=int, default=2000)
+    parser.add_argument("--unknown-share", type=float, default=0.1, help="Share of verifications for never-issued IDs")
+    parser.add_argument("--mints", type=int, default=50, help="Certificates in the batch mint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--crossmint-latency-ms", type=float, default=250.0)
+    parser.add_argument("--crossmint-error-rate", type=float, default=0.0)
+    parser.add_argument("--crossmint-429-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\nCrossmint responses: {report['crossmint_responses']}")
+        print(f"Unknown IDs rejected by the certificate index: {report['index_rejections']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Circuit breakers for the Crossmint and Supabase dependencies
+
+A breaker opens after `failure_threshold` consecutive failures (errors, 5xx/429
+responses, or calls slower than `slow_call_threshold`) and then rejects calls
+immediately with CircuitOpenError instead of letting every request wait for a
+timeout. After `recovery_timeout` it lets `half_open_max_calls` probe calls
+through: a successful probe closes it, a failed one opens it again.
+
+Supabase calls are guarded at the HTTP level: create_breaker_http_client()
+builds the httpx client handed to the Supabase client, so every PostgREST and
+storage request goes through the breaker without touching call sites.
+"""
+import threading
+import time
+from typing import Optional
+
+from metrics import record_breaker_rejection, record_breaker_transition
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, slow_call_threshold: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_threshold = slow_call_threshold
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.calls = 0
+        self.failures = 0
+        self.rejections = 0
+        self.last_failure: Optional[str] = None
+        self.last_state_change = time.time()
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        self.state = state
+        self.last_state_change = time.time()
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state == HALF_OPEN:
+            self.half_open_calls = 0
+        record_breaker_transition(self.name, state)
+        print(f"Circuit breaker {self.name}: {state}")
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """True if a call may proceed now (it must then be reported via record_success/record_failure)"""
+        with self._lock:
+            if self.state == OPEN and self.retry_after() <= 0:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                self.calls += 1
+                return True
+            if self.state == HALF_OPEN and self.half_open_calls < self.half_open_max_calls:
+                self.half_open_calls += 1
+                self.calls += 1
+                return True
+            self.rejections += 1
+        record_breaker_rejection(self.name)
+        return False
+
+    def before_call(self):
+        """allow(), raising CircuitOpenError instead of returning False"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, max(1.0, self.retry_after()))
+
+    def record_success(self, duration: Optional[float] = None):
+        if self.slow_call_threshold is not None and duration is not None and duration > self.slow_call_threshold:
+            self.record_failure(f"slow call ({duration:.1f}s)")
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self, reason: str = ""):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_failure = reason
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "retry_after": round(self.retry_after(), 1),
+                "consecutive_failures": self.consecutive_failures,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejections": self.rejections,
+                "last_failure": self.last_failure,
+                "last_state_change": self.last_state_change,
+            }
+
+
+def is_failure_status(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+def create_breaker_http_client(breaker: CircuitBreaker, timeout: float):
+    """Synchronous httpx client whose every request is guarded by `breaker`"""
+    import httpx
+
+    class BreakerTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            breaker.before_call()
+            started = time.monotonic()
+            try:
+                response = super().handle_request(request)
+            except Exception as e:
+                breaker.record_failure(f"{type(e).__name__}: {e}")
+                raise
+            if is_failure_status(response.status_code):
+                breaker.record_failure(f"HTTP {response.status_code}")
+            else:
+                breaker.record_success(time.monotonic() - started)
+            return response
+
+    return httpx.Client(transport=BreakerTransport(), timeout=timeout, follow_redirects=True)
@@ -0,0 +1,211 @@
+"""
+Caches shared by the API endpoints
+
+LRUCache is per process. TieredCache puts an LRUCache in front of a backend
+that every worker process can reach (SQLite on shared memory, or Redis), so
+values computed by one worker are reused by the others.
+"""
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry TTL (seconds)"""
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteCacheBackend:
+    """
+    Shared L2 in a SQLite file. With the file on /dev/shm every worker on the
+    host reads and writes the same entries at memory speed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at))
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisCacheBackend:
+    """Shared L2 in Redis (or any Redis-compatible server); needs the optional `redis` package"""
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+def create_shared_backend():
+    """
+    L2 backend from the environment: SHARED_CACHE_BACKEND=redis|sqlite|none.
+    Defaults to Redis when REDIS_URL is set, otherwise a SQLite file on /dev/shm.
+    """
+    kind = os.getenv("SHARED_CACHE_BACKEND") or ("redis" if os.getenv("REDIS_URL") else "sqlite")
+    try:
+        if kind == "redis":
+            return RedisCacheBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        if kind == "sqlite":
+            default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            return SqliteCacheBackend(os.getenv("SHARED_CACHE_PATH", os.path.join(default_dir, "certichain-cache.sqlite3")))
+    except Exception as e:
+        print(f"Shared cache backend '{kind}' unavailable, using per-process caches: {e}")
+    return None
+
+
+class TieredCache:
+    """
+    Per-process LRU (L1) in front of a backend shared by all workers (L2).
+
+    Values are pickled into L2, so only trusted cache servers should be used.
+    L1 entries live at most `l1_ttl` seconds, which bounds how long a worker
+    can serve a value another worker has since deleted from L2.
+    """
+
+    def __init__(self, namespace: str, backend=None, maxsize: int = 10000,
+                 ttl: Optional[float] = None, l1_ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.l1 = LRUCache(maxsize=maxsize, ttl=l1_ttl or ttl)
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.l1.get(key)
+        if value is not None:
+            self.l1_hits += 1
+            return value
+        if self.backend is not None:
+            try:
+                raw = self.backend.get(self._key(key))
+            except Exception as e:
+                print(f"Shared cache read failed ({self.namespace}): {e}")
+                raw = None
+            if raw is not None:
+                value = pickle.loads(raw)
+                self.l1.set(key, value)
+                self.l2_hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def get_local(self, key: Hashable, default: Any = None) -> Any:
+        """L1 only: never touches the shared backend, so it is safe on the event loop"""
+        value = self.l1.get(key)
+        return default if value is None else value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self.l1.set(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(self._key(key), pickle.dumps(value), ttl if ttl is not None else self.ttl)
+            except Exception as e:
+                print(f"Shared cache write failed ({self.namespace}): {e}")
+
+    def delete(self, key: Hashable):
+        self.l1.delete(key)
+        if self.backend is not None:
+            try:
+                self.backend.delete(self._key(key))
+            except Exception as e:
+                print(f"Shared cache delete failed ({self.namespace}): {e}")
+
+    def __len__(self) -> int:
+        return len(self.l1)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "l1_size": len(self.l1),
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,215 @@
+"""
+In-memory index of issued and revoked certificate IDs
+
+A Bloom filter over every issued certificate_id lets the verify endpoint reject
+IDs that were never issued without a database round trip, and a plain set of
+revoked IDs answers revocation checks in O(1). Both are built once at startup
+by paging through the certificates table, and updated on mint, claim and
+revocation in this process.
+
+Changes made by other workers are picked up by refresh() every
+refresh_interval: it reads only the rows whose updated_at (maintained by a
+trigger) moved since the previous sync, through idx_certificates_updated_at.
+A full rebuild happens only every rebuild_interval, jittered so the workers
+of a deployment do not rescan the table together, or early when the filter
+has filled up to the capacity it was sized for.
+
+Another worker may issue a certificate after this process last synced.
+Certificate IDs embed their creation time, so IDs newer than the sync
+watermark always fall through to the database instead of being rejected.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Optional, Set
+
+from ids import certificate_id_timestamp_ms
+from pagination import keyset_page, page_result, MAX_PAGE_SIZE
+
+# IDs created this close to (or after) the sync start are never rejected, and
+# refreshes re-read rows updated this long before the previous one started
+WATERMARK_SKEW_MS = 60_000
+# Rebuilds are spread over +-REBUILD_JITTER of rebuild_interval
+REBUILD_JITTER = 0.2
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class CertificateIndex:
+    def __init__(self, client_factory: Callable[[], Any], error_rate: float = 0.001,
+                 refresh_interval: float = 60.0, rebuild_interval: float = 86400.0):
+        self.client_factory = client_factory
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+
+        self.bloom: Optional[BloomFilter] = None
+        self.revoked: Set[str] = set()
+        self.watermark_ms = 0
+        self.built_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+        self.rebuilds = 0
+        self.refreshes = 0
+        self.rejections = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.bloom is not None
+
+    def might_exist(self, certificate_id: str) -> bool:
+        """False only if the certificate_id was definitely never issued"""
+        if self.bloom is None:
+            return True
+        created_ms = certificate_id_timestamp_ms(certificate_id)
+        if created_ms is not None and created_ms >= self.watermark_ms:
+            return True
+        if certificate_id in self.bloom:
+            return True
+        self.rejections += 1
+        return False
+
+    def is_revoked(self, certificate_id: str) -> bool:
+        return certificate_id in self.revoked
+
+    def add(self, certificate_id: str):
+        if self.bloom is not None and certificate_id not in self.bloom:
+            self.bloom.add(certificate_id)
+
+    def mark_revoked(self, certificate_id: str):
+        self.revoked.add(certificate_id)
+
+    def unmark_revoked(self, certificate_id: str):
+        self.revoked.discard(certificate_id)
+
+    def _iter_certificates(self, updated_since: Optional[str] = None) -> Iterable[dict]:
+        sort_column = "updated_at" if updated_since else "created_at"
+        cursor = None
+        while True:
+            query = self.client_factory().table("certificates").select(f"id, certificate_id, status, {sort_column}")
+            if updated_since:
+                query = query.gte("updated_at", updated_since)
+            rows = keyset_page(query, MAX_PAGE_SIZE, cursor, sort_column).execute().data or []
+            page = page_result(rows, MAX_PAGE_SIZE, sort_column)
+            yield from page["items"]
+            if not page["has_more"]:
+                return
+            cursor = page["next_cursor"]
+
+    def build(self):
+        """Full rebuild; swaps the new structures in only once complete"""
+        started_ms = int(time.time() * 1000)
+        issued, revoked = [], set()
+        for row in self._iter_certificates():
+            # Rows created ahead of minting have no certificate_id yet
+            if not row.get("certificate_id"):
+                continue
+            issued.append(row["certificate_id"])
+            if row.get("status") == "revoked":
+                revoked.add(row["certificate_id"])
+
+        # Room to grow until the next rebuild without degrading the error rate
+        bloom = BloomFilter(max(len(issued) * 2, 100_000), self.error_rate)
+        for certificate_id in issued:
+            bloom.add(certificate_id)
+
+        # Keep revocations that raced with the rebuild
+        revoked |= self.revoked
+        self.bloom = bloom
+        self.revoked = revoked
+        self.watermark_ms = started_ms - WATERMARK_SKEW_MS
+        self.built_at = self.refreshed_at = time.time()
+        self.rebuilds += 1
+
+    def refresh(self):
+        """Apply the certificates created or updated since the last build or refresh"""
+        if self.bloom is None:
+            self.build()
+            return
+        started_ms = int(time.time() * 1000)
+        since = datetime.fromtimestamp(self.watermark_ms / 1000, timezone.utc).isoformat()
+        for row in self._iter_certificates(updated_since=since):
+            certificate_id = row.get("certificate_id")
+            if not certificate_id:
+                continue
+            self.add(certificate_id)
+            if row.get("status") == "revoked":
+                self.revoked.add(certificate_id)
+            else:
+                self.revoked.discard(certificate_id)
+        self.watermark_ms = started_ms - WATERMARK_SKEW_MS
+        self.refreshed_at = time.time()
+        self.refreshes += 1
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """The filter holds as many IDs as it was sized for; more would raise its error rate"""
+        return self.bloom is None or self.bloom.count >= self.bloom.capacity
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "issued": self.bloom.count if self.bloom else 0,
+            "revoked": len(self.revoked),
+            "bloom_bytes": len(self.bloom.bits) if self.bloom else 0,
+            "rejections": self.rejections,
+            "built_at": self.built_at,
+            "refreshed_at": self.refreshed_at,
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+        }
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _next_rebuild(self) -> float:
+        return time.monotonic() + self.rebuild_interval * random.uniform(1 - REBUILD_JITTER, 1 + REBUILD_JITTER)
+
+    async def _run(self):
+        rebuild_at = 0.0
+        while True:
+            try:
+                if self.needs_rebuild or time.monotonic() >= rebuild_at:
+                    await asyncio.to_thread(self.build)
+                    rebuild_at = self._next_rebuild()
+                else:
+                    await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Certificate index refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,158 @@
+"""
+Response compression for JSON and NDJSON bodies
+
+Only API documents are worth compressing: certificate downloads are PDF, ZIP
+and JPEG payloads that are already compressed, and they are served with Range
+support, which a content-encoding would break (a 206 body must be a byte range
+of the identity representation). CompressionMiddleware therefore compresses a
+response only if its media type is in COMPRESSIBLE_TYPES, it is not a partial
+response and nothing upstream encoded it. It uses brotli when the optional
+`brotli` package is installed and the client accepts it, gzip otherwise.
+Streamed bodies (NDJSON exports) are flushed per chunk so lines still arrive
+as they are produced.
+
+Each encoding is a representation of its own: an encoded response gets its
+ETag suffixed with the encoding ("<tag>-gzip"), so the strong validator of
+the identity body is never reused for other bytes. Every response of a
+compressible type carries Vary: Accept-Encoding, compressed or not, so a
+shared cache never hands one client's variant to another.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson")
+# Never compressed, whatever the media type
+SKIPPED_STATUSES = (204, 206, 304)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """"br" or "gzip" if the client accepts it (q=0 excluded), else None"""
+    accepted = set()
+    for token in accept_encoding.split(","):
+        name, _, params = token.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def has_compressible_type(headers: Headers) -> bool:
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES
+
+
+def is_compressible(status: int, headers: Headers) -> bool:
+    if status in SKIPPED_STATUSES or "content-encoding" in headers or "content-range" in headers:
+        return False
+    return has_compressible_type(headers)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the `encoding`-encoded representation: '"abc"' -> '"abc-gzip"' (weakness kept)"""
+    prefix = "W/" if etag.startswith("W/") else ""
+    tag = etag[len(prefix):]
+    if len(tag) >= 2 and tag.startswith('"') and tag.endswith('"'):
+        return f'{prefix}{tag[:-1]}-{encoding}"'
+    return f"{prefix}{tag}-{encoding}"
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1000, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                if has_compressible_type(headers) and "content-encoding" not in headers:
+                    # Whether or not this response gets encoded, its type has encoded variants
+                    headers.add_vary_header("Accept-Encoding")
+                    message = {**message, "headers": headers.raw}
+                start = message
+                passthrough = encoding is None or not is_compressible(message["status"], headers)
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = self._encoder(encoding)
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                compressed = encoder.compress(body, final=not more_body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(compressed))
+                start["headers"] = headers.raw
+                await send(start)
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+                return
+            await send({"type": "http.response.body", "body": encoder.compress(body, final=not more_body),
+                        "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
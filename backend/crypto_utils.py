@@ -0,0 +1,107 @@
+"""
+Canonical payload, hashing and signing helpers
+
+Kept free of app/database imports so offline tools (verify_offline.py) can use
+exactly the same logic as the API. eth_account takes about a second to import,
+so it is loaded on first use rather than when the API process starts.
+
+Canonical payloads are compact JSON with object keys sorted at every depth, no
+insignificant whitespace and strings as UTF-8 rather than \\u escapes. This is
+not RFC 8785 (JCS), whose number serialization it does not implement: values
+are restricted to strings, integers within 64 bits, booleans, null, lists and
+objects with string keys, for which orjson and the json fallback produce the
+same bytes. Floats are rejected rather than encoded differently by each. The
+exact string is stored at mint (certificates.canonical_payload_text) and
+verification hashes that string as-is. Certificates minted before that column
+existed were signed over legacy_canonical_payload() and are checked against
+both encodings.
+"""
+import json
+from typing import Any, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson only encodes integers in this range; json would encode any
+INT_MIN, INT_MAX = -(2 ** 63), 2 ** 64 - 1
+
+
+def check_canonical_value(value: Any):
+    """Raise ValueError for anything orjson and json could encode differently (or not at all)"""
+    if value is None or isinstance(value, (str, bool)):
+        return
+    if isinstance(value, int):
+        if not INT_MIN <= value <= INT_MAX:
+            raise ValueError(f"Integer {value} is out of range for a canonical payload")
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise ValueError(f"Canonical payload keys must be strings, not {type(key).__name__}")
+            check_canonical_value(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            check_canonical_value(item)
+    else:
+        raise ValueError(f"Canonical payloads cannot contain {type(value).__name__} values")
+
+
+def canonical_json(data: Any) -> str:
+    check_canonical_value(data)
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode()
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def create_canonical_payload(data: dict) -> str:
+    return canonical_json(data)
+
+
+def legacy_canonical_payload(data: dict) -> str:
+    """Original encoding: only top-level keys sorted, non-ASCII escaped"""
+    sorted_keys = sorted(data.keys())
+    return json.dumps({k: data[k] for k in sorted_keys}, separators=(',', ':'))
+
+
+def canonical_payload_candidates(data: dict) -> List[str]:
+    """Encodings a stored payload dict may have been signed over, current first"""
+    legacy = legacy_canonical_payload(data)
+    try:
+        current = create_canonical_payload(data)
+    except ValueError:
+        # e.g. a float in an old payload: it can only have been signed over the legacy encoding
+        return [legacy]
+    return [current] if current == legacy else [current, legacy]
+
+
+def hash_message(message: str) -> str:
+    from eth_utils import keccak
+    return keccak(text=message).hex()
+
+
+def sign_message(message: str, private_key: str) -> str:
+    from eth_account import Account
+    return sign_message_with_account(message, Account.from_key(private_key))
+
+
+def sign_message_with_account(message: str, account) -> str:
+    """sign_message for an already derived LocalAccount (saves the key derivation)"""
+    from eth_account.messages import encode_defunct
+    message_hash = encode_defunct(text=message)
+    signed_message = account.sign_message(message_hash)
+    return signed_message.signature.hex()
+
+
+def verify_signature(message: str, signature: str, expected_address: str) -> bool:
+    try:
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+        message_hash = encode_defunct(text=message)
+        recovered_address = Account.recover_message(message_hash, signature=signature)
+        return recovered_address.lower() == expected_address.lower()
+    except Exception as e:
+        print(f"Signature verification failed: {e}")
+        return False
+
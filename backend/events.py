@@ -0,0 +1,144 @@
+"""
+Certificate status-change notifications
+
+Revocation and reissue publish a message on CERTIFICATE_STATUS_CHANNEL; every
+component that caches certificate state (verification responses, the revoked
+ID set, ...) subscribes and drops or updates its entry. Publishers and
+subscribers only depend on the publish/subscribe interface, so the in-memory
+LocalPubSub can be swapped for RedisPubSub, which reaches the other workers,
+without touching either side.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+CERTIFICATE_STATUS_CHANNEL = "certificate.status"
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class LocalPubSub:
+    """In-process pub/sub: publish() runs every subscriber of the channel synchronously"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Handler]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.failures = 0
+
+    def subscribe(self, channel: str, handler: Handler):
+        with self._lock:
+            self._subscribers[channel].append(handler)
+
+    def unsubscribe(self, channel: str, handler: Handler):
+        with self._lock:
+            if handler in self._subscribers[channel]:
+                self._subscribers[channel].remove(handler)
+
+    def deliver(self, channel: str, message: Dict[str, Any]):
+        with self._lock:
+            handlers = list(self._subscribers[channel])
+        for handler in handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                self.failures += 1
+                print(f"Subscriber for {channel} failed: {e}")
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        self.published += 1
+        self.deliver(channel, message)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = {channel: len(handlers) for channel, handlers in self._subscribers.items()}
+        return {"backend": "local", "published": self.published, "failures": self.failures, "subscribers": subscribers}
+
+
+class RedisPubSub(LocalPubSub):
+    """
+    Pub/sub across worker processes over Redis channels (optional `redis` package).
+
+    Messages are delivered to local subscribers immediately on publish; a
+    listener thread delivers messages published by other processes.
+    """
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.origin = uuid.uuid4().hex
+        self.received = 0
+        self._pubsub = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        super().publish(channel, message)
+        try:
+            self.client.publish(channel, json.dumps({"origin": self.origin, "message": message}))
+        except Exception as e:
+            self.failures += 1
+            print(f"Publishing to {channel} failed: {e}")
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            try:
+                item = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as e:
+                print(f"Pub/sub listener error: {e}")
+                self._stopping.wait(1.0)
+                continue
+            if not item or item.get("type") != "message":
+                continue
+            envelope = json.loads(item["data"])
+            if envelope.get("origin") == self.origin:
+                continue
+            self.received += 1
+            channel = item["channel"].decode() if isinstance(item["channel"], bytes) else item["channel"]
+            self.deliver(channel, envelope["message"])
+
+    async def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            channels = list(self._subscribers)
+        self._pubsub = self.client.pubsub()
+        if channels:
+            self._pubsub.subscribe(*channels)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="redis-pubsub", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout=2.0)
+        self._pubsub.close()
+        self._thread = None
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({"backend": "redis", "received": self.received})
+        return stats
+
+
+def create_pubsub():
+    """RedisPubSub when REDIS_URL is set (and redis is installed), otherwise LocalPubSub"""
+    url = os.getenv("REDIS_URL")
+    if url:
+        try:
+            return RedisPubSub(url)
+        except Exception as e:
+            print(f"Redis pub/sub unavailable, status changes stay in-process: {e}")
+    return LocalPubSub()
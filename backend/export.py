@@ -0,0 +1,126 @@
+"""
+Streaming group exports (ZIP or NDJSON)
+
+Certificates are read page by page with keyset cursors, certificate images for
+a page are downloaded concurrently, and output is produced incrementally: the
+ZIP writer drains its buffer after every entry (zipfile writes data
+descriptors when the target is not seekable), so neither format ever holds
+more than one page in memory.
+"""
+import asyncio
+import json
+import zipfile
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from pagination import encode_cursor, keyset_page
+
+EXPORT_COLUMNS = (
+    "id, certificate_id, status, canonical_payload, certificate_hash, issuer_signature, "
+    "nft_id, token_id, contract_address, blockchain_tx, recipient_wallet, ipfs_url, "
+    "verification_url, issued_at, created_at"
+)
+EXPORT_PAGE_SIZE = 25
+IMAGE_FETCH_CONCURRENCY = 8
+
+
+class _StreamSink:
+    """Write-only, unseekable file object that hands out what was written so far"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def certificate_record(cert: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "certificate_id": cert.get("certificate_id"),
+        "status": cert.get("status"),
+        "canonical_payload": cert.get("canonical_payload"),
+        "certificate_hash": cert.get("certificate_hash"),
+        "issuer_signature": cert.get("issuer_signature"),
+        "nft": {
+            "nft_id": cert.get("nft_id"),
+            "token_id": cert.get("token_id"),
+            "contract_address": cert.get("contract_address"),
+            "transaction_hash": cert.get("blockchain_tx"),
+            "recipient_wallet": cert.get("recipient_wallet"),
+        },
+        "image_url": cert.get("ipfs_url"),
+        "verification_url": cert.get("verification_url"),
+        "issued_at": cert.get("issued_at"),
+    }
+
+
+async def iter_certificate_pages(client_factory: Callable[[], Any], group_id: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    cursor: Optional[str] = None
+    while True:
+        def fetch():
+            query = client_factory().table("certificates").select(EXPORT_COLUMNS).eq("group_id", group_id)
+            return keyset_page(query, EXPORT_PAGE_SIZE, cursor).execute().data or []
+
+        rows = await asyncio.to_thread(fetch)
+        page = rows[:EXPORT_PAGE_SIZE]
+        if page:
+            yield page
+        if len(rows) <= EXPORT_PAGE_SIZE:
+            return
+        cursor = encode_cursor(page[-1].get("created_at"), page[-1]["id"])
+
+
+async def fetch_images(http: "httpx.AsyncClient", urls: List[Optional[str]]) -> List[Optional[bytes]]:
+    import httpx
+
+    semaphore = asyncio.Semaphore(IMAGE_FETCH_CONCURRENCY)
+
+    async def fetch(url: Optional[str]) -> Optional[bytes]:
+        if not url or not url.startswith("http"):
+            return None
+        async with semaphore:
+            try:
+                response = await http.get(url)
+                return response.content if response.status_code == 200 else None
+            except httpx.HTTPError:
+                return None
+
+    return await asyncio.gather(*(fetch(url) for url in urls))
+
+
+async def stream_ndjson(client_factory: Callable[[], Any], group_id: str) -> AsyncIterator[bytes]:
+    async for page in iter_certificate_pages(client_factory, group_id):
+        yield b"".join(json.dumps(certificate_record(cert), default=str).encode() + b"\n" for cert in page)
+
+
+async def stream_zip(client_factory: Callable[[], Any], group_id: str) -> AsyncIterator[bytes]:
+    import httpx
+
+    sink = _StreamSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+    count = 0
+    async with httpx.AsyncClient(timeout=30.0) as http:
+        async for page in iter_certificate_pages(client_factory, group_id):
+            images = await fetch_images(http, [cert.get("ipfs_url") for cert in page])
+            for cert, image in zip(page, images):
+                certificate_id = cert.get("certificate_id") or cert["id"]
+                archive.writestr(
+                    f"certificates/{certificate_id}.json",
+                    json.dumps(certificate_record(cert), indent=2, default=str),
+                )
+                if image is not None:
+                    # JPEGs are already compressed
+                    archive.writestr(f"images/{certificate_id}.jpg", image, compress_type=zipfile.ZIP_STORED)
+                count += 1
+                yield sink.drain()
+    archive.writestr("README.txt", f"CertiChain export of group {group_id}: {count} certificates\n")
+    archive.close()
+    yield sink.drain()
@@ -0,0 +1,35 @@
+"""
+Multi-worker deployment
+
+    gunicorn -c gunicorn.conf.py server:app
+
+One uvicorn worker per core by default (WEB_CONCURRENCY overrides). Each worker
+runs its own background tasks (verification log writer, rollups, certificate
+index); caches are shared through the L2 backend from cache.create_shared_backend()
+and status changes reach every worker over Redis pub/sub when REDIS_URL is set.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8001")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Minting waits on Crossmint, so allow slow requests
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# Leave time for the shutdown hooks to flush queued verification logs
+graceful_timeout = 30
+keepalive = 5
+
+# Workers import the app themselves so every worker opens its own connections
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+
+def child_exit(server, worker):
+    # Drop a dead worker's live gauges from the aggregated /metrics view
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
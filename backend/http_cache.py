@@ -0,0 +1,107 @@
+"""
+HTTP caching for certificate resources
+
+Minted certificates only change when they are revoked, so their representations
+get strong ETags derived from certificate_hash (plus the fields that can still
+move: status and NFT id) and a lifetime short enough that shared caches pick up
+a revocation within minutes; revalidation is a cheap 304. Pending certificates
+are cached only briefly because minting will update them.
+ConditionalGetMiddleware turns any 200 GET response whose ETag matches
+If-None-Match into a bodiless 304.
+"""
+import hashlib
+from typing import Dict, Optional
+
+# Cache-Control per certificate state
+CACHE_CONTROL_MINTED = "public, max-age=300, stale-while-revalidate=60"
+CACHE_CONTROL_PENDING = "public, max-age=30"
+CACHE_CONTROL_NOT_FOUND = "public, max-age=60"
+# QR images only encode the verification URL, which never changes
+CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def is_final(cert: dict) -> bool:
+    """Minted with a real NFT id (or revoked), so only a status change can alter it"""
+    nft_id = cert.get("nft_id") or ""
+    return (
+        cert.get("status") in ("minted", "valid", "revoked")
+        and bool(nft_id)
+        and not nft_id.startswith("pending")
+        and not nft_id.startswith("error")
+        and not nft_id.startswith("queued")
+    )
+
+
+def certificate_etag(cert: dict, variant: str = "") -> str:
+    """Strong ETag for one representation (`variant`) of a certificate"""
+    parts = [
+        cert.get("certificate_hash") or cert.get("certificate_id") or "",
+        cert.get("status") or "",
+        cert.get("nft_id") or "",
+        variant,
+    ]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+
+def cache_control_for(cert: dict) -> str:
+    return CACHE_CONTROL_MINTED if is_final(cert) else CACHE_CONTROL_PENDING
+
+
+def cache_headers(cert: dict, variant: str = "") -> Dict[str, str]:
+    return {
+        "ETag": f'"{certificate_etag(cert, variant)}"',
+        "Cache-Control": cache_control_for(cert),
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+class ConditionalGetMiddleware:
+    """Answer If-None-Match hits with 304 for any GET/HEAD response carrying an ETag"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+                break
+        if if_none_match is None:
+            await self.app(scope, receive, send)
+            return
+
+        not_modified = False
+
+        async def send_wrapper(message):
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                headers = dict((k.lower(), v) for k, v in message.get("headers", []))
+                etag = headers.get(b"etag")
+                if message["status"] == 200 and etag and etag_matches(if_none_match, etag.decode("latin-1")):
+                    not_modified = True
+                    kept = [
+                        (k, v) for k, v in message.get("headers", [])
+                        if k.lower() in (b"etag", b"cache-control", b"vary", b"last-modified")
+                        or k.lower().startswith(b"access-control-")
+                    ]
+                    await send({"type": "http.response.start", "status": 304, "headers": kept})
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                    return
+                await send(message)
+            elif not not_modified:
+                await send(message)
+
+        await self.app(scope, receive, send_wrapper)
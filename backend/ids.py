@@ -0,0 +1,114 @@
+"""
+Certificate ID service
+
+IDs are ULID-style: 48 bits of millisecond timestamp followed by 80 bits of
+randomness, Crockford base32 encoded to 26 characters. Within the same
+millisecond the random part is incremented as a per-process sequence, so IDs
+generated by one process are strictly increasing and never collide, and IDs
+from different processes only collide if two 80-bit random draws match.
+
+Because the timestamp is the prefix, new certificate_id values land at the
+right edge of the unique index instead of at random pages.
+"""
+import os
+import secrets
+import string
+import threading
+import time
+from typing import List, Optional
+
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+CERTIFICATE_ID_PREFIX = "CERT-"
+JOIN_CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+_TIMESTAMP_BITS = 48
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+
+def encode_base32(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD_ALPHABET[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def decode_base32(text: str) -> int:
+    value = 0
+    for char in text.upper():
+        value = (value << 5) | CROCKFORD_ALPHABET.index(char)
+    return value
+
+
+class IdGenerator:
+    """Monotonic ULID generator, safe to share between threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._last_ms = -1
+        self._last_random = 0
+
+    def _next_values(self, count: int) -> List[int]:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                # Leave headroom so a bulk allocation never overflows the sequence
+                self._last_random = secrets.randbits(_RANDOM_BITS - 1) - 1
+            elif self._last_random + count > _RANDOM_MAX:
+                # Sequence exhausted for this millisecond: borrow the next one
+                self._last_ms += 1
+                self._last_random = secrets.randbits(_RANDOM_BITS - 1) - 1
+
+            start = self._last_random + 1
+            self._last_random += count
+            timestamp = self._last_ms << _RANDOM_BITS
+            return [timestamp | (start + i) for i in range(count)]
+
+    def new_ulid(self) -> str:
+        return encode_base32(self._next_values(1)[0], 26)
+
+    def allocate(self, count: int) -> List[str]:
+        """Reserve `count` consecutive IDs in one call (used by batch mints)"""
+        if count <= 0:
+            return []
+        return [encode_base32(value, 26) for value in self._next_values(count)]
+
+
+_generator = IdGenerator()
+
+# A forked worker must not continue the parent's sequence
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_generator._reset)
+
+
+def generate_certificate_id() -> str:
+    return f"{CERTIFICATE_ID_PREFIX}{_generator.new_ulid()}"
+
+
+def allocate_certificate_ids(count: int) -> List[str]:
+    return [f"{CERTIFICATE_ID_PREFIX}{ulid}" for ulid in _generator.allocate(count)]
+
+
+def generate_join_code(length: int = 8) -> str:
+    return "".join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(length))
+
+
+def certificate_id_timestamp_ms(certificate_id: str) -> Optional[int]:
+    """Creation time embedded in a certificate ID (ULID or legacy CERT-<unix>-XXXXXX), if any"""
+    if not certificate_id.startswith(CERTIFICATE_ID_PREFIX):
+        return None
+    body = certificate_id[len(CERTIFICATE_ID_PREFIX):]
+    if len(body) == 26:
+        try:
+            return decode_base32(body) >> _RANDOM_BITS
+        except ValueError:
+            return None
+    legacy_timestamp = body.split("-", 1)[0]
+    if legacy_timestamp.isdigit():
+        return int(legacy_timestamp) * 1000
+    return None
@@ -0,0 +1,140 @@
+"""
+Per-stage latency metrics for the mint and issue pipelines
+
+Every stage (DB lookups, QR generation, render, upload, signing, Crossmint,
+DB writes) is timed into the certichain_pipeline_stage_seconds histogram,
+labelled by pipeline, stage and outcome, and exposed in Prometheus text format
+by GET /metrics.
+
+With several gunicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so /metrics aggregates all workers instead of reporting whichever
+one answered the scrape.
+
+If the OpenTelemetry API is installed, each pipeline run and stage also becomes
+a span; without a configured SDK those spans are no-ops.
+"""
+import os
+import time
+from typing import Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer("certichain")
+except ImportError:
+    _tracer = None
+
+# Sub-millisecond signing up to minute-long Crossmint calls
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PIPELINE_SECONDS = Histogram(
+    "certichain_pipeline_seconds",
+    "End-to-end duration of a certificate pipeline run",
+    ["pipeline", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "certichain_pipeline_stage_seconds",
+    "Duration of one stage of a certificate pipeline",
+    ["pipeline", "stage", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+CROSSMINT_RESPONSES = Counter(
+    "certichain_crossmint_responses_total",
+    "Crossmint API responses by status code",
+    ["operation", "status"],
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "certichain_admission_rejections_total",
+    "Requests rejected by admission control",
+    ["route", "reason"],
+)
+
+BREAKER_TRANSITIONS = Counter(
+    "certichain_breaker_transitions_total",
+    "Circuit breaker state changes by dependency and new state",
+    ["dependency", "state"],
+)
+
+BREAKER_REJECTIONS = Counter(
+    "certichain_breaker_rejections_total",
+    "Calls rejected because a dependency's circuit was open",
+    ["dependency"],
+)
+
+
+class PipelineTimer:
+    """
+    Times consecutive stages of one pipeline run.
+
+    stage(name) closes the running stage (as "ok") and opens the next one, so
+    the numbered steps of an endpoint only need one call each; finish() closes
+    the last stage and the run with the given outcome. Timestamps are wall
+    clock, so stages that await I/O are measured correctly.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started = time.perf_counter()
+        self.current: Optional[str] = None
+        self.current_started = self.started
+        self.durations = {}
+        self._root_span = _tracer.start_span(f"{pipeline}.pipeline", attributes={"pipeline": pipeline}) if _tracer else None
+        self._span = None
+
+    def _close_stage(self, outcome: str):
+        if self.current is None:
+            return
+        duration = time.perf_counter() - self.current_started
+        STAGE_SECONDS.labels(self.pipeline, self.current, outcome).observe(duration)
+        self.durations[self.current] = self.durations.get(self.current, 0.0) + duration
+        if self._span is not None:
+            self._span.set_attribute("outcome", outcome)
+            self._span.end()
+            self._span = None
+        self.current = None
+
+    def stage(self, name: str):
+        self._close_stage("ok")
+        self.current = name
+        self.current_started = time.perf_counter()
+        if self._root_span is not None:
+            context = trace.set_span_in_context(self._root_span)
+            self._span = _tracer.start_span(f"{self.pipeline}.{name}", context=context,
+                                            attributes={"pipeline": self.pipeline, "stage": name})
+
+    def finish(self, outcome: str = "ok"):
+        self._close_stage(outcome)
+        PIPELINE_SECONDS.labels(self.pipeline, outcome).observe(time.perf_counter() - self.started)
+        if self._root_span is not None:
+            self._root_span.set_attribute("outcome", outcome)
+            self._root_span.end()
+            self._root_span = None
+
+
+def record_crossmint_response(operation: str, status_code: int):
+    CROSSMINT_RESPONSES.labels(operation, str(status_code)).inc()
+
+
+def record_admission_rejection(route: str, reason: str):
+    ADMISSION_REJECTIONS.labels(route, reason).inc()
+
+
+def record_breaker_transition(dependency: str, state: str):
+    BREAKER_TRANSITIONS.labels(dependency, state).inc()
+
+
+def record_breaker_rejection(dependency: str):
+    BREAKER_REJECTIONS.labels(dependency).inc()
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Exposition-format payload for /metrics"""
+    registry: Optional[CollectorRegistry] = None
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return (generate_latest(registry) if registry is not None else generate_latest()), CONTENT_TYPE_LATEST
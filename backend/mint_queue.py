@@ -0,0 +1,178 @@
+"""
+Durable queue of deferred Crossmint mints
+
+While the Crossmint breaker is open, or when a mint fails with a retryable
+error, the certificate is still rendered, signed and stored; only the NFT mint
+is deferred. The job (the mint_nft_crossmint arguments) goes into a SQLite file
+so it survives restarts, and every worker's drain task retries due jobs with
+exponential backoff once Crossmint accepts calls again. Workers claim jobs by
+pushing their next attempt time out (a lease) inside an IMMEDIATE transaction,
+so two workers never mint the same certificate concurrently.
+
+A successful mint is saved on the job before the certificate row is updated,
+so a database failure after minting retries only the update, never the mint.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+QUEUED_NFT_PREFIX = "queued-"
+
+
+class MintQueue:
+    def __init__(self, path: str, handler: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+                 interval: float = 5.0, batch_size: int = 10, base_delay: float = 15.0,
+                 max_delay: float = 900.0, max_attempts: int = 12, lease: float = 120.0):
+        self.path = path
+        self.handler = handler
+        self.interval = interval
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self._local = threading.local()
+        self._task: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.dropped = 0
+        # The file is opened on first use (start(), or an enqueue()/stats() before it), never
+        # at construction: server.py builds the queue at import time, before workers fork
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                self._create_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS mint_jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " certificate_id TEXT UNIQUE NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_mint_jobs_due ON mint_jobs(next_attempt_at)")
+        self._schema_ready = True
+
+    def enqueue(self, certificate_id: str, payload: Dict[str, Any], delay: float = 0.0):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR IGNORE INTO mint_jobs (certificate_id, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+            (certificate_id, json.dumps(payload), now + delay, now),
+        )
+
+    def claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        """Due jobs, leased to the caller until complete()/retry() or the lease runs out"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, certificate_id, payload, attempts FROM mint_jobs"
+                " WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany("UPDATE mint_jobs SET next_attempt_at = ? WHERE id = ?",
+                             [(now + self.lease, row[0]) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [{"id": row[0], "certificate_id": row[1], "payload": json.loads(row[2]), "attempts": row[3]}
+                for row in rows]
+
+    def complete(self, job_id: int, dropped: bool = False):
+        """Remove a finished job; `dropped` counts it as given up on rather than minted"""
+        self._connection().execute("DELETE FROM mint_jobs WHERE id = ?", (job_id,))
+        if dropped:
+            self.dropped += 1
+        else:
+            self.completed += 1
+
+    def save_result(self, job: Dict[str, Any], result: Dict[str, Any]):
+        job["payload"]["result"] = result
+        self._connection().execute("UPDATE mint_jobs SET payload = ? WHERE id = ?",
+                                   (json.dumps(job["payload"]), job["id"]))
+
+    def retry(self, job: Dict[str, Any], error: str) -> bool:
+        """Schedule the next attempt with backoff
+
+        False once attempts run out: the job is left as it is, and the caller records the
+        failure and calls complete(job_id, dropped=True).
+        """
+        attempts = job["attempts"] + 1
+        if attempts >= self.max_attempts:
+            return False
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        self._connection().execute(
+            "UPDATE mint_jobs SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (attempts, time.time() + delay, error[:500], job["id"]),
+        )
+        return True
+
+    def postpone(self, job: Dict[str, Any], delay: float):
+        """Release a leased job without counting an attempt (the breaker was open)"""
+        self._connection().execute("UPDATE mint_jobs SET next_attempt_at = ? WHERE id = ?",
+                                   (time.time() + delay, job["id"]))
+
+    def stats(self) -> dict:
+        row = self._connection().execute(
+            "SELECT COUNT(*), MIN(created_at), SUM(CASE WHEN next_attempt_at <= ? THEN 1 ELSE 0 END), MAX(attempts)"
+            " FROM mint_jobs", (time.time(),)
+        ).fetchone()
+        count, oldest, due, max_attempts = row
+        return {
+            "path": self.path,
+            "queued": count,
+            "due": due or 0,
+            "oldest_age_s": round(time.time() - oldest, 1) if oldest else None,
+            "max_attempts_so_far": max_attempts or 0,
+            "completed": self.completed,
+            "dropped": self.dropped,
+        }
+
+    async def drain(self):
+        jobs = await asyncio.to_thread(self.claim_due, self.batch_size)
+        for job in jobs:
+            try:
+                await self.handler(job)
+            except Exception as e:
+                print(f"Mint job for {job['certificate_id']} failed: {e}")
+                if not self.retry(job, str(e)):
+                    self.complete(job["id"], dropped=True)
+
+    async def start(self):
+        # Open (or create) the file now, so a bad MINT_QUEUE_PATH fails at startup, not on the first deferred mint
+        await asyncio.to_thread(self._connection)
+        if self._task is None and self.handler is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                print(f"Mint queue drain failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,68 @@
+"""
+Keyset (cursor) pagination helpers for PostgREST queries
+
+Pages are ordered by (sort column DESC, id DESC). The cursor is the sort value
+and id of the last row of the previous page, so each page is an index range
+scan instead of an OFFSET that re-reads every earlier row.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_value: Any, row_id: str) -> str:
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, str(row_id)
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _quote(value: Any) -> str:
+    # PostgREST reserved characters inside or=(...) need double quoting
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_page(query, limit: int, cursor: Optional[str] = None, sort_column: str = "created_at"):
+    """Apply ordering, the cursor predicate and limit+1 to a PostgREST select builder"""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.or_(
+            f"{sort_column}.lt.{_quote(sort_value)},"
+            f"and({sort_column}.eq.{_quote(sort_value)},id.lt.{_quote(row_id)})"
+        )
+    # One extra row tells us whether there is a next page without counting
+    return query.order(sort_column, desc=True).order("id", desc=True).limit(limit + 1)
+
+
+def page_result(rows: List[Dict[str, Any]], limit: int, sort_column: str = "created_at",
+                estimated_total: Optional[int] = None) -> Dict[str, Any]:
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1].get(sort_column), items[-1]["id"]) if has_more and items else None
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "estimated_total": estimated_total,
+    }
@@ -0,0 +1,216 @@
+"""
+Certificate PDF engine
+
+PDFs are rendered once per (certificate_hash, render version) into an on-disk
+cache and served straight from the file with ETag and single byte-range
+support. The render version is the template asset fingerprint, so a new
+template image or layout renders a new PDF instead of serving the old one.
+The cache directory (often tmpfs) is bounded: each process keeps an LRU index
+of the files it rendered or served and deletes the least recently used ones
+once they exceed max_bytes. Rendering embeds the composited certificate image
+(template + fields + QR) as a full page; certificates without a template get
+the plain text layout.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from io import BytesIO
+from typing import AsyncContextManager, Callable, Dict, Iterator, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+# Landscape US letter width in points (11 in); the page height follows the image's aspect ratio
+PDF_PAGE_WIDTH = 792
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_HEX_RE = re.compile(r"^[0-9a-fA-F]+$")
+
+
+class PdfCache:
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # path -> size, least recently used first
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._index_lock = threading.Lock()
+        self.evictions = 0
+        # Files left by an earlier run count against the budget, oldest first
+        existing = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                existing.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(existing):
+            self._track(path, size)
+        self._evict()
+
+    def path_for(self, certificate_hash: str, version: str = "") -> str:
+        key = certificate_hash[2:] if certificate_hash.startswith("0x") else certificate_hash
+        if not key or not _HEX_RE.match(key):
+            key = hashlib.sha256(certificate_hash.encode()).hexdigest()
+        suffix = f"-{version}" if version else ""
+        return os.path.join(self.directory, f"{key.lower()}{suffix}.pdf")
+
+    def _track(self, path: str, size: Optional[int] = None):
+        with self._index_lock:
+            if path in self._files:
+                self._files.move_to_end(path)
+                return
+            if size is None:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    return
+            self._files[path] = size
+            self._bytes += size
+
+    def _evict(self, keep: Optional[str] = None):
+        removed = []
+        with self._index_lock:
+            while self._bytes > self.max_bytes and self._files:
+                path, size = next(iter(self._files.items()))
+                if path == keep:
+                    if len(self._files) == 1:
+                        break
+                    self._files.move_to_end(path)
+                    continue
+                del self._files[path]
+                self._bytes -= size
+                removed.append(path)
+        for path in removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.evictions += 1
+
+    async def get_or_create(self, certificate_hash: str, render: Callable[[str], None],
+                            reserve: Optional[Callable[[], AsyncContextManager]] = None, version: str = "") -> str:
+        """Return the cached PDF path, rendering it (once, even under concurrency) if missing
+
+        `reserve` returns a context (e.g. a render memory budget reservation) held while rendering.
+        """
+        path = self.path_for(certificate_hash, version)
+        if os.path.exists(path):
+            # Possibly rendered by another worker sharing the directory
+            self._track(path)
+            return path
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            if not os.path.exists(path):
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                os.close(fd)
+                try:
+                    async with reserve() if reserve else nullcontext():
+                        await asyncio.to_thread(render, tmp_path)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            self._track(path)
+            self._evict(keep=path)
+        self._locks.pop(path, None)
+        return path
+
+    def stats(self) -> dict:
+        with self._index_lock:
+            return {"files": len(self._files), "bytes": self._bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+def render_image_pdf(image_bytes: bytes, output_path: str):
+    """Write a single-page PDF with the certificate image filling a PDF_PAGE_WIDTH-wide page"""
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    image = Image.open(BytesIO(image_bytes))
+    # The 1600 px standard render of an 800x560 design becomes an 11 x 7.7 in page at ~145 dpi
+    page_size = (PDF_PAGE_WIDTH, PDF_PAGE_WIDTH * image.height / image.width)
+    c = canvas.Canvas(output_path, pagesize=page_size)
+    c.drawImage(ImageReader(image), 0, 0, width=page_size[0], height=page_size[1])
+    c.showPage()
+    c.save()
+
+
+def render_text_pdf(lines: List[str], output_path: str):
+    """Plain certificate layout for certificates without a template"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(output_path, pagesize=letter)
+    y = 700
+    for line in lines:
+        c.drawString(100, y, line)
+        y -= 50
+    c.showPage()
+    c.save()
+
+
+def _iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: str,
+    etag: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Stream a file with ETag/If-None-Match and single-range (206) support"""
+    size = os.path.getsize(path)
+    quoted_etag = f'"{etag}"'
+    base_headers = {"ETag": quoted_etag, "Accept-Ranges": "bytes", **(headers or {})}
+    if filename:
+        base_headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and quoted_etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=base_headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    match = _RANGE_RE.match(range_header.strip()) if range_header else None
+    if match and (not if_range or if_range == quoted_etag):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            start, end = 0, size - 1
+        if start >= size or start > end:
+            return Response(status_code=416, headers={**base_headers, "Content-Range": f"bytes */{size}"})
+        length = end - start + 1
+        return StreamingResponse(
+            _iter_file(path, start, length),
+            status_code=206,
+            media_type=media_type,
+            headers={**base_headers, "Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(length)},
+        )
+
+    return StreamingResponse(
+        _iter_file(path, 0, size),
+        media_type=media_type,
+        headers={**base_headers, "Content-Length": str(size)},
+    )
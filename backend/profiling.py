@@ -0,0 +1,285 @@
+"""
+Admin-only profiling: sampling profiles, per-request cProfile and tracemalloc
+
+Only registered when PROFILING_ADMIN_TOKEN is set (see install_profiling); with
+it unset this module is never imported, no middleware wraps requests and no
+routes exist, so a disabled profiler costs nothing. Every endpoint and the
+request profiler require the token in the X-Admin-Token header.
+
+- GET  /api/admin/profile/sample?seconds=10   samples every thread's stack and
+  returns collapsed stacks ("frame;frame;frame count"), the input format of
+  flamegraph.pl, speedscope and inferno
+- X-Profile: 1 on any request runs that request under cProfile; the response
+  carries X-Profile-Id, and GET /api/admin/profile/requests/{id} returns the
+  pstats report. cProfile sees the event loop thread, so coroutines of other
+  requests that ran concurrently show up in the report as well.
+- POST /api/admin/memory/start, GET /api/admin/memory/snapshot and
+  POST /api/admin/memory/stop control tracemalloc; snapshots are diffed against
+  the previous one and report how many PIL images are alive, which is how
+  leaked template/render images show up.
+"""
+import asyncio
+import cProfile
+import gc
+import io
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+
+MAX_SAMPLE_SECONDS = 60.0
+MIN_SAMPLE_INTERVAL = 0.001
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    """Sample the stack of every other thread until the time box runs out"""
+    counts: Counter = Counter()
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapse(counts: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class RequestProfileStore:
+    """The most recent per-request cProfile captures, oldest evicted first"""
+
+    def __init__(self, maxsize: int = 20):
+        self.maxsize = maxsize
+        self.profiles: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile_id: str, method: str, path: str, profile: cProfile.Profile, duration: float):
+        entry = {"id": profile_id, "method": method, "path": path,
+                 "duration_ms": round(duration * 1000, 2), "created_at": time.time(),
+                 "stats": pstats.Stats(profile)}
+        with self._lock:
+            self.profiles[profile_id] = entry
+            while len(self.profiles) > self.maxsize:
+                self.profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            return self.profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [{key: value for key, value in entry.items() if key != "stats"}
+                    for entry in reversed(self.profiles.values())]
+
+
+def render_stats(stats: pstats.Stats, sort: str, limit: int) -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+class RequestProfilerMiddleware:
+    """Runs requests carrying X-Profile: 1 and a valid X-Admin-Token under cProfile"""
+
+    def __init__(self, app, token: str, store: RequestProfileStore):
+        self.app = app
+        self.token = token
+        self.store = store
+        # Only one profiler can be active per thread; concurrent requests go unprofiled
+        self._active = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") != b"1" or not token_matches(self.token, headers.get(b"x-admin-token", b"").decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+        if not self._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:16]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile.disable()
+            self.store.add(profile_id, scope["method"], scope["path"], profile, time.perf_counter() - started)
+        finally:
+            self._active.release()
+
+
+class MemoryTracker:
+    """tracemalloc snapshots, each compared with the one before it"""
+
+    def __init__(self):
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: int):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.previous = None
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self.previous = None
+
+    def snapshot(self, top: int, group_by: str) -> dict:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running; POST /api/admin/memory/start first")
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ))
+            previous, self.previous = self.previous, snapshot
+
+        if previous is not None:
+            entries = [{
+                "location": format_trace(stat.traceback),
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            } for stat in snapshot.compare_to(previous, group_by)[:top]]
+        else:
+            entries = [{
+                "location": format_trace(stat.traceback),
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            } for stat in snapshot.statistics(group_by)[:top]]
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "compared_to_previous": previous is not None,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "pil_images_alive": count_pil_images(),
+            "top": entries,
+        }
+
+
+def format_trace(traceback: tracemalloc.Traceback) -> str:
+    return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+
+
+def count_pil_images() -> Optional[int]:
+    """Live PIL Image objects, or None if PIL was never imported"""
+    image_module = sys.modules.get("PIL.Image")
+    if image_module is None:
+        return None
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, image_module.Image))
+
+
+def token_matches(expected: str, provided: Optional[str]) -> bool:
+    return bool(provided) and secrets.compare_digest(expected.encode(), provided.encode())
+
+
+def create_router(token: str, store: RequestProfileStore, memory: MemoryTracker) -> APIRouter:
+    def require_admin(x_admin_token: Optional[str] = Header(None)):
+        if not token_matches(token, x_admin_token):
+            raise HTTPException(status_code=403, detail="Admin token required")
+
+    router = APIRouter(prefix="/api/admin", dependencies=[Depends(require_admin)])
+    sampling = asyncio.Lock()
+
+    @router.get("/profile/sample")
+    async def sample_profile(seconds: float = 10.0, interval_ms: float = 5.0):
+        """Collapsed stacks of all threads sampled for `seconds` (flamegraph input)"""
+        if not 0 < seconds <= MAX_SAMPLE_SECONDS:
+            raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_SAMPLE_SECONDS:g}]")
+        if sampling.locked():
+            raise HTTPException(status_code=409, detail="A sampling profile is already running")
+        async with sampling:
+            counts = await asyncio.to_thread(sample_stacks, seconds, max(interval_ms / 1000, MIN_SAMPLE_INTERVAL))
+        return PlainTextResponse(collapse(counts), headers={
+            "Content-Disposition": f'attachment; filename="profile-{int(time.time())}.folded"'
+        })
+
+    @router.get("/profile/requests")
+    async def list_request_profiles():
+        """Captured per-request profiles, newest first"""
+        return {"profiles": store.list()}
+
+    @router.get("/profile/requests/{profile_id}")
+    async def get_request_profile(profile_id: str, sort: str = "cumulative", limit: int = 60, output: str = "text"):
+        """pstats report of one captured request (output=pstats for the raw .prof file)"""
+        entry = store.get(profile_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        if output == "pstats":
+            import marshal
+            return Response(content=marshal.dumps(entry["stats"].stats), media_type="application/octet-stream",
+                            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'})
+        try:
+            return PlainTextResponse(render_stats(entry["stats"], sort, max(1, limit)))
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+
+    @router.post("/memory/start")
+    async def start_memory_tracing(frames: int = 10):
+        """Start tracemalloc, keeping `frames` frames per allocation"""
+        memory.start(max(1, min(frames, 50)))
+        return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+    @router.get("/memory/snapshot")
+    async def memory_snapshot(top: int = 30, group_by: str = "lineno"):
+        """Top allocations, diffed against the previous snapshot once there is one"""
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+        try:
+            return await asyncio.to_thread(memory.snapshot, max(1, top), group_by)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    @router.post("/memory/stop")
+    async def stop_memory_tracing():
+        memory.stop()
+        return {"tracing": False}
+
+    return router
+
+
+def install_profiling(app, token: str, max_profiles: int = 20):
+    """Add the request profiler middleware and the /api/admin routes to `app`"""
+    store = RequestProfileStore(max_profiles)
+    memory = MemoryTracker()
+    app.add_middleware(RequestProfilerMiddleware, token=token, store=store)
+    app.include_router(create_router(token, store, memory))
@@ -0,0 +1,107 @@
+"""
+Memory budget for certificate renders
+
+A render holds its frame in memory: about 7 MB for a 1600px certificate, but
+35 MB for a 300 dpi A4 print render, and ingesting a template decodes the
+upload and resizes it, a few frames at once. Renders reserve their estimated
+peak from a per-process MemoryBudget before they run, so a worker can run as
+many renders in parallel as fit in RENDER_MEMORY_BUDGET_MB and queues the rest
+(first come, first served) instead of growing without bound.
+"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Tuple
+
+# Decoder/encoder buffers, fonts and the QR image on top of the frame itself
+RENDER_OVERHEAD_BYTES = 4 * 1024 * 1024
+# Ingestion holds the draft-decoded source (up to 2x each side) and the resized frame
+INGEST_FRAMES = 5
+
+
+def frame_bytes(width: int, height: int) -> int:
+    # PIL stores RGB pixels in 32 bits
+    return width * height * 4
+
+
+def estimate_render_bytes(width: int, height: int) -> int:
+    return frame_bytes(width, height) + RENDER_OVERHEAD_BYTES
+
+
+def estimate_ingest_bytes(width: int, height: int) -> int:
+    return frame_bytes(width, height) * INGEST_FRAMES + RENDER_OVERHEAD_BYTES
+
+
+class MemoryBudget:
+    """Async weighted semaphore over bytes; a reservation larger than the limit runs alone"""
+
+    def __init__(self, limit_bytes: int):
+        self.limit = limit_bytes
+        self.in_use = 0
+        self.peak = 0
+        self.granted = 0
+        self.waited = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    def _grant(self, nbytes: int):
+        self.in_use += nbytes
+        self.peak = max(self.peak, self.in_use)
+        self.granted += 1
+
+    def _wake(self):
+        while self._waiters:
+            nbytes, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if self.in_use and self.in_use + nbytes > self.limit:
+                break
+            self._waiters.popleft()
+            self._grant(nbytes)
+            future.set_result(None)
+
+    async def acquire(self, nbytes: int) -> int:
+        """Wait until `nbytes` (capped at the limit) fit; returns the amount to release()"""
+        nbytes = min(nbytes, self.limit)
+        if not self._waiters and (not self.in_use or self.in_use + nbytes <= self.limit):
+            self._grant(nbytes)
+            return nbytes
+        self.waited += 1
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((nbytes, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(nbytes)
+            else:
+                try:
+                    self._waiters.remove((nbytes, future))
+                except ValueError:
+                    # A release() already dropped the cancelled waiter in _wake()
+                    pass
+                self._wake()
+            raise
+        return nbytes
+
+    def release(self, nbytes: int):
+        self.in_use -= nbytes
+        self._wake()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        granted = await self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(granted)
+
+    def stats(self) -> dict:
+        return {
+            "limit_mb": round(self.limit / 2 ** 20, 1),
+            "in_use_mb": round(self.in_use / 2 ** 20, 1),
+            "peak_mb": round(self.peak / 2 ** 20, 1),
+            "queued": len(self._waiters),
+            "granted": self.granted,
+            "waited": self.waited,
+        }
@@ -0,0 +1,94 @@
+"""
+Streaming roster parsing for batch issuance
+
+Rows are read one at a time from the uploaded file (UploadFile spools large
+uploads to disk) and yielded in fixed-size chunks, so memory use depends on
+the chunk size, not on the number of recipients.
+"""
+import codecs
+import csv
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, EmailStr, ValidationError
+
+# Accepted header spellings for each roster column
+HEADER_ALIASES = {
+    "recipient_name": {"recipient_name", "recipient name", "name", "full name", "full_name", "student name", "student_name"},
+    "recipient_email": {"recipient_email", "recipient email", "email", "email address", "e-mail"},
+    "student_id": {"student_id", "student id", "id", "student number"},
+}
+
+
+class RosterRow(BaseModel):
+    recipient_name: str
+    recipient_email: EmailStr
+    student_id: Optional[str] = None
+
+
+class RosterFormatError(ValueError):
+    pass
+
+
+def normalize_headers(headers: List[Optional[str]]) -> List[Optional[str]]:
+    normalized = []
+    for header in headers:
+        key = (header or "").strip().lower()
+        normalized.append(next((name for name, aliases in HEADER_ALIASES.items() if key in aliases), None))
+    if "recipient_name" not in normalized or "recipient_email" not in normalized:
+        raise RosterFormatError("Roster needs a name column and an email column")
+    return normalized
+
+
+def _iter_csv(file) -> Iterator[List[str]]:
+    text = codecs.getreader("utf-8-sig")(file, errors="replace")
+    yield from csv.reader(text)
+
+
+def _iter_xlsx(file) -> Iterator[List[str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RosterFormatError("XLSX rosters need the openpyxl package; upload a CSV instead")
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ["" if value is None else str(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_roster_rows(file, filename: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Yield (line_number, {column: value}) for every non-empty data row"""
+    reader = _iter_xlsx(file) if filename.lower().endswith((".xlsx", ".xlsm")) else _iter_csv(file)
+    try:
+        headers = normalize_headers(next(reader))
+    except StopIteration:
+        raise RosterFormatError("Roster is empty")
+
+    for line_number, values in enumerate(reader, start=2):
+        if not any((value or "").strip() for value in values):
+            continue
+        row = {}
+        for column, value in zip(headers, values):
+            if column and value is not None and str(value).strip():
+                row[column] = str(value).strip()
+        yield line_number, row
+
+
+def iter_validated_chunks(file, filename: str, chunk_size: int = 200):
+    """
+    Yield (valid_rows, invalid_rows) chunks; valid rows are (line, RosterRow),
+    invalid rows are (line, error message)
+    """
+    valid: List[Tuple[int, RosterRow]] = []
+    invalid: List[Tuple[int, str]] = []
+    for line_number, row in iter_roster_rows(file, filename):
+        try:
+            valid.append((line_number, RosterRow(**row)))
+        except ValidationError as e:
+            invalid.append((line_number, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())))
+        if len(valid) + len(invalid) >= chunk_size:
+            yield valid, invalid
+            valid, invalid = [], []
+    if valid or invalid:
+        yield valid, invalid
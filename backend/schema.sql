@@ -119,7 +119,7 @@ CREATE INDEX IF NOT EXISTS idx_fields_template_id ON public.template_fields(temp
 -- =====================================================
 CREATE TABLE IF NOT EXISTS public.certificates (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    certificate_id TEXT UNIQUE NOT NULL, -- Human-readable ID (CERT-timestamp-random)
+    certificate_id TEXT UNIQUE NOT NULL, -- Time-sortable ID (CERT-<ULID>), appends at the right edge of the index
     group_id UUID REFERENCES public.groups(id) ON DELETE SET NULL,
     template_id UUID REFERENCES public.certificate_templates(id) ON DELETE SET NULL,
     
@@ -315,6 +315,195 @@ CREATE TRIGGER update_certificate_counts AFTER INSERT OR UPDATE ON public.certif
 -- 1. certificate-templates (public bucket for PDF templates)
 -- 2. certificate-pdfs (public bucket for generated certificates)
 
+-- =====================================================
+-- 11. VERIFICATION ANALYTICS ROLLUPS
+-- =====================================================
+-- Daily scan counts per certificate. Dashboards read this table only;
+-- certificate_verifications is raw audit data that gets compacted away.
+CREATE TABLE IF NOT EXISTS public.verification_daily_rollups (
+    certificate_pk UUID NOT NULL,
+    day DATE NOT NULL,
+    group_id UUID,
+    scan_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (certificate_pk, day)
+);
+
+ALTER TABLE public.verification_daily_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view verification rollups" ON public.verification_daily_rollups
+    FOR SELECT USING (true);
+
+CREATE INDEX IF NOT EXISTS idx_rollups_group_day ON public.verification_daily_rollups(group_id, day);
+
+-- Set once a row is counted in the rollups: by increment_verification_rollups for
+-- rows the log writer counted in memory, or by compaction
+ALTER TABLE IF EXISTS public.certificate_verifications
+    ADD COLUMN IF NOT EXISTS rolled_up BOOLEAN DEFAULT false;
+
+CREATE INDEX IF NOT EXISTS idx_verifications_verified_at ON public.certificate_verifications(verified_at);
+
+-- Atomically add a batch of {certificate_pk, day, group_id, scan_count} deltas and
+-- mark the certificate_verifications rows they count (log_ids) as rolled up
+DROP FUNCTION IF EXISTS increment_verification_rollups(JSONB);
+CREATE OR REPLACE FUNCTION increment_verification_rollups(rows JSONB, log_ids UUID[] DEFAULT '{}')
+RETURNS VOID AS $$
+    INSERT INTO public.verification_daily_rollups (certificate_pk, day, group_id, scan_count)
+    SELECT (r->>'certificate_pk')::uuid,
+           (r->>'day')::date,
+           NULLIF(r->>'group_id', '')::uuid,
+           (r->>'scan_count')::bigint
+    FROM jsonb_array_elements(rows) AS r
+    ON CONFLICT (certificate_pk, day) DO UPDATE
+        SET scan_count = public.verification_daily_rollups.scan_count + EXCLUDED.scan_count,
+            updated_at = NOW();
+
+    UPDATE public.certificate_verifications SET rolled_up = true WHERE id = ANY(log_ids);
+$$ LANGUAGE sql;
+
+-- Fold uncounted raw rows older than the cutoff into the rollups, then delete them.
+-- Days are UTC dates, like the ones the API counts in memory.
+CREATE OR REPLACE FUNCTION compact_certificate_verifications(older_than TIMESTAMPTZ)
+RETURNS BIGINT AS $$
+DECLARE
+    removed BIGINT;
+BEGIN
+    INSERT INTO public.verification_daily_rollups (certificate_pk, day, group_id, scan_count)
+    SELECT v.certificate_pk, (v.verified_at AT TIME ZONE 'UTC')::date, c.group_id, COUNT(*)
+    FROM public.certificate_verifications v
+    LEFT JOIN public.certificates c ON c.id = v.certificate_pk
+    WHERE v.verified_at < older_than
+      AND v.certificate_pk IS NOT NULL
+      AND NOT COALESCE(v.rolled_up, false)
+    GROUP BY v.certificate_pk, (v.verified_at AT TIME ZONE 'UTC')::date, c.group_id
+    ON CONFLICT (certificate_pk, day) DO UPDATE
+        SET scan_count = public.verification_daily_rollups.scan_count + EXCLUDED.scan_count,
+            updated_at = NOW();
+
+    DELETE FROM public.certificate_verifications WHERE verified_at < older_than;
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RETURN removed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- 12. KEYSET PAGINATION INDEXES
+-- =====================================================
+-- Listing endpoints page by (created_at DESC, id DESC) within one parent row.
+-- INCLUDE columns let the list queries be answered from the index alone.
+ALTER TABLE public.groups ADD COLUMN IF NOT EXISTS instructor_id UUID;
+
+CREATE INDEX IF NOT EXISTS idx_certificates_group_page
+    ON public.certificates(group_id, created_at DESC, id DESC)
+    INCLUDE (certificate_id, status, nft_id);
+
+CREATE INDEX IF NOT EXISTS idx_groups_instructor_page
+    ON public.groups(instructor_id, created_at DESC, id DESC)
+    INCLUDE (name, join_code, status);
+
+CREATE INDEX IF NOT EXISTS idx_verifications_certificate_page
+    ON public.certificate_verifications(certificate_pk, verified_at DESC, id DESC);
+
+-- =====================================================
+-- 13. ROSTER IMPORT DEDUPLICATION INDEX
+-- =====================================================
+-- Roster imports look up existing recipients of a group by email in one query.
+-- Emails compare case-insensitively; the signed payload keeps the email as
+-- entered, so the lookup goes through a lowercased generated column.
+ALTER TABLE public.certificates ADD COLUMN IF NOT EXISTS recipient_email_normalized TEXT
+    GENERATED ALWAYS AS (lower(canonical_payload->>'recipientEmail')) STORED;
+
+DROP INDEX IF EXISTS idx_certificates_group_recipient_email;
+CREATE INDEX IF NOT EXISTS idx_certificates_group_recipient_email_normalized
+    ON public.certificates(group_id, recipient_email_normalized);
+
+-- =====================================================
+-- 14. CERTIFICATE STATUS EVENTS (revocation / reissue)
+-- =====================================================
+-- Every status change made through the revoke/reissue endpoints is appended here.
+ALTER TABLE public.certificates DROP CONSTRAINT IF EXISTS certificates_status_check;
+ALTER TABLE public.certificates ADD CONSTRAINT certificates_status_check
+    CHECK (status IN ('pending', 'minting', 'minted', 'failed', 'valid', 'revoked'));
+
+CREATE TABLE IF NOT EXISTS public.certificate_status_events (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    certificate_pk UUID REFERENCES public.certificates(id) ON DELETE CASCADE,
+    certificate_id TEXT NOT NULL,
+    previous_status TEXT,
+    new_status TEXT NOT NULL,
+    reason TEXT,
+    actor_instructor_id UUID,
+    replacement_certificate_id TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE public.certificate_status_events ENABLE ROW LEVEL SECURITY;
+
+-- Policy: Status history is public, like verification itself
+CREATE POLICY "Anyone can view certificate status events" ON public.certificate_status_events
+    FOR SELECT USING (true);
+
+CREATE POLICY "Authenticated users can record status events" ON public.certificate_status_events
+    FOR INSERT WITH CHECK (auth.uid() IS NOT NULL);
+
+CREATE INDEX IF NOT EXISTS idx_status_events_certificate
+    ON public.certificate_status_events(certificate_id, created_at DESC, id DESC);
+
+-- =====================================================
+-- 15. STORED CANONICAL PAYLOAD TEXT
+-- =====================================================
+-- The exact string that was hashed and signed at mint. JSONB normalizes key order
+-- and whitespace, so canonical_payload alone cannot reproduce the signed bytes;
+-- verification hashes this column instead. NULL for certificates minted before it.
+ALTER TABLE public.certificates ADD COLUMN IF NOT EXISTS canonical_payload_text TEXT;
+
+-- =====================================================
+-- 16. TEMPLATE RENDER ASSETS
+-- =====================================================
+-- Written by POST /api/templates/{id}/ingest (and on first render): per output
+-- profile, the normalized base image URL, its size and the template_fields boxes
+-- scaled to it, e.g. {"standard": {"url": ..., "width": 1600, "height": 1120,
+-- "layout": [...], "source_url": ..., "fields_digest": ..., "version": 1}}
+ALTER TABLE public.certificate_templates ADD COLUMN IF NOT EXISTS render_assets JSONB;
+
+-- Profiles are ingested independently (a print render can ingest "print" while
+-- the template is re-ingested for "standard"), so writers merge their profiles
+-- into the stored object instead of replacing it. Returns the merged assets.
+CREATE OR REPLACE FUNCTION merge_template_render_assets(template_id UUID, assets JSONB)
+RETURNS JSONB AS $$
+    UPDATE public.certificate_templates
+    SET render_assets = COALESCE(render_assets, '{}'::jsonb) || assets,
+        updated_at = NOW()
+    WHERE id = template_id
+    RETURNING render_assets;
+$$ LANGUAGE sql;
+
+-- =====================================================
+-- 17. TEMPLATE FIELD TEXT OPTIONS
+-- =====================================================
+-- How a text field's value is fitted to its box at render time. Font sizes are in
+-- editor pixels like x/y/width/height; NULL max_font_size means 60% of the box
+-- height, NULL min_font_size means 12px. The value shrinks down to min_font_size,
+-- wrapping onto up to max_lines lines if wrap is set, and is then cut with an
+-- ellipsis unless ellipsize is false.
+ALTER TABLE public.template_fields
+    ADD COLUMN IF NOT EXISTS text_align TEXT DEFAULT 'center' CHECK (text_align IN ('left', 'center', 'right')),
+    ADD COLUMN IF NOT EXISTS vertical_align TEXT DEFAULT 'middle' CHECK (vertical_align IN ('top', 'middle', 'bottom')),
+    ADD COLUMN IF NOT EXISTS wrap BOOLEAN DEFAULT false,
+    ADD COLUMN IF NOT EXISTS max_lines INTEGER CHECK (max_lines IS NULL OR max_lines > 0),
+    ADD COLUMN IF NOT EXISTS min_font_size INTEGER CHECK (min_font_size IS NULL OR min_font_size > 0),
+    ADD COLUMN IF NOT EXISTS max_font_size INTEGER CHECK (max_font_size IS NULL OR max_font_size > 0),
+    ADD COLUMN IF NOT EXISTS ellipsize BOOLEAN DEFAULT true;
+
+-- =====================================================
+-- 18. CERTIFICATE INDEX INCREMENTAL REFRESH
+-- =====================================================
+-- Each API worker keeps its Bloom filter of issued IDs current by reading only the
+-- certificates whose updated_at (see update_certificates_updated_at) moved since its
+-- last refresh, instead of rescanning the table.
+CREATE INDEX IF NOT EXISTS idx_certificates_updated_at
+    ON public.certificates(updated_at DESC, id DESC);
+
 -- =====================================================
 -- SETUP COMPLETE
 -- =====================================================
@@ -1,30 +1,82 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, UploadFile, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse, Response
+from pydantic import BaseModel, EmailStr, StrictBool, StrictInt, StrictStr
+from typing import Optional, List, Dict, Any, Union
 import os
 import json
+import logging
 import io
 import base64
 import hashlib
-from datetime import datetime, timedelta
-import qrcode
-from eth_account import Account
-from eth_account.messages import encode_defunct
-from web3 import Web3
-import httpx
-from supabase import create_client, Client
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from PIL import Image, ImageDraw, ImageFont
+import secrets
+import time
+import tempfile
+from datetime import datetime, timedelta, timezone
 from io import BytesIO
 from dotenv import load_dotenv
-import requests
+from contextlib import asynccontextmanager
+import ids
+from crypto_utils import create_canonical_payload, canonical_payload_candidates, hash_message, sign_message, verify_signature
+import asyncio
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
+from cache import LRUCache, TieredCache, create_shared_backend
+from audit_log import VerificationLogWriter
+from analytics import VerificationRollups, summarize_days
+from pdf_engine import PdfCache, render_image_pdf, render_text_pdf, file_response
+from pagination import keyset_page, page_result, clamp_limit, InvalidCursor, MAX_PAGE_SIZE
+from roster import iter_validated_chunks, RosterFormatError
+from export import stream_ndjson, stream_zip
+from verification_bundle import build_bundle, bundle_signing_message
+from certificate_index import CertificateIndex
+from events import create_pubsub, CERTIFICATE_STATUS_CHANNEL
+from metrics import PipelineTimer, record_crossmint_response, render_latest
+from signer import create_signer, SigningKeyUnavailable, SigningError
+from admission import AdmissionController, AdmissionMiddleware
+from breaker import CircuitBreaker, CircuitOpenError, create_breaker_http_client, is_failure_status
+from mint_queue import MintQueue, QUEUED_NFT_PREFIX
+from template_ingest import DESIGN_SIZE, PRINT_DPI, PROFILE_JPEG_OPTIONS, RENDER_PROFILES, TemplateImageError, asset_fingerprint, asset_is_current, fields_digest, ingest_template, render_asset
+from render_budget import MemoryBudget, estimate_ingest_bytes, estimate_render_bytes
+from text_layout import TextLayoutEngine
+from compression import CompressionMiddleware
+from http_cache import ConditionalGetMiddleware, cache_headers, is_final, CACHE_CONTROL_IMMUTABLE, CACHE_CONTROL_NOT_FOUND
 
 load_dotenv()
 
-app = FastAPI(title="CertiChain API", version="1.0.0")
+logger = logging.getLogger("certichain")
+
+# Heavy libraries (eth_account, supabase, httpx, PIL, qrcode, reportlab, requests) are
+# imported where they are used, so importing this module stays fast for new workers
+# and job runners. The Supabase client is created by the lifespan hook.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global supabase
+    if supabase is None:
+        supabase = create_supabase_client()
+    await start_background_tasks()
+    yield
+    await stop_background_tasks()
+
+app = FastAPI(title="CertiChain API", version="1.0.0", lifespan=lifespan)
+
+# Rate limits and load shedding for the public verify/claim endpoints. Added first so
+# it runs inside CORS and browsers can read the 429s.
+admission = AdmissionController(
+    # L1 only: the shared cache (Redis/SQLite) would block the loop exactly when it is overloaded
+    is_cached_verification=lambda certificate_id: verification_response_cache.get_local(certificate_id) is not None,
+    verify_rate=float(os.getenv("ADMISSION_VERIFY_RATE", "20")),
+    verify_burst=float(os.getenv("ADMISSION_VERIFY_BURST", "40")),
+    claim_rate=float(os.getenv("ADMISSION_CLAIM_RATE", "2")),
+    claim_burst=float(os.getenv("ADMISSION_CLAIM_BURST", "60")),
+    join_code_rate=float(os.getenv("ADMISSION_JOIN_CODE_RATE", "10")),
+    join_code_burst=float(os.getenv("ADMISSION_JOIN_CODE_BURST", "100")),
+    target_lag=float(os.getenv("ADMISSION_TARGET_LAG_MS", "100")) / 1000,
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "256")),
+    proxy_hops=int(os.getenv("ADMISSION_PROXY_HOPS", "0"))
+)
+if os.getenv("ADMISSION_ENABLED", "1") == "1":
+    app.add_middleware(AdmissionMiddleware, controller=admission)
 
 # CORS Configuration
 app.add_middleware(
@@ -35,6 +87,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON/NDJSON bodies (never downloads or ranges); brotli when the optional brotli package is installed
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
+
+# 304 Not Modified for repeat requests of ETag-tagged certificate resources
+app.add_middleware(ConditionalGetMiddleware)
+
+# Admin-only profiling endpoints and per-request cProfile; absent unless a token is configured
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+if PROFILING_ADMIN_TOKEN:
+    from profiling import install_profiling
+    install_profiling(app, PROFILING_ADMIN_TOKEN, max_profiles=int(os.getenv("PROFILING_MAX_REQUEST_PROFILES", "20")))
+
+# Operator-only maintenance endpoints; refused for everyone while no token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or PROFILING_ADMIN_TOKEN
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(ADMIN_TOKEN.encode(), x_admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
 # Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
@@ -42,8 +113,136 @@ CROSSMINT_API_KEY = os.getenv("CROSSMINT_API_KEY")
 CROSSMINT_BASE_URL = os.getenv("CROSSMINT_BASE_URL", "https://staging.crossmint.com/api/2022-06-09")
 APP_URL = os.getenv("APP_URL", "http://localhost:3000")
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# httpx transport for Crossmint calls; None uses the network (load tests install a stub)
+crossmint_transport = None
+CROSSMINT_TIMEOUT = float(os.getenv("CROSSMINT_TIMEOUT", "60"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+
+# Fail fast while a dependency is down or slow instead of every request waiting for its timeout
+supabase_breaker = CircuitBreaker(
+    "supabase",
+    failure_threshold=int(os.getenv("SUPABASE_BREAKER_THRESHOLD", "5")),
+    recovery_timeout=float(os.getenv("SUPABASE_BREAKER_RECOVERY", "15")),
+    slow_call_threshold=float(os.getenv("SUPABASE_SLOW_CALL_SECONDS", "5"))
+)
+crossmint_breaker = CircuitBreaker(
+    "crossmint",
+    failure_threshold=int(os.getenv("CROSSMINT_BREAKER_THRESHOLD", "5")),
+    recovery_timeout=float(os.getenv("CROSSMINT_BREAKER_RECOVERY", "30")),
+    slow_call_threshold=float(os.getenv("CROSSMINT_SLOW_CALL_SECONDS", "20"))
+)
+
+def create_supabase_client():
+    """Supabase client from SUPABASE_URL / SUPABASE_ANON_KEY, or None when they are not set"""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print("SUPABASE_URL / SUPABASE_ANON_KEY not set; database endpoints will fail")
+        return None
+    from supabase import ClientOptions, create_client
+    # All PostgREST/storage requests go through this client, and so through the breaker
+    options = ClientOptions(httpx_client=create_breaker_http_client(supabase_breaker, SUPABASE_TIMEOUT))
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+
+def dependency_unavailable(error: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, int(error.retry_after + 0.5)))}
+    )
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, error: CircuitOpenError):
+    """Endpoints without their own handling answer 503 + Retry-After while a dependency's breaker is open"""
+    unavailable = dependency_unavailable(error)
+    return JSONResponse(status_code=503, content={"detail": unavailable.detail}, headers=unavailable.headers)
+
+# Initialized in lifespan(); long-lived helpers read it through `lambda: supabase`
+supabase = None
+
+pdf_cache = PdfCache(
+    os.getenv("PDF_CACHE_DIR", "/tmp/certichain-pdf-cache"),
+    max_bytes=int(os.getenv("PDF_CACHE_MAX_MB", "512")) * 1024 * 1024
+)
+
+# certificate_id -> {"id": <certificates.id>, "group_id": ...}, filled on verify/mint/claim
+certificate_pk_cache = LRUCache(maxsize=50000)
+
+# Bloom filter of issued IDs + revoked set, for DB-free negative and revocation checks
+certificate_index = CertificateIndex(
+    client_factory=lambda: supabase,
+    refresh_interval=float(os.getenv("CERTIFICATE_INDEX_REFRESH_INTERVAL", "60")),
+    rebuild_interval=float(os.getenv("CERTIFICATE_INDEX_REBUILD_INTERVAL", "86400"))
+)
+
+# Holds decrypted issuer keys (in this process, or in SIGNER_PROCESSES signer processes)
+certificate_signer = create_signer(lambda: supabase)
+
+# Mints deferred while Crossmint is unavailable; shared by the workers of one host
+mint_queue = MintQueue(
+    os.getenv("MINT_QUEUE_PATH", "/var/tmp/certichain-mint-queue.sqlite3"),
+    handler=lambda job: process_mint_job(job),
+    interval=float(os.getenv("MINT_QUEUE_INTERVAL", "5")),
+    max_attempts=int(os.getenv("MINT_QUEUE_MAX_ATTEMPTS", "12"))
+)
+
+# L2 shared by all workers on the host (SQLite on /dev/shm) or cluster (Redis)
+shared_cache_backend = create_shared_backend()
+
+# Built verification documents: certificate_id -> {variant: (content, headers)}
+verification_response_cache = TieredCache(
+    "verify",
+    shared_cache_backend,
+    maxsize=int(os.getenv("VERIFY_CACHE_SIZE", "20000")),
+    ttl=float(os.getenv("VERIFY_CACHE_TTL", "300")),
+    l1_ttl=float(os.getenv("VERIFY_CACHE_L1_TTL", "30"))
+)
+
+# user_id -> check_subscription_status() result; dropped whenever credits, plan or groups change
+subscription_cache = TieredCache("subscription", shared_cache_backend, maxsize=10000, ttl=30, l1_ttl=5)
+
+# Template image URL -> downloaded bytes
+template_image_cache = TieredCache("template-image", shared_cache_backend, maxsize=64, ttl=3600)
+TEMPLATE_BUCKET = "certificate-templates"
+# (template_id, profile, source URL, fields digest) -> render asset written by this process
+ingested_template_assets = LRUCache(maxsize=256)
+# Caps the estimated peak memory of the renders a worker runs at once
+render_budget = MemoryBudget(int(float(os.getenv("RENDER_MEMORY_BUDGET_MB", "256")) * 2 ** 20))
+# Renders run on a few dedicated threads: every thread keeps its own malloc arena, and
+# freed print frames stay in it, so spreading renders over the default pool grows RSS
+render_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RENDER_THREADS", "2")), thread_name_prefix="certichain-render")
+# Storage path -> public URL of print renders done by this process
+print_render_urls = LRUCache(maxsize=4096)
+# A cached-PDF render at the standard profile, ingestion included
+STANDARD_PDF_RENDER_BYTES = estimate_ingest_bytes(RENDER_PROFILES["standard"], RENDER_PROFILES["standard"] * DESIGN_SIZE[1] // DESIGN_SIZE[0])
+
+# Status changes (revoke/reissue) fan out to every cache holding certificate state;
+# over Redis pub/sub when REDIS_URL is set, so other workers see them too
+status_events = create_pubsub()
+
+def on_certificate_status_change(message: dict):
+    certificate_id = message["certificate_id"]
+    verification_response_cache.delete(certificate_id)
+    if message.get("status") == "revoked":
+        certificate_index.mark_revoked(certificate_id)
+    elif message.get("status"):
+        certificate_index.unmark_revoked(certificate_id)
+
+status_events.subscribe(CERTIFICATE_STATUS_CHANNEL, on_certificate_status_change)
+
+verification_rollups = VerificationRollups(
+    client_factory=lambda: supabase,
+    flush_interval=float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "30")),
+    retention_days=int(os.getenv("ANALYTICS_RAW_RETENTION_DAYS", "90")),
+    compaction_interval=float(os.getenv("ANALYTICS_COMPACTION_INTERVAL", str(6 * 3600)))
+)
+
+verification_log_writer = VerificationLogWriter(
+    client_factory=lambda: supabase,
+    pk_cache=certificate_pk_cache,
+    rollups=verification_rollups,
+    max_queue=int(os.getenv("VERIFICATION_LOG_MAX_QUEUE", "10000")),
+    batch_size=int(os.getenv("VERIFICATION_LOG_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("VERIFICATION_LOG_FLUSH_INTERVAL", "2.0"))
+)
 
 # ==========================================
 # SUBSCRIPTION CONSTANTS
@@ -83,12 +282,15 @@ class CollectionCreate(BaseModel):
     symbol: str
     chain: str = "polygon"
 
+# Values the canonical payload encoder accepts (no floats: see crypto_utils)
+CanonicalFieldValue = Optional[Union[StrictStr, StrictInt, StrictBool]]
+
 # NEW: Mint Certificate Request Model
 class MintCertificateRequest(BaseModel):
     certificate_db_id: str  # The UUID from certificates table
     group_id: str
     template_id: str
-    field_data: Dict[str, Any]  # Dynamic field data from form
+    field_data: Dict[str, CanonicalFieldValue]  # Dynamic field data from form
     recipient_email: str
     recipient_name: str
     student_id: Optional[str] = None
@@ -114,6 +316,18 @@ class PurchaseCreditsRequest(BaseModel):
     user_id: str
     package: str  # starter, basic, standard, premium, enterprise
 
+class CertificateRevokeRequest(BaseModel):
+    user_id: str
+    reason: str
+
+class CertificateReissueRequest(BaseModel):
+    user_id: str
+    reason: str
+    # Corrections for the new certificate; unset fields are copied from the old one
+    recipient_name: Optional[str] = None
+    recipient_email: Optional[EmailStr] = None
+    student_id: Optional[str] = None
+
 class BatchMintRequest(BaseModel):
     group_id: str
     template_id: str
@@ -121,44 +335,15 @@ class BatchMintRequest(BaseModel):
 
 # Utility Functions
 def generate_join_code() -> str:
-    import random
-    import string
-    chars = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(chars) for _ in range(8))
+    return ids.generate_join_code()
 
 def generate_certificate_id() -> str:
-    import time
-    import random
-    timestamp = int(time.time())
-    random_part = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', k=6))
-    return f"CERT-{timestamp}-{random_part}"
-
-def create_canonical_payload(data: dict) -> str:
-    sorted_keys = sorted(data.keys())
-    return json.dumps({k: data[k] for k in sorted_keys}, separators=(',', ':'))
-
-def hash_message(message: str) -> str:
-    w3 = Web3()
-    return w3.keccak(text=message).hex()
-
-def sign_message(message: str, private_key: str) -> str:
-    account = Account.from_key(private_key)
-    message_hash = encode_defunct(text=message)
-    signed_message = account.sign_message(message_hash)
-    return signed_message.signature.hex()
-
-def verify_signature(message: str, signature: str, expected_address: str) -> bool:
-    try:
-        w3 = Web3()
-        message_hash = encode_defunct(text=message)
-        recovered_address = w3.eth.account.recover_message(message_hash, signature=signature)
-        return recovered_address.lower() == expected_address.lower()
-    except Exception as e:
-        print(f"Signature verification failed: {e}")
-        return False
+    """Time-sortable, collision-free certificate ID (CERT-<ULID>)"""
+    return ids.generate_certificate_id()
 
 def generate_qr_code(data: str) -> str:
     """Generate QR code and return as base64 string"""
+    import qrcode
     qr = qrcode.QRCode(version=1, box_size=10, border=2)
     qr.add_data(data)
     qr.make(fit=True)
@@ -177,6 +362,9 @@ async def get_instructor_by_user_id(user_id: str):
     try:
         response = supabase.table("instructors").select("*").eq("user_id", user_id).single().execute()
         return response.data
+    except CircuitOpenError:
+        # An outage is not "no such instructor"
+        raise
     except Exception:
         return None
 
@@ -185,11 +373,21 @@ async def get_user_groups_count(user_id: str) -> int:
     try:
         response = supabase.table("groups").select("id", count="exact").eq("created_by", user_id).execute()
         return response.count if response.count else 0
+    except CircuitOpenError:
+        raise
     except Exception:
         return 0
 
 async def check_subscription_status(user_id: str) -> dict:
-    """Check user's subscription status and limits"""
+    """Check user's subscription status and limits (cached for a few seconds)"""
+    cached = subscription_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
+    status = await compute_subscription_status(user_id)
+    subscription_cache.set(user_id, status)
+    return status
+
+async def compute_subscription_status(user_id: str) -> dict:
     instructor = await get_instructor_by_user_id(user_id)
     
     if not instructor:
@@ -262,133 +460,252 @@ async def deduct_mint_credits(user_id: str, count: int = 1) -> bool:
     supabase.table("instructors").update({
         "mint_credits": new_credits
     }).eq("id", instructor["id"]).execute()
+    subscription_cache.delete(user_id)
     
     return True
 
+CERTIFICATE_FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+]
+
+@lru_cache(maxsize=128)
+def load_font(size: int):
+    """Bold TrueType font at `size`, falling back to PIL's default (parsed once per process)"""
+    from PIL import ImageFont
+    for font_path in CERTIFICATE_FONT_PATHS:
+        if os.path.exists(font_path):
+            try:
+                return ImageFont.truetype(font_path, size)
+            except Exception:
+                continue
+    return ImageFont.load_default()
+
+# Fits field values to their boxes from cached glyph advances (no textbbox per candidate size)
+text_layout = TextLayoutEngine(load_font)
+
+class TemplateSourceError(Exception):
+    """The template image URL could not be downloaded; status_code is the upstream HTTP status, if any"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+def fetch_template_image(template_url: str) -> bytes:
+    """Template image bytes, downloaded once and shared between workers"""
+    content = template_image_cache.get(template_url)
+    if content is None:
+        import requests
+        try:
+            response = requests.get(template_url, timeout=30)
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            raise TemplateSourceError(f"Template image download failed with HTTP {status}", status) from e
+        except requests.RequestException as e:
+            raise TemplateSourceError(f"Template image could not be downloaded: {e}") from e
+        content = response.content
+        template_image_cache.set(template_url, content)
+    return content
+
+def ingest_template_record(template: dict, fields: List[Dict], profiles=("standard",)) -> dict:
+    """Normalize a template for `profiles`, store the base images and save render_assets"""
+    source = fetch_template_image(template["pdf_url"])
+    bucket = supabase.storage.from_(TEMPLATE_BUCKET)
+    assets = {}
+    digest = fields_digest(fields)
+    for profile in profiles:
+        ingested = ingest_template(source, fields, RENDER_PROFILES[profile])
+        path = f"normalized/{template['id']}/{profile}-{ingested.digest[:16]}.jpg"
+        bucket.upload(path, ingested.image, {"content-type": "image/jpeg", "cache-control": "31536000", "upsert": "true"})
+        url = bucket.get_public_url(path)
+        template_image_cache.set(url, ingested.image)
+        assets[profile] = render_asset(ingested, url, template["pdf_url"], fields)
+        ingested_template_assets.set((template["id"], profile, template["pdf_url"], digest), assets[profile])
+    
+    # Merged server-side: another worker may be storing a different profile right now
+    merged = supabase.rpc("merge_template_render_assets", {"template_id": template["id"], "assets": assets}).execute().data
+    template["render_assets"] = merged or {**(template.get("render_assets") or {}), **assets}
+    return template["render_assets"]
+
+def template_render_asset(template: dict, fields: List[Dict], profile: str = "standard") -> dict:
+    """Base image URL and pixel layout for `profile`, ingesting the template first if missing or stale"""
+    asset = (template.get("render_assets") or {}).get(profile)
+    if asset_is_current(asset, template["pdf_url"], fields):
+        return asset
+    asset = ingested_template_assets.get((template["id"], profile, template["pdf_url"], fields_digest(fields)))
+    if asset is None:
+        asset = ingest_template_record(template, fields, (profile,))[profile]
+    return asset
+
+def render_memory_estimate(template: dict, fields: List[Dict], profile: str = "standard") -> int:
+    """Peak bytes a render of `profile` needs, including ingestion when the asset is missing or stale"""
+    width = RENDER_PROFILES[profile]
+    asset = (template.get("render_assets") or {}).get(profile)
+    if asset_is_current(asset, template["pdf_url"], fields):
+        return estimate_render_bytes(asset["width"], asset["height"])
+    height = asset["height"] if asset else width * DESIGN_SIZE[1] // DESIGN_SIZE[0]
+    return estimate_ingest_bytes(width, height)
+
 def generate_certificate_image(
-    template_url: str,
+    template: dict,
     fields: List[Dict],
     field_data: Dict[str, str],
-    qr_code_base64: str,
-    template_width: int = 800,
-    template_height: int = 560
+    qr_code_base64: str
 ) -> str:
     """
     Generate certificate image with text fields and QR code overlaid
     Returns base64 encoded image
     """
+    asset = template_render_asset(template, fields)
+    return render_certificate_image(
+        fetch_template_image(asset["url"]),
+        asset["layout"],
+        field_data,
+        qr_code_base64
+    )
+
+def render_certificate_image(
+    base_bytes: bytes,
+    layout: List[Dict],
+    field_data: Dict[str, str],
+    qr_code_base64: str
+) -> str:
+    """Overlay fields and QR code on an ingested base image; returns the JPEG base64 encoded"""
+    output_buffer = BytesIO()
+    draw_certificate(base_bytes, layout, field_data, qr_code_base64, output_buffer)
+    return base64.b64encode(output_buffer.getvalue()).decode()
+
+def draw_certificate(
+    base_bytes: bytes,
+    layout: List[Dict],
+    field_data: Dict[str, str],
+    qr_code_base64: str,
+    output,
+    profile: str = "standard"
+):
+    """
+    Draw the fields onto the base image in place and write it as JPEG to `output`
+    (a buffer or an open file). The base is RGB and the layout is in its pixels,
+    so a render holds a single frame, however large the profile.
+    """
+    from PIL import Image, ImageDraw
     try:
-        # Download the template image
-        response = requests.get(template_url, timeout=30)
-        response.raise_for_status()
-        template_img = Image.open(BytesIO(response.content))
-        
-        # Convert to RGBA for transparency support
-        if template_img.mode != 'RGBA':
-            template_img = template_img.convert('RGBA')
-        
-        # Get actual dimensions
-        actual_width, actual_height = template_img.size
+        template_img = Image.open(BytesIO(base_bytes))
+        if template_img.mode != 'RGB':
+            template_img = template_img.convert('RGB')
         
         # Create a drawing context
         draw = ImageDraw.Draw(template_img)
         
-        # Try to load a font, fallback to default
-        try:
-            # Try different font paths
-            font_paths = [
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-                "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
-            ]
-            font = None
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    font = ImageFont.truetype(font_path, 24)
-                    break
-            if font is None:
-                font = ImageFont.load_default()
-        except Exception:
-            font = ImageFont.load_default()
-        
-        # Calculate scale factors
-        scale_x = actual_width / template_width
-        scale_y = actual_height / template_height
-        
         # Process each field
-        for field in fields:
-            field_type = field.get('type', 'text')
-            x = int(field.get('x', 0) * scale_x)
-            y = int(field.get('y', 0) * scale_y)
-            width = int(field.get('width', 200) * scale_x)
-            height = int(field.get('height', 40) * scale_y)
+        for field in layout:
+            x, y, width, height = field['x'], field['y'], field['width'], field['height']
             
-            if field_type == 'text':
-                label = field.get('label', '')
+            if field['type'] == 'text':
+                label = field['label']
                 # Get the value from field_data using label as key
                 text_value = field_data.get(label, label)
-                
-                # Calculate font size based on field height
-                font_size = max(12, int(height * 0.6))
-                try:
-                    for font_path in font_paths:
-                        if os.path.exists(font_path):
-                            text_font = ImageFont.truetype(font_path, font_size)
-                            break
-                    else:
-                        text_font = font
-                except:
-                    text_font = font
-                
-                # Get text bounding box for centering
-                bbox = draw.textbbox((0, 0), text_value, font=text_font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-                
-                # Center text in the field
-                text_x = x + (width - text_width) // 2
-                text_y = y + (height - text_height) // 2
+                # Shrink, wrap or ellipsize the value to fit the field box
+                fitted = text_layout.fit(text_value, field)
+                text_font = load_font(fitted.font_size)
                 
                 # Draw text (dark blue color)
-                draw.text((text_x, text_y), text_value, fill=(30, 58, 138), font=text_font)
+                for line, line_x, line_y in fitted.lines:
+                    draw.text((line_x, line_y), line, fill=(30, 58, 138), font=text_font)
                 
-            elif field_type == 'qr':
-                # Decode QR code from base64
-                qr_image_data = base64.b64decode(qr_code_base64)
-                qr_img = Image.open(BytesIO(qr_image_data))
-                
-                # Resize QR code to fit field
+            elif field['type'] == 'qr':
+                # Decode QR code from base64 and fit it to the field
+                qr_img = Image.open(BytesIO(base64.b64decode(qr_code_base64))).convert('RGB')
                 qr_img = qr_img.resize((width, height), Image.Resampling.LANCZOS)
-                
-                # Convert to RGBA if needed
-                if qr_img.mode != 'RGBA':
-                    qr_img = qr_img.convert('RGBA')
-                
-                # Paste QR code onto template
-                template_img.paste(qr_img, (x, y), qr_img if qr_img.mode == 'RGBA' else None)
+                template_img.paste(qr_img, (x, y))
         
-        # Convert back to RGB for JPEG compatibility
-        if template_img.mode == 'RGBA':
-            # Create white background
-            background = Image.new('RGB', template_img.size, (255, 255, 255))
-            background.paste(template_img, mask=template_img.split()[3])
-            template_img = background
-        
-        # Save to buffer
-        output_buffer = BytesIO()
-        template_img.save(output_buffer, format='JPEG', quality=90)
-        output_buffer.seek(0)
-        
-        return base64.b64encode(output_buffer.getvalue()).decode()
+        template_img.save(output, format='JPEG', **PROFILE_JPEG_OPTIONS[profile])
         
     except Exception as e:
         print(f"Error generating certificate image: {e}")
         raise e
 
+def render_to_storage(
+    template: dict,
+    fields: List[Dict],
+    field_data: Dict[str, str],
+    qr_code_base64: str,
+    bucket: str,
+    path: str,
+    profile: str = "standard"
+) -> str:
+    """Render into a temp file and upload it from there (no encoded copy in memory); returns the public URL"""
+    asset = template_render_asset(template, fields, profile)
+    fd, tmp_path = tempfile.mkstemp(prefix="certichain-render-", suffix=".jpg")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            draw_certificate(fetch_template_image(asset["url"]), asset["layout"], field_data, qr_code_base64, output, profile)
+        with open(tmp_path, "rb") as upload:
+            supabase.storage.from_(bucket).upload(
+                path,
+                upload,
+                {"content-type": "image/jpeg", "cache-control": "31536000", "upsert": "true"}
+            )
+    finally:
+        os.remove(tmp_path)
+    return supabase.storage.from_(bucket).get_public_url(path)
+
+async def render_certificate_to_storage(
+    template: dict,
+    fields: List[Dict],
+    field_data: Dict[str, str],
+    qr_code_base64: str,
+    bucket: str,
+    path: str,
+    profile: str = "standard"
+) -> str:
+    """render_to_storage() on the render threads, once its memory estimate fits in the render budget"""
+    async with render_budget.reserve(render_memory_estimate(template, fields, profile)):
+        return await asyncio.get_running_loop().run_in_executor(
+            render_executor,
+            partial(render_to_storage, template, fields, field_data, qr_code_base64, bucket, path, profile)
+        )
+
+async def ensure_render_asset(template: dict, fields: List[Dict], profile: str) -> dict:
+    """template_render_asset() on the render threads, within the render budget if it has to ingest"""
+    asset = (template.get("render_assets") or {}).get(profile)
+    if asset_is_current(asset, template["pdf_url"], fields):
+        return asset
+    async with render_budget.reserve(render_memory_estimate(template, fields, profile)):
+        return await asyncio.get_running_loop().run_in_executor(
+            render_executor,
+            partial(template_render_asset, template, fields, profile)
+        )
+
+def stored_object_url(bucket: str, path: str) -> Optional[str]:
+    """Public URL of `path` if it is already in the bucket, else None"""
+    storage = supabase.storage.from_(bucket)
+    return storage.get_public_url(path) if storage.exists(path) else None
+
+async def start_background_tasks():
+    await verification_log_writer.start()
+    await verification_rollups.start()
+    await certificate_index.start()
+    await status_events.start()
+    await certificate_signer.start()
+    await admission.start()
+    await mint_queue.start()
+
+async def stop_background_tasks():
+    await verification_log_writer.stop()
+    await verification_rollups.stop()
+    await certificate_index.stop()
+    await status_events.stop()
+    await certificate_signer.stop()
+    await admission.stop()
+    await mint_queue.stop()
+
 # API Endpoints
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    return {"status": "healthy", "database_configured": supabase is not None, "timestamp": datetime.utcnow().isoformat()}
 
 # ==========================================
 # SUBSCRIPTION API ENDPOINTS
@@ -400,6 +717,8 @@ async def get_subscription_status(user_id: str):
     try:
         status = await check_subscription_status(user_id)
         return status
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get subscription status: {str(e)}")
 
@@ -430,6 +749,7 @@ async def upgrade_to_pro(request: UpgradeToProRequest):
             "subscription_type": "pro",
             "subscription_expires_at": expires_at.isoformat()
         }).eq("id", instructor["id"]).execute()
+        subscription_cache.delete(request.user_id)
         
         return {
             "success": True,
@@ -439,6 +759,8 @@ async def upgrade_to_pro(request: UpgradeToProRequest):
         }
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upgrade failed: {str(e)}")
 
@@ -461,6 +783,7 @@ async def purchase_credits(request: PurchaseCreditsRequest):
         supabase.table("instructors").update({
             "mint_credits": new_credits
         }).eq("id", instructor["id"]).execute()
+        subscription_cache.delete(request.user_id)
         
         return {
             "success": True,
@@ -472,6 +795,8 @@ async def purchase_credits(request: PurchaseCreditsRequest):
         }
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Credit purchase failed: {str(e)}")
 
@@ -504,6 +829,8 @@ async def check_group_creation_limit(user_id: str):
             "groups_limit": status["groups_limit"],
             "subscription_type": status["subscription_type"]
         }
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Limit check failed: {str(e)}")
 
@@ -522,12 +849,15 @@ async def check_mint_limit(user_id: str, count: int = 1):
             "subscription_type": status["subscription_type"],
             "message": "Sufficient credits" if has_enough else f"Insufficient credits. You have {status['mint_credits']} credits, need {count}. Please purchase more credits."
         }
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Limit check failed: {str(e)}")
 
 @app.post("/api/instructor/generate-wallet")
 async def generate_instructor_wallet() -> WalletResponse:
     try:
+        from eth_account import Account
         account = Account.create()
         return WalletResponse(address=account.address, private_key=account.key.hex())
     except Exception as e:
@@ -571,7 +901,10 @@ async def create_group(group: GroupCreate):
         }).execute()
         if not response.data:
             raise HTTPException(status_code=500, detail="Failed to create group")
+        subscription_cache.delete(group.creator_user_id)
         return {"success": True, "group": response.data[0], "join_code": join_code}
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Group creation failed: {str(e)}")
 
@@ -582,6 +915,8 @@ async def get_group(group_id: str):
         if not response.data:
             raise HTTPException(status_code=404, detail="Group not found")
         return response.data
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -592,13 +927,81 @@ async def get_group_by_join_code(join_code: str):
         if not response.data:
             raise HTTPException(status_code=404, detail="Group not found")
         return response.data
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ==========================================
+# PAGINATED LISTINGS (keyset cursors)
+# ==========================================
+
+GROUP_CERTIFICATE_COLUMNS = (
+    "id, certificate_id, status, nft_id, issued_at, created_at, verification_url, "
+    "recipient_name:canonical_payload->>recipientName, recipient_email:canonical_payload->>recipientEmail"
+)
+INSTRUCTOR_GROUP_COLUMNS = "id, name, description, join_code, status, template_id, created_at"
+VERIFICATION_COLUMNS = "id, verified_at, verifier_ip, verifier_user_agent, trust_score, result_text"
+
+def run_keyset_query(table: str, columns: str, filter_column: str, filter_value: str,
+                     limit: Optional[int], cursor: Optional[str], sort_column: str = "created_at") -> dict:
+    limit = clamp_limit(limit)
+    # Estimated counts come from the planner and cost nothing; only needed on the first page
+    query = supabase.table(table).select(columns, count=None if cursor else "estimated").eq(filter_column, filter_value)
+    response = keyset_page(query, limit, cursor, sort_column).execute()
+    return page_result(response.data or [], limit, sort_column, estimated_total=None if cursor else response.count)
+
+@app.get("/api/groups/{group_id}/certificates")
+async def list_group_certificates(group_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """Certificates of a group, newest first"""
+    try:
+        return run_keyset_query("certificates", GROUP_CERTIFICATE_COLUMNS, "group_id", group_id, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list certificates: {str(e)}")
+
+@app.get("/api/instructors/{instructor_id}/groups")
+async def list_instructor_groups(instructor_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """Groups of an instructor, newest first"""
+    try:
+        return run_keyset_query("groups", INSTRUCTOR_GROUP_COLUMNS, "instructor_id", instructor_id, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list groups: {str(e)}")
+
+@app.get("/api/certificates/{certificate_id}/verifications")
+async def list_certificate_verifications(certificate_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """Verification log of a certificate, newest first"""
+    try:
+        cert = certificate_pk_cache.get(certificate_id)
+        if not cert:
+            cert_response = supabase.table("certificates").select("id, group_id").eq("certificate_id", certificate_id).limit(1).execute()
+            if not cert_response.data:
+                raise HTTPException(status_code=404, detail="Certificate not found")
+            cert = cert_response.data[0]
+            certificate_pk_cache.set(certificate_id, {"id": cert["id"], "group_id": cert.get("group_id")})
+        
+        return run_keyset_query("certificate_verifications", VERIFICATION_COLUMNS, "certificate_pk", cert["id"], limit, cursor, sort_column="verified_at")
+    except HTTPException:
+        raise
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list verifications: {str(e)}")
+
 @app.post("/api/crossmint/collection")
 async def create_nft_collection(collection: CollectionCreate):
+    import httpx
     try:
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=crossmint_transport) as client:
             response = await client.post(
                 f"{CROSSMINT_BASE_URL}/collections",
                 headers={"X-API-KEY": CROSSMINT_API_KEY, "Content-Type": "application/json"},
@@ -623,10 +1026,45 @@ async def create_nft_collection(collection: CollectionCreate):
                 "contract_address": data.get("contractAddress")
             }).execute()
             return data
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Collection creation failed: {str(e)}")
 
 
+@app.post("/api/templates/{template_id}/ingest")
+async def ingest_certificate_template(template_id: str):
+    """Normalize a saved template and precompute its field layout (call after saving template_fields)"""
+    try:
+        template_response = supabase.table("certificate_templates").select("*").eq("id", template_id).limit(1).execute()
+        if not template_response.data:
+            raise HTTPException(status_code=404, detail="Template not found")
+        template = template_response.data[0]
+        fields = supabase.table("template_fields").select("*").eq("template_id", template_id).execute().data or []
+        
+        assets = await asyncio.to_thread(ingest_template_record, template, fields)
+        return {
+            "success": True,
+            "template_id": template_id,
+            "render_assets": {
+                profile: {"url": asset["url"], "width": asset["width"], "height": asset["height"], "fields": len(asset["layout"])}
+                for profile, asset in assets.items()
+            }
+        }
+    except HTTPException:
+        raise
+    except TemplateImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TemplateSourceError as e:
+        # 4xx: the stored URL is broken for good; anything else may clear up on retry
+        permanent = e.status_code is not None and 400 <= e.status_code < 500
+        raise HTTPException(status_code=400 if permanent else 502, detail=str(e))
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Template ingestion failed: {str(e)}")
+
+
 # ==========================================
 # NEW: MAIN MINTING ENDPOINT
 # ==========================================
@@ -640,9 +1078,13 @@ async def mint_certificate(request: MintCertificateRequest):
     4. Mints NFT via Crossmint with all metadata
     5. Updates database with NFT details
     6. Deducts mint credits
+    
+    Each stage is timed into the certichain_pipeline_stage_seconds histogram (see /metrics)
     """
+    timer = PipelineTimer("mint")
     try:
         # 1. Get the existing certificate record
+        timer.stage("db_lookup")
         cert_response = supabase.table("certificates").select("*").eq("id", request.certificate_db_id).single().execute()
         if not cert_response.data:
             raise HTTPException(status_code=404, detail="Certificate not found")
@@ -665,16 +1107,18 @@ async def mint_certificate(request: MintCertificateRequest):
         fields = fields_response.data or []
         
         # 4. Get instructor info for signing
-        instructor_response = supabase.table("instructors").select("*").eq("id", group["instructor_id"]).single().execute()
+        instructor_response = supabase.table("instructors").select(
+            "id, user_id, name, wallet_address, total_certificates_issued"
+        ).eq("id", group["instructor_id"]).single().execute()
         if not instructor_response.data or not instructor_response.data.get("wallet_address"):
             raise HTTPException(status_code=400, detail="Instructor wallet not configured")
         
         instructor = instructor_response.data
         issuer_wallet = instructor["wallet_address"]
-        issuer_private_key = instructor.get("private_key_encrypted")
         issuer_name = instructor.get("name", "Instructor")
         
         # 4.5 CHECK MINT CREDITS
+        timer.stage("credit_check")
         user_id = instructor.get("user_id")
         if user_id:
             status = await check_subscription_status(user_id)
@@ -696,30 +1140,23 @@ async def mint_certificate(request: MintCertificateRequest):
         verification_url = f"{APP_URL}/verify/{certificate_id}"
         
         # 7. Generate dynamic QR code pointing to verification URL
+        timer.stage("qr")
         qr_code_base64 = generate_qr_code(verification_url)
         
-        # 8. Generate certificate image with fields and QR code
-        certificate_image_base64 = generate_certificate_image(
-            template_url=template["pdf_url"],  # This is actually the image URL now
+        # 8-9. Generate certificate image with fields and QR code, streamed from a temp file to Supabase storage
+        timer.stage("render")
+        image_filename = f"certificate-{certificate_id}.jpg"
+        image_public_url = await render_certificate_to_storage(
+            template=template,
             fields=fields,
             field_data=request.field_data,
-            qr_code_base64=qr_code_base64
+            qr_code_base64=qr_code_base64,
+            bucket="certificate-pdfs",
+            path=image_filename
         )
         
-        # 9. Upload certificate image to Supabase storage
-        image_filename = f"certificate-{certificate_id}.jpg"
-        image_bytes = base64.b64decode(certificate_image_base64)
-        
-        upload_response = supabase.storage.from_("certificate-pdfs").upload(
-            image_filename,
-            image_bytes,
-            {"content-type": "image/jpeg", "upsert": "true"}
-        )
-        
-        # Get public URL for the uploaded image
-        image_public_url = supabase.storage.from_("certificate-pdfs").get_public_url(image_filename)
-        
         # 10. Build canonical payload for signing
+        timer.stage("sign")
         certificate_data = {
             "certificateId": certificate_id,
             "recipientName": request.recipient_name,
@@ -737,26 +1174,30 @@ async def mint_certificate(request: MintCertificateRequest):
         # 11. Create canonical payload and sign
         canonical_payload = create_canonical_payload(certificate_data)
         certificate_hash = hash_message(canonical_payload)
-        issuer_signature = sign_message(canonical_payload, issuer_private_key)
+        issuer_signature = await sign_canonical_payload(instructor["id"], issuer_wallet, canonical_payload)
         
         # 12. Mint NFT via Crossmint
+        timer.stage("crossmint")
         collection_id = group.get("collection_id") or "default-certichain-collection"
         
-        nft_result = await mint_nft_crossmint(
-            collection_id=collection_id,
-            certificate_id=certificate_id,
-            certificate_data=certificate_data,
-            certificate_hash=certificate_hash,
-            issuer_signature=issuer_signature,
-            canonical_payload=canonical_payload,
-            image_url=image_public_url,
-            recipient_email=request.recipient_email
-        )
+        mint_args = {
+            "collection_id": collection_id,
+            "certificate_id": certificate_id,
+            "certificate_data": certificate_data,
+            "certificate_hash": certificate_hash,
+            "issuer_signature": issuer_signature,
+            "canonical_payload": canonical_payload,
+            "image_url": image_public_url,
+            "recipient_email": request.recipient_email
+        }
+        nft_result = await mint_nft_or_defer(**mint_args)
         
         # 13. Update certificate in database with all minting data
+        timer.stage("db_update")
         update_data = {
             "certificate_id": certificate_id,
             "canonical_payload": certificate_data,
+            "canonical_payload_text": canonical_payload,
             "certificate_hash": certificate_hash,
             "issuer_signature": issuer_signature,
             "nft_id": nft_result.get("nft_id"),
@@ -768,11 +1209,15 @@ async def mint_certificate(request: MintCertificateRequest):
             "qr_code_data": verification_url,
             "qr_code_image": f"data:image/png;base64,{qr_code_base64}",
             "ipfs_url": image_public_url,  # Using Supabase storage URL instead of IPFS
-            "status": "minted" if nft_result.get("nft_id") and not nft_result.get("nft_id", "").startswith("error") else "pending",
+            "status": "minted" if nft_minted(nft_result.get("nft_id")) else "pending",
             "updated_at": datetime.utcnow().isoformat()
         }
         
         supabase.table("certificates").update(update_data).eq("id", request.certificate_db_id).execute()
+        if nft_result.get("deferred"):
+            mint_queue.enqueue(certificate_id, {"mint": mint_args, "status_on_success": "minted"})
+        certificate_pk_cache.set(certificate_id, {"id": request.certificate_db_id, "group_id": group["id"]})
+        certificate_index.add(certificate_id)
         
         # 14. Update instructor's certificate count
         supabase.table("instructors").update({
@@ -782,6 +1227,7 @@ async def mint_certificate(request: MintCertificateRequest):
         # 15. DEDUCT MINT CREDITS after successful minting
         if user_id:
             await deduct_mint_credits(user_id, 1)
+        timer.finish()
         
         return {
             "success": True,
@@ -793,13 +1239,19 @@ async def mint_certificate(request: MintCertificateRequest):
             "recipient_wallet": nft_result.get("recipient_wallet"),
             "qr_code": qr_code_base64,
             "certificate_image_url": image_public_url,
-            "message": "Certificate minted successfully!"
+            "queued": bool(nft_result.get("deferred")),
+            "message": "Certificate issued; NFT minting is queued" if nft_result.get("deferred") else "Certificate minted successfully!"
         }
         
     except HTTPException:
+        timer.finish("rejected")
         raise
+    except CircuitOpenError as e:
+        timer.finish("unavailable")
+        raise dependency_unavailable(e)
     except Exception as e:
-        print(f"Minting error: {e}")
+        timer.finish("error")
+        logger.exception("Minting failed for certificate row %s", request.certificate_db_id)
         raise HTTPException(status_code=500, detail=f"Certificate minting failed: {str(e)}")
 
 
@@ -813,9 +1265,16 @@ async def mint_nft_crossmint(
     image_url: str,
     recipient_email: str
 ) -> dict:
-    """Mint NFT certificate on Crossmint with all metadata"""
+    """Mint NFT certificate on Crossmint with all metadata
+
+    Raises CircuitOpenError while the Crossmint breaker is open; failures are
+    returned as placeholder results with "retryable" set for errors worth retrying.
+    """
+    import httpx
+    crossmint_breaker.before_call()
+    started = time.monotonic()
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with httpx.AsyncClient(timeout=CROSSMINT_TIMEOUT, transport=crossmint_transport) as client:
             response = await client.post(
                 f"{CROSSMINT_BASE_URL}/collections/{collection_id}/nfts",
                 headers={
@@ -849,19 +1308,27 @@ async def mint_nft_crossmint(
                 }
             )
             
-            print(f"Crossmint response status: {response.status_code}")
-            print(f"Crossmint response: {response.text}")
+            record_crossmint_response("mint", response.status_code)
+            logger.debug("Crossmint mint of %s returned HTTP %s", certificate_id, response.status_code)
             
             if response.status_code not in [200, 201]:
-                print(f"NFT minting error: {response.text}")
+                # Bodies can echo the whole payload; keep the log line short
+                logger.warning("Crossmint mint of %s failed: HTTP %s %s", certificate_id, response.status_code, response.text[:300])
+                retryable = is_failure_status(response.status_code)
+                if retryable:
+                    crossmint_breaker.record_failure(f"HTTP {response.status_code}")
+                else:
+                    crossmint_breaker.record_success()
                 return {
                     "nft_id": f"pending-{certificate_id}",
                     "token_id": "pending",
                     "transaction_hash": "pending",
                     "recipient_wallet": "pending",
-                    "contract_address": ""
+                    "contract_address": "",
+                    "retryable": retryable
                 }
             
+            crossmint_breaker.record_success(time.monotonic() - started)
             nft_data = response.json()
             return {
                 "nft_id": nft_data.get("id"),
@@ -872,56 +1339,119 @@ async def mint_nft_crossmint(
             }
             
     except Exception as e:
-        print(f"NFT minting failed: {e}")
+        logger.warning("Crossmint mint of %s failed: %s", certificate_id, e)
+        crossmint_breaker.record_failure(f"{type(e).__name__}: {e}")
         return {
             "nft_id": f"error-{certificate_id}",
             "token_id": "error",
             "transaction_hash": "error",
             "recipient_wallet": "error",
-            "contract_address": ""
+            "contract_address": "",
+            "retryable": True
         }
 
+def nft_minted(nft_id: Optional[str]) -> bool:
+    return bool(nft_id) and not nft_id.startswith(("error", "pending", QUEUED_NFT_PREFIX))
 
-@app.post("/api/certificates/claim")
-async def claim_certificate(claim: CertificateClaimRequest):
-    """MAIN ENDPOINT: Student claims certificate"""
+async def mint_nft_or_defer(**mint_args) -> dict:
+    """mint_nft_crossmint(), or a queued placeholder when Crossmint is unavailable
+
+    A "deferred" result means the caller must mint_queue.enqueue() the same
+    arguments once the certificate row exists.
+    """
+    certificate_id = mint_args["certificate_id"]
     try:
-        # Get group by join code
-        group_response = supabase.table("groups").select("*").eq("join_code", claim.join_code).single().execute()
-        if not group_response.data:
-            raise HTTPException(status_code=404, detail="Invalid join code")
-        group = group_response.data
-        
-        # Get instructor/issuer info
+        result = await mint_nft_crossmint(**mint_args)
+        if not result.get("retryable"):
+            return result
+    except CircuitOpenError:
+        pass
+    return {
+        "nft_id": f"{QUEUED_NFT_PREFIX}{certificate_id}",
+        "token_id": "queued",
+        "transaction_hash": "queued",
+        "recipient_wallet": "queued",
+        "contract_address": "",
+        "deferred": True
+    }
+
+async def process_mint_job(job: dict):
+    """Mint queue handler: retry a deferred mint and fill in the certificate row"""
+    certificate_id = job["certificate_id"]
+    payload = job["payload"]
+    result = payload.get("result")
+    if result is None:
         try:
-            issuer_response = supabase.table("instructors").select("*").eq("id", group["instructor_id"]).single().execute()
-            if issuer_response.data and issuer_response.data.get("wallet_address"):
-                issuer = issuer_response.data
-                issuer_wallet = issuer["wallet_address"]
-                issuer_private_key = issuer.get("private_key_encrypted")
-            else:
-                raise Exception("No instructor found")
-        except:
-            temp_account = Account.create()
-            issuer_wallet = temp_account.address
-            issuer_private_key = temp_account.key.hex()
-        
-        # Get template
-        template = None
-        if group.get("template_id"):
-            template_response = supabase.table("certificate_templates").select("*").eq("id", group["template_id"]).single().execute()
-            if template_response.data:
-                template = template_response.data
-        
+            result = await mint_nft_crossmint(**payload["mint"])
+        except CircuitOpenError as e:
+            mint_queue.postpone(job, e.retry_after)
+            return
+        if result.get("retryable"):
+            if mint_queue.retry(job, result["nft_id"]):
+                return
+            logger.error("Giving up on deferred mint of %s", certificate_id)
+            result["given_up"] = True
+        result = {key: value for key, value in result.items() if key != "retryable"}
+        mint_queue.save_result(job, result)
+    
+    update = {
+        "nft_id": result.get("nft_id"),
+        "contract_address": result.get("contract_address", ""),
+        "token_id": result.get("token_id"),
+        "blockchain_tx": result.get("transaction_hash"),
+        "recipient_wallet": result.get("recipient_wallet"),
+        "updated_at": datetime.utcnow().isoformat()
+    }
+    if payload.get("status_on_success") and nft_minted(result.get("nft_id")):
+        update["status"] = payload["status_on_success"]
+    # Only replace the queued placeholder; a revoked or reissued row keeps its own state
+    await asyncio.to_thread(
+        lambda: supabase.table("certificates").update(update)
+        .eq("certificate_id", certificate_id)
+        .eq("nft_id", f"{QUEUED_NFT_PREFIX}{certificate_id}")
+        .execute()
+    )
+    mint_queue.complete(job["id"], dropped=bool(result.get("given_up")))
+    status_events.publish(CERTIFICATE_STATUS_CHANNEL, {"certificate_id": certificate_id})
+
+
+async def sign_canonical_payload(issuer_id: str, issuer_wallet: str, message: str) -> str:
+    """Sign through the signer; a cached key that no longer matches the wallet is reloaded once"""
+    try:
+        signed = await certificate_signer.sign(issuer_id, message)
+        if signed.wallet.lower() != issuer_wallet.lower():
+            await certificate_signer.evict(issuer_id)
+            signed = await certificate_signer.sign(issuer_id, message)
+    except SigningKeyUnavailable as e:
+        raise HTTPException(status_code=400, detail=f"Issuer signing key unavailable: {str(e)}")
+    except SigningError as e:
+        raise HTTPException(status_code=503, detail=f"Signing service unavailable: {str(e)}")
+    if signed.wallet.lower() != issuer_wallet.lower():
+        raise HTTPException(status_code=400, detail="Issuer signing key does not match the instructor wallet")
+    return signed.signature
+
+async def issue_certificate(
+    group: dict,
+    issuer_wallet: str,
+    issuer_id: str,
+    recipient_name: str,
+    recipient_email: str,
+    student_id: Optional[str] = None,
+    certificate_id: Optional[str] = None
+) -> dict:
+    """Sign, mint and store one certificate for a group (claim flow and roster imports)"""
+    timer = PipelineTimer("issue")
+    try:
         # Generate certificate ID and data
-        certificate_id = generate_certificate_id()
+        timer.stage("sign")
+        certificate_id = certificate_id or generate_certificate_id()
         verification_url = f"{APP_URL}/verify/{certificate_id}"
         
         certificate_data = {
             "certificateId": certificate_id,
-            "recipientName": claim.recipient_name,
-            "recipientEmail": claim.recipient_email,
-            "studentId": claim.student_id or "",
+            "recipientName": recipient_name,
+            "recipientEmail": recipient_email,
+            "studentId": student_id or "",
             "courseName": group["name"],
             "issuerName": "Instructor",
             "issuerWallet": issuer_wallet,
@@ -933,32 +1463,37 @@ async def claim_certificate(claim: CertificateClaimRequest):
         # Create canonical payload and sign
         canonical_payload = create_canonical_payload(certificate_data)
         certificate_hash = hash_message(canonical_payload)
-        issuer_signature = sign_message(canonical_payload, issuer_private_key)
+        issuer_signature = await sign_canonical_payload(issuer_id, issuer_wallet, canonical_payload)
         
         # Generate QR code
+        timer.stage("qr")
         qr_base64 = generate_qr_code(verification_url)
         
         # Simulate IPFS URL (using certificate image URL)
         ipfs_url = f"ipfs://Qm{certificate_id[:40]}"
         
         # Mint NFT
-        nft_result = await mint_nft_crossmint(
-            collection_id=group.get("collection_id") or "default-certichain-collection",
-            certificate_id=certificate_id,
-            certificate_data=certificate_data,
-            certificate_hash=certificate_hash,
-            issuer_signature=issuer_signature,
-            canonical_payload=canonical_payload,
-            image_url=ipfs_url,
-            recipient_email=claim.recipient_email
-        )
+        timer.stage("crossmint")
+        mint_args = {
+            "collection_id": group.get("collection_id") or "default-certichain-collection",
+            "certificate_id": certificate_id,
+            "certificate_data": certificate_data,
+            "certificate_hash": certificate_hash,
+            "issuer_signature": issuer_signature,
+            "canonical_payload": canonical_payload,
+            "image_url": ipfs_url,
+            "recipient_email": recipient_email
+        }
+        nft_result = await mint_nft_or_defer(**mint_args)
         
         # Save certificate to database
-        supabase.table("certificates").insert({
+        timer.stage("db_insert")
+        insert_response = supabase.table("certificates").insert({
             "certificate_id": certificate_id,
             "group_id": group["id"],
             "claimed_by_user_id": None,
             "canonical_payload": certificate_data,
+            "canonical_payload_text": canonical_payload,
             "certificate_hash": certificate_hash,
             "issuer_signature": issuer_signature,
             "nft_id": nft_result.get("nft_id"),
@@ -970,170 +1505,745 @@ async def claim_certificate(claim: CertificateClaimRequest):
             "status": "valid",
             "issued_at": datetime.utcnow().isoformat()
         }).execute()
+        if insert_response.data:
+            certificate_pk_cache.set(certificate_id, {"id": insert_response.data[0]["id"], "group_id": group["id"]})
+        certificate_index.add(certificate_id)
+        if nft_result.get("deferred"):
+            mint_queue.enqueue(certificate_id, {"mint": mint_args})
+        timer.finish()
         
         return {
-            "success": True,
             "certificate_id": certificate_id,
             "verification_url": verification_url,
             "nft_id": nft_result.get("nft_id"),
-            "qr_code": qr_base64,
+            "queued": bool(nft_result.get("deferred")),
+            "qr_code": qr_base64
+        }
+    except Exception:
+        timer.finish("error")
+        raise
+
+@app.post("/api/certificates/claim")
+async def claim_certificate(claim: CertificateClaimRequest):
+    """MAIN ENDPOINT: Student claims certificate"""
+    try:
+        # Get group by join code
+        group_response = supabase.table("groups").select("*").eq("join_code", claim.join_code).single().execute()
+        if not group_response.data:
+            raise HTTPException(status_code=404, detail="Invalid join code")
+        group = group_response.data
+        
+        # Get instructor/issuer info
+        try:
+            issuer_response = supabase.table("instructors").select("id, wallet_address").eq("id", group["instructor_id"]).single().execute()
+            if issuer_response.data and issuer_response.data.get("wallet_address"):
+                issuer = issuer_response.data
+                issuer_wallet = issuer["wallet_address"]
+                issuer_id = issuer["id"]
+            else:
+                raise Exception("No instructor found")
+        except CircuitOpenError:
+            raise
+        except:
+            issuer_id, issuer_wallet = await certificate_signer.create_ephemeral_issuer()
+        
+        # Get template
+        template = None
+        if group.get("template_id"):
+            template_response = supabase.table("certificate_templates").select("*").eq("id", group["template_id"]).single().execute()
+            if template_response.data:
+                template = template_response.data
+        
+        issued = await issue_certificate(
+            group=group,
+            issuer_wallet=issuer_wallet,
+            issuer_id=issuer_id,
+            recipient_name=claim.recipient_name,
+            recipient_email=claim.recipient_email,
+            student_id=claim.student_id
+        )
+        certificate_id = issued["certificate_id"]
+        
+        return {
+            "success": True,
+            "certificate_id": certificate_id,
+            "verification_url": issued["verification_url"],
+            "nft_id": issued["nft_id"],
+            "qr_code": issued["qr_code"],
             "pdf_download_url": f"/api/certificates/{certificate_id}/download",
-            "message": "Certificate minted successfully!"
+            "queued": issued["queued"],
+            "message": "Certificate issued; NFT minting is queued" if issued["queued"] else "Certificate minted successfully!"
         }
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Certificate claim failed: {str(e)}")
 
 
-@app.get("/api/certificates/verify/{certificate_id}")
-async def verify_certificate(certificate_id: str):
-    """Verify certificate by ID (QR code scan endpoint)"""
+@app.get("/api/groups/{group_id}/export")
+async def export_group_certificates(group_id: str, format: str = "zip"):
+    """Stream every certificate of a group (payloads, hashes, signatures, NFT ids, images)"""
+    if format not in ("zip", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'zip' or 'ndjson'")
     try:
-        cert_response = supabase.table("certificates").select("*").eq("certificate_id", certificate_id).single().execute()
-        if not cert_response.data:
-            return {"verified": False, "message": "Certificate not found"}
+        group_response = supabase.table("groups").select("id").eq("id", group_id).limit(1).execute()
+        if not group_response.data:
+            raise HTTPException(status_code=404, detail="Group not found")
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_ndjson(lambda: supabase, group_id),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f"attachment; filename=group-{group_id}.ndjson"}
+        )
+    return StreamingResponse(
+        stream_zip(lambda: supabase, group_id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=group-{group_id}.zip"}
+    )
+
+
+# ==========================================
+# OFFLINE VERIFICATION BUNDLES
+# ==========================================
+BUNDLE_COLUMNS = (
+    "id, certificate_id, certificate_hash, issuer_signature, status, created_at, "
+    "issuer_wallet:canonical_payload->>issuerWallet"
+)
+
+def iter_bundle_certificates(group_ids: List[str]):
+    for group_id in group_ids:
+        cursor = None
+        while True:
+            query = supabase.table("certificates").select(BUNDLE_COLUMNS).eq("group_id", group_id)
+            rows = keyset_page(query, MAX_PAGE_SIZE, cursor).execute().data or []
+            page = page_result(rows, MAX_PAGE_SIZE)
+            yield from page["items"]
+            if not page["has_more"]:
+                break
+            cursor = page["next_cursor"]
+
+def get_signing_instructor(instructor_id: str) -> dict:
+    instructor_response = supabase.table("instructors").select("id, wallet_address").eq("id", instructor_id).limit(1).execute()
+    if not instructor_response.data or not instructor_response.data[0].get("wallet_address"):
+        raise HTTPException(status_code=400, detail="Instructor wallet not configured")
+    return instructor_response.data[0]
+
+async def sign_bundle(bundle: dict, instructor: dict) -> dict:
+    bundle["bundle_signature"] = await sign_canonical_payload(
+        instructor["id"], instructor["wallet_address"], bundle_signing_message(bundle)
+    )
+    return bundle
+
+@app.get("/api/groups/{group_id}/verification-bundle")
+async def group_verification_bundle(group_id: str):
+    """Signed offline verification bundle for every certificate of a group"""
+    try:
+        group_response = supabase.table("groups").select("id, instructor_id").eq("id", group_id).limit(1).execute()
+        if not group_response.data:
+            raise HTTPException(status_code=404, detail="Group not found")
+        instructor = get_signing_instructor(group_response.data[0]["instructor_id"])
         
-        cert = cert_response.data
-        canonical_payload = cert.get("canonical_payload", {})
+        bundle = await asyncio.to_thread(lambda: build_bundle(
+            "group", group_id, instructor["wallet_address"], iter_bundle_certificates([group_id])
+        ))
+        return await sign_bundle(bundle, instructor)
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bundle generation failed: {str(e)}")
+
+@app.get("/api/instructors/{instructor_id}/verification-bundle")
+async def instructor_verification_bundle(instructor_id: str):
+    """Signed offline verification bundle for every certificate issued by an instructor"""
+    try:
+        instructor = get_signing_instructor(instructor_id)
+        groups_response = supabase.table("groups").select("id").eq("instructor_id", instructor_id).execute()
+        group_ids = [group["id"] for group in groups_response.data or []]
+        
+        bundle = await asyncio.to_thread(lambda: build_bundle(
+            "issuer", instructor_id, instructor["wallet_address"], iter_bundle_certificates(group_ids)
+        ))
+        return await sign_bundle(bundle, instructor)
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bundle generation failed: {str(e)}")
+
+
+# ==========================================
+# ROSTER IMPORT (batch issuance from CSV/XLSX)
+# ==========================================
+ROSTER_CHUNK_SIZE = int(os.getenv("ROSTER_CHUNK_SIZE", "200"))
+ROSTER_MINT_CONCURRENCY = int(os.getenv("ROSTER_MINT_CONCURRENCY", "4"))
+ROSTER_MAX_REPORTED_ERRORS = 100
+
+def existing_recipient_emails(group_id: str, emails: List[str]) -> set:
+    """Lowercased emails in `emails` that already have a certificate in the group (one indexed query)"""
+    if not emails:
+        return set()
+    normalized = sorted({email.lower() for email in emails})
+    response = supabase.table("certificates").select(
+        "recipient_email_normalized"
+    ).eq("group_id", group_id).in_("recipient_email_normalized", normalized).execute()
+    return {row["recipient_email_normalized"] for row in response.data or [] if row.get("recipient_email_normalized")}
+
+@app.post("/api/groups/{group_id}/roster")
+async def import_roster(group_id: str, file: UploadFile = File(...)):
+    """
+    Issue certificates for every recipient in a CSV/XLSX roster
+    Columns: name, email and optional student_id. The file is parsed as a stream
+    in chunks; each chunk is deduplicated against existing certificates and minted.
+    """
+    try:
+        group_response = supabase.table("groups").select("*").eq("id", group_id).limit(1).execute()
+        if not group_response.data:
+            raise HTTPException(status_code=404, detail="Group not found")
+        group = group_response.data[0]
         
-        # Handle both string and dict canonical_payload
-        if isinstance(canonical_payload, str):
-            canonical_payload_str = canonical_payload
-            canonical_payload = json.loads(canonical_payload)
-        else:
-            canonical_payload_str = json.dumps(canonical_payload)
+        instructor_response = supabase.table("instructors").select("id, user_id, wallet_address").eq("id", group["instructor_id"]).limit(1).execute()
+        if not instructor_response.data or not instructor_response.data[0].get("wallet_address"):
+            raise HTTPException(status_code=400, detail="Instructor wallet not configured")
+        instructor = instructor_response.data[0]
         
-        certificate_hash = cert.get("certificate_hash", "")
-        issuer_signature = cert.get("issuer_signature", "")
+        user_id = instructor.get("user_id")
+        remaining_credits = None
+        if user_id:
+            remaining_credits = (await check_subscription_status(user_id))["mint_credits"]
+        
+        summary = {"rows": 0, "issued": 0, "duplicates": 0, "invalid": 0, "failed": 0, "skipped_no_credits": 0}
+        errors = []
+        semaphore = asyncio.Semaphore(ROSTER_MINT_CONCURRENCY)
+        
+        def report(line: int, message: str):
+            if len(errors) < ROSTER_MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "error": message})
+        
+        async def issue_row(row, certificate_id: str):
+            async with semaphore:
+                return await issue_certificate(
+                    group=group,
+                    issuer_wallet=instructor["wallet_address"],
+                    issuer_id=instructor["id"],
+                    recipient_name=row.recipient_name,
+                    recipient_email=row.recipient_email,
+                    student_id=row.student_id,
+                    certificate_id=certificate_id
+                )
         
-        # Get issuer wallet from canonical_payload
-        issuer_wallet = canonical_payload.get("issuerWallet", "")
+        chunks = iter_validated_chunks(file.file, file.filename or "", ROSTER_CHUNK_SIZE)
+        while True:
+            # Parsing touches the spooled upload on disk, keep it off the event loop
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            valid, invalid = chunk
+            summary["rows"] += len(valid) + len(invalid)
+            summary["invalid"] += len(invalid)
+            for line, message in invalid:
+                report(line, message)
+            
+            existing = await asyncio.to_thread(existing_recipient_emails, group_id, [row.recipient_email for _, row in valid])
+            to_issue = []
+            for line, row in valid:
+                email = row.recipient_email.lower()
+                if email in existing:
+                    summary["duplicates"] += 1
+                    continue
+                existing.add(email)
+                to_issue.append((line, row))
+            
+            if remaining_credits is not None:
+                allowed = max(remaining_credits, 0)
+                summary["skipped_no_credits"] += max(len(to_issue) - allowed, 0)
+                to_issue = to_issue[:allowed]
+            if not to_issue:
+                continue
+            
+            certificate_ids = ids.allocate_certificate_ids(len(to_issue))
+            results = await asyncio.gather(
+                *(issue_row(row, certificate_id) for (_, row), certificate_id in zip(to_issue, certificate_ids)),
+                return_exceptions=True
+            )
+            issued_in_chunk = 0
+            for (line, _), result in zip(to_issue, results):
+                if isinstance(result, Exception):
+                    summary["failed"] += 1
+                    report(line, str(result))
+                else:
+                    issued_in_chunk += 1
+            summary["issued"] += issued_in_chunk
+            
+            if user_id and issued_in_chunk:
+                await deduct_mint_credits(user_id, issued_in_chunk)
+                remaining_credits -= issued_in_chunk
         
-        # Verification checks
+        return {"success": True, "group_id": group_id, **summary, "errors": errors}
+    except HTTPException:
+        raise
+    except RosterFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Roster import failed: {str(e)}")
+    finally:
+        await file.close()
+
+
+# Columns each part of the verification document needs; the integrity checks
+# (and therefore verified/trustScore) always need VERIFY_CORE_COLUMNS.
+VERIFY_CORE_COLUMNS = ["id", "group_id", "status", "canonical_payload", "canonical_payload_text", "certificate_hash", "issuer_signature", "nft_id"]
+VERIFY_FIELD_COLUMNS = {
+    "verified": [],
+    "trustScore": [],
+    "certificateId": [],
+    "revoked": [],
+    "certificate": ["recipient_wallet", "issued_at"],
+    "verification": ["contract_address", "token_id", "blockchain_tx", "recipient_wallet"],
+    "blockchain": ["contract_address", "token_id", "blockchain_tx"],
+    "storage": ["ipfs_url", "qr_code_image"]
+}
+VERIFY_COMPACT_COLUMNS = VERIFY_CORE_COLUMNS + ["issued_at"]
+
+def verify_select_columns(top_level_fields: Optional[List[str]] = None) -> str:
+    columns = list(VERIFY_CORE_COLUMNS)
+    for field in top_level_fields if top_level_fields is not None else VERIFY_FIELD_COLUMNS:
+        for column in VERIFY_FIELD_COLUMNS.get(field, []):
+            if column not in columns:
+                columns.append(column)
+    return ", ".join(columns)
+
+def run_verification_checks(cert: dict) -> dict:
+    """Recompute hash and signature for a certificate row"""
+    canonical_payload = cert.get("canonical_payload", {})
+    certificate_hash = cert.get("certificate_hash", "")
+    issuer_signature = cert.get("issuer_signature", "")
+    
+    # Hash the exact string signed at mint; older rows only have the JSONB
+    # payload, whose signed encoding has to be reconstructed
+    canonical_payload_str = cert.get("canonical_payload_text")
+    if not canonical_payload_str and isinstance(canonical_payload, str):
+        canonical_payload_str = canonical_payload
+    if canonical_payload_str:
+        canonical_payload = json.loads(canonical_payload_str)
         recalculated_hash = hash_message(canonical_payload_str)
-        data_integrity_valid = recalculated_hash == certificate_hash
-        data_integrity_status = "✅ VERIFIED" if data_integrity_valid else "❌ TAMPERED"
-        
-        signature_valid = verify_signature(canonical_payload_str, issuer_signature, issuer_wallet) if issuer_signature and issuer_wallet else False
-        signature_status = "✅ VERIFIED" if signature_valid else "❌ INVALID"
-        
-        nft_id = cert.get("nft_id", "")
-        nft_exists = nft_id and not nft_id.startswith("error") and not nft_id.startswith("pending")
-        nft_status = "✅ MINTED" if nft_exists else "⏳ PENDING"
-        
-        # Calculate trust score
-        checks_passed = sum([data_integrity_valid, signature_valid, nft_exists, True, True])
-        trust_score = int((checks_passed / 5) * 100)
-        
-        # Get field data for display
-        field_data = cert.get("field_data", {}) or canonical_payload.get("fieldData", {})
-        
-        return {
-            "verified": trust_score >= 60,
-            "trustScore": trust_score,
-            "certificateId": certificate_id,
-            "certificate": {
-                "recipient": {
-                    "name": canonical_payload.get("recipientName", "") or field_data.get("Recipient Name", ""),
-                    "email": canonical_payload.get("recipientEmail", ""),
-                    "studentId": canonical_payload.get("studentId", ""),
-                    "wallet": cert.get("recipient_wallet", "")
-                },
-                "course": {
-                    "name": canonical_payload.get("courseName", ""),
-                    "completionDate": cert.get("issued_at", "")[:10] if cert.get("issued_at") else ""
-                },
-                "issuer": {
-                    "name": canonical_payload.get("issuerName", ""),
-                    "wallet": issuer_wallet,
-                    "verified": True
-                },
-                "fieldData": field_data
+    else:
+        for canonical_payload_str in canonical_payload_candidates(canonical_payload):
+            recalculated_hash = hash_message(canonical_payload_str)
+            if recalculated_hash == certificate_hash:
+                break
+    
+    # Get issuer wallet from canonical_payload
+    issuer_wallet = canonical_payload.get("issuerWallet", "")
+    
+    # Verification checks
+    data_integrity_valid = recalculated_hash == certificate_hash
+    signature_valid = verify_signature(canonical_payload_str, issuer_signature, issuer_wallet) if issuer_signature and issuer_wallet else False
+    
+    nft_id = cert.get("nft_id", "") or ""
+    nft_exists = nft_minted(nft_id)
+    
+    # Calculate trust score
+    checks_passed = sum([data_integrity_valid, signature_valid, nft_exists, True, True])
+    trust_score = int((checks_passed / 5) * 100)
+    
+    return {
+        "canonical_payload": canonical_payload,
+        "certificate_hash": certificate_hash,
+        "issuer_signature": issuer_signature,
+        "issuer_wallet": issuer_wallet,
+        "nft_id": nft_id,
+        "data_integrity_valid": data_integrity_valid,
+        "signature_valid": signature_valid,
+        "nft_exists": nft_exists,
+        "trust_score": trust_score
+    }
+
+def build_verification_response(cert: dict, certificate_id: str, checks: dict) -> dict:
+    """Full verification document (the default view)"""
+    canonical_payload = checks["canonical_payload"]
+    certificate_hash = checks["certificate_hash"]
+    issuer_signature = checks["issuer_signature"]
+    issuer_wallet = checks["issuer_wallet"]
+    nft_id = checks["nft_id"]
+    data_integrity_valid = checks["data_integrity_valid"]
+    signature_valid = checks["signature_valid"]
+    nft_exists = checks["nft_exists"]
+    trust_score = checks["trust_score"]
+    
+    data_integrity_status = "✅ VERIFIED" if data_integrity_valid else "❌ TAMPERED"
+    signature_status = "✅ VERIFIED" if signature_valid else "❌ INVALID"
+    nft_status = "✅ MINTED" if nft_exists else "⏳ PENDING"
+    
+    # Get field data for display (certificates has no field_data column; it lives in the signed payload)
+    field_data = canonical_payload.get("fieldData") or {}
+    
+    return {
+        "verified": trust_score >= 60 and not checks.get("revoked"),
+        "trustScore": trust_score,
+        "certificateId": certificate_id,
+        "revoked": checks.get("revoked", False),
+        "certificate": {
+            "recipient": {
+                "name": canonical_payload.get("recipientName", "") or field_data.get("Recipient Name", ""),
+                "email": canonical_payload.get("recipientEmail", ""),
+                "studentId": canonical_payload.get("studentId", ""),
+                "wallet": cert.get("recipient_wallet", "")
             },
-            "verification": {
-                "dataIntegrity": {
-                    "status": data_integrity_status,
-                    "message": "Certificate data has not been tampered" if data_integrity_valid else "Data may have been modified",
-                    "certificateHash": certificate_hash
-                },
-                "issuerSignature": {
-                    "status": signature_status,
-                    "message": "Cryptographically signed by issuer" if signature_valid else "Signature verification pending",
-                    "signature": issuer_signature[:50] + "..." if issuer_signature else "",
-                    "signedBy": issuer_wallet
-                },
-                "blockchainNFT": {
-                    "status": nft_status,
-                    "message": "NFT minted on Polygon blockchain" if nft_exists else "NFT minting in progress",
-                    "chain": "polygon",
-                    "contractAddress": cert.get("contract_address", ""),
-                    "tokenId": cert.get("token_id", ""),
-                    "transaction": cert.get("blockchain_tx", ""),
-                    "nftId": nft_id
-                },
-                "receiverOwnership": {
-                    "status": "✅ VERIFIED",
-                    "message": "Owned by original recipient",
-                    "currentOwner": cert.get("recipient_wallet", "")
-                }
+            "course": {
+                "name": canonical_payload.get("courseName", ""),
+                "completionDate": cert.get("issued_at", "")[:10] if cert.get("issued_at") else ""
+            },
+            "issuer": {
+                "name": canonical_payload.get("issuerName", ""),
+                "wallet": issuer_wallet,
+                "verified": True
+            },
+            "fieldData": field_data
+        },
+        "verification": {
+            "dataIntegrity": {
+                "status": data_integrity_status,
+                "message": "Certificate data has not been tampered" if data_integrity_valid else "Data may have been modified",
+                "certificateHash": certificate_hash
+            },
+            "issuerSignature": {
+                "status": signature_status,
+                "message": "Cryptographically signed by issuer" if signature_valid else "Signature verification pending",
+                "signature": issuer_signature[:50] + "..." if issuer_signature else "",
+                "signedBy": issuer_wallet
             },
-            "blockchain": {
+            "blockchainNFT": {
+                "status": nft_status,
+                "message": "NFT minted on Polygon blockchain" if nft_exists else "NFT minting in progress",
                 "chain": "polygon",
                 "contractAddress": cert.get("contract_address", ""),
                 "tokenId": cert.get("token_id", ""),
-                "transactionHash": cert.get("blockchain_tx", ""),
-                "explorerUrl": f"https://polygonscan.com/tx/{cert.get('blockchain_tx', '')}" if cert.get("blockchain_tx") and cert.get("blockchain_tx") != "pending" else ""
+                "transaction": cert.get("blockchain_tx", ""),
+                "nftId": nft_id
             },
-            "storage": {
-                "imageUrl": cert.get("ipfs_url", ""),
-                "qrCodeImage": cert.get("qr_code_image", "")
+            "receiverOwnership": {
+                "status": "✅ VERIFIED",
+                "message": "Owned by original recipient",
+                "currentOwner": cert.get("recipient_wallet", "")
             }
+        },
+        "blockchain": {
+            "chain": "polygon",
+            "contractAddress": cert.get("contract_address", ""),
+            "tokenId": cert.get("token_id", ""),
+            "transactionHash": cert.get("blockchain_tx", ""),
+            "explorerUrl": f"https://polygonscan.com/tx/{cert.get('blockchain_tx', '')}" if cert.get("blockchain_tx") and cert.get("blockchain_tx") != "pending" else ""
+        },
+        "storage": {
+            "imageUrl": cert.get("ipfs_url", ""),
+            "qrCodeImage": cert.get("qr_code_image", ""),
+            "qrCodeUrl": f"/api/certificates/{certificate_id}/qr.png"
         }
+    }
+
+def build_compact_verification_response(cert: dict, certificate_id: str, checks: dict) -> dict:
+    """Minimal document for mobile QR scanners"""
+    canonical_payload = checks["canonical_payload"]
+    return {
+        "verified": checks["trust_score"] >= 60 and not checks.get("revoked"),
+        "trustScore": checks["trust_score"],
+        "certificateId": certificate_id,
+        "status": cert.get("status", ""),
+        "revoked": checks.get("revoked", False),
+        "recipient": canonical_payload.get("recipientName", ""),
+        "course": canonical_payload.get("courseName", ""),
+        "issuer": canonical_payload.get("issuerName", ""),
+        "issuedAt": (cert.get("issued_at") or canonical_payload.get("issueDate") or "")[:10],
+        "checks": {
+            "dataIntegrity": checks["data_integrity_valid"],
+            "issuerSignature": checks["signature_valid"],
+            "blockchainNFT": checks["nft_exists"]
+        }
+    }
+
+
+@app.get("/api/certificates/verify/{certificate_id}")
+async def verify_certificate(certificate_id: str, view: str = "full", fields: Optional[str] = None):
+    """
+    Verify certificate by ID (QR code scan endpoint)
+    view=compact returns a small summary; fields=a,b,c keeps only those top-level keys
+    """
+    try:
+        if view not in ("full", "compact"):
+            raise HTTPException(status_code=400, detail="view must be 'full' or 'compact'")
+        requested_fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        if requested_fields:
+            unknown = [f for f in requested_fields if f not in VERIFY_FIELD_COLUMNS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        
+        if view == "compact":
+            columns = ", ".join(VERIFY_COMPACT_COLUMNS)
+            variant = "verify:compact"
+        else:
+            columns = verify_select_columns(requested_fields)
+            variant = f"verify:{','.join(requested_fields)}" if requested_fields else "verify"
+        
+        cached_variants = verification_response_cache.get(certificate_id)
+        if cached_variants and variant in cached_variants:
+            content, headers = cached_variants[variant]
+            return ORJSONResponse(content=content, headers=headers)
+        
+        not_found = ORJSONResponse(
+            content={"verified": False, "message": "Certificate not found"},
+            headers={"Cache-Control": CACHE_CONTROL_NOT_FOUND}
+        )
+        # Never-issued IDs (typos, scrapers) are answered without touching the database
+        if not certificate_index.might_exist(certificate_id):
+            return not_found
+        
+        cert_response = supabase.table("certificates").select(columns).eq("certificate_id", certificate_id).limit(1).execute()
+        if not cert_response.data:
+            return not_found
+        
+        cert = cert_response.data[0]
+        certificate_pk_cache.set(certificate_id, {"id": cert["id"], "group_id": cert.get("group_id")})
+        checks = run_verification_checks(cert)
+        if cert.get("status") == "revoked" or certificate_index.is_revoked(certificate_id):
+            checks["revoked"] = True
+        
+        if view == "compact":
+            content = build_compact_verification_response(cert, certificate_id, checks)
+        else:
+            content = build_verification_response(cert, certificate_id, checks)
+            if requested_fields:
+                content = {key: content[key] for key in requested_fields}
+        
+        headers = cache_headers(cert, variant)
+        if is_final(cert):
+            cached_variants = dict(verification_response_cache.get(certificate_id) or {})
+            cached_variants[variant] = (content, headers)
+            verification_response_cache.set(certificate_id, cached_variants)
+        return ORJSONResponse(content=content, headers=headers)
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         print(f"Verification error: {e}")
         raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
 
 
+def payload_field_data(canonical_payload: dict) -> Dict[str, str]:
+    """Field values for rendering a certificate that has no stored fieldData (claim flow)"""
+    field_data = dict(canonical_payload.get("fieldData") or {})
+    issue_date = (canonical_payload.get("issueDate") or "")[:10]
+    defaults = {
+        "Recipient Name": canonical_payload.get("recipientName", ""),
+        "Student Name": canonical_payload.get("recipientName", ""),
+        "Name": canonical_payload.get("recipientName", ""),
+        "Student ID": canonical_payload.get("studentId", ""),
+        "Course Name": canonical_payload.get("courseName", ""),
+        "Course": canonical_payload.get("courseName", ""),
+        "Issuer Name": canonical_payload.get("issuerName", ""),
+        "Date": issue_date,
+        "Issue Date": issue_date,
+        "Certificate ID": canonical_payload.get("certificateId", "")
+    }
+    for label, value in defaults.items():
+        field_data.setdefault(label, value)
+    return field_data
+
+def certificate_template(cert: dict):
+    """(template, template_fields) of the certificate's group, or (None, [])"""
+    template_id = cert.get("template_id")
+    if not template_id and cert.get("group_id"):
+        group_response = supabase.table("groups").select("template_id").eq("id", cert["group_id"]).limit(1).execute()
+        if group_response.data:
+            template_id = group_response.data[0].get("template_id")
+    if not template_id:
+        return None, []
+    template_response = supabase.table("certificate_templates").select("*").eq("id", template_id).limit(1).execute()
+    if not template_response.data:
+        return None, []
+    template = template_response.data[0]
+    fields = supabase.table("template_fields").select("*").eq("template_id", template["id"]).execute().data or []
+    return template, fields
+
+def certificate_qr_base64(cert: dict) -> str:
+    qr_code_image = cert.get("qr_code_image") or ""
+    if qr_code_image.startswith("data:"):
+        return qr_code_image.split(",", 1)[1]
+    return generate_qr_code(cert.get("verification_url", ""))
+
+def certificate_payload(cert: dict) -> dict:
+    canonical_payload = cert.get("canonical_payload") or {}
+    if isinstance(canonical_payload, str):
+        canonical_payload = json.loads(canonical_payload)
+    return canonical_payload
+
+def render_certificate_pdf(cert: dict, output_path: str, template: Optional[dict], fields: List[Dict]):
+    """Composite the group's template (if any) into a PDF, else use the plain text layout"""
+    canonical_payload = certificate_payload(cert)
+    
+    if template:
+        image_base64 = generate_certificate_image(
+            template=template,
+            fields=fields,
+            field_data=payload_field_data(canonical_payload),
+            qr_code_base64=certificate_qr_base64(cert)
+        )
+        render_image_pdf(base64.b64decode(image_base64), output_path)
+        return
+    
+    issued_at = cert.get("issued_at") or cert.get("claimed_at") or ""
+    render_text_pdf([
+        "CERTIFICATE OF COMPLETION",
+        f"Awarded to: {canonical_payload.get('recipientName', '')}",
+        f"Course: {canonical_payload.get('courseName', '')}",
+        f"Date: {issued_at[:10]}",
+        f"Certificate ID: {cert.get('certificate_id', '')}",
+        f"Verification: {cert.get('verification_url', '')}"
+    ], output_path)
+
+
 @app.get("/api/certificates/{certificate_id}/download")
-async def download_certificate(certificate_id: str):
-    """Download certificate image"""
+async def download_certificate(certificate_id: str, request: Request):
+    """Download certificate image, or the cached server-rendered PDF"""
     try:
-        cert_response = supabase.table("certificates").select("*").eq("certificate_id", certificate_id).single().execute()
+        cert_response = supabase.table("certificates").select("*").eq("certificate_id", certificate_id).limit(1).execute()
         if not cert_response.data:
             raise HTTPException(status_code=404, detail="Certificate not found")
         
-        cert = cert_response.data
+        cert = cert_response.data[0]
         
         # If we have the certificate image URL, redirect to it
         if cert.get("ipfs_url") and cert["ipfs_url"].startswith("http"):
-            return JSONResponse(content={"redirect_url": cert["ipfs_url"]})
-        
-        # Fallback: Generate a simple certificate
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=letter)
-        c.drawString(100, 700, "CERTIFICATE OF COMPLETION")
-        canonical_payload = cert.get("canonical_payload", {})
-        c.drawString(100, 650, f"Awarded to: {canonical_payload.get('recipientName', '')}")
-        c.drawString(100, 600, f"Course: {canonical_payload.get('courseName', '')}")
-        c.drawString(100, 550, f"Date: {cert.get('claimed_at', '')[:10] if cert.get('claimed_at') else ''}")
-        c.drawString(100, 500, f"Certificate ID: {certificate_id}")
-        c.drawString(100, 450, f"Verification: {cert.get('verification_url', '')}")
-        c.save()
-        buffer.seek(0)
+            return JSONResponse(content={"redirect_url": cert["ipfs_url"]}, headers=cache_headers(cert, "download"))
+        
+        # Rendered once per certificate hash and template asset, then served from disk
+        template, fields = await asyncio.to_thread(certificate_template, cert)
+        render_version = asset_fingerprint(await ensure_render_asset(template, fields, "standard"))[:16] if template else "text"
+        cache_key = cert.get("certificate_hash") or certificate_id
+        pdf_path = await pdf_cache.get_or_create(
+            cache_key,
+            lambda path: render_certificate_pdf(cert, path, template, fields),
+            reserve=lambda: render_budget.reserve(STANDARD_PDF_RENDER_BYTES),
+            version=render_version
+        )
         
-        return StreamingResponse(
-            buffer,
+        return file_response(
+            request,
+            pdf_path,
+            etag=f"{cache_key}-{render_version}",
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=certificate-{certificate_id}.pdf"}
+            filename=f"certificate-{certificate_id}.pdf",
+            headers={"Cache-Control": cache_headers(cert)["Cache-Control"]}
         )
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
 
+@app.post("/api/certificates/{certificate_id}/print")
+async def render_print_certificate(certificate_id: str):
+    """300 dpi printable certificate image, rendered once, uploaded to storage and returned as a URL"""
+    try:
+        cert_response = supabase.table("certificates").select("*").eq("certificate_id", certificate_id).limit(1).execute()
+        if not cert_response.data:
+            raise HTTPException(status_code=404, detail="Certificate not found")
+        cert = cert_response.data[0]
+        if cert.get("status") == "revoked":
+            raise HTTPException(status_code=409, detail="Certificate is revoked")
+        
+        template, fields = await asyncio.to_thread(certificate_template, cert)
+        if not template:
+            raise HTTPException(status_code=400, detail="Certificate has no template to print")
+        
+        # The path names everything the image depends on: the signed data and the base image and layout
+        asset = await ensure_render_asset(template, fields, "print")
+        certificate_hash = (cert.get("certificate_hash") or "unsigned")[:16]
+        path = f"print/certificate-{certificate_id}-{certificate_hash}-{asset_fingerprint(asset)[:16]}.jpg"
+        url = print_render_urls.get(path)
+        if url is None:
+            # Rendered by another worker, or before a restart
+            url = await asyncio.to_thread(stored_object_url, "certificate-pdfs", path)
+        if url is None:
+            url = await render_certificate_to_storage(
+                template=template,
+                fields=fields,
+                field_data=payload_field_data(certificate_payload(cert)),
+                qr_code_base64=certificate_qr_base64(cert),
+                bucket="certificate-pdfs",
+                path=path,
+                profile="print"
+            )
+        print_render_urls.set(path, url)
+        
+        return {
+            "certificate_id": certificate_id,
+            "print_url": url,
+            "width": asset["width"],
+            "height": asset["height"],
+            "dpi": PRINT_DPI
+        }
+    except HTTPException:
+        raise
+    except TemplateImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Print render failed: {str(e)}")
+
+
+@app.get("/api/certificates/{certificate_id}/qr.png")
+async def get_certificate_qr(certificate_id: str):
+    """QR code image for a certificate, cacheable forever (it only encodes the verification URL)"""
+    try:
+        cert_response = supabase.table("certificates").select("verification_url, qr_code_image").eq("certificate_id", certificate_id).limit(1).execute()
+        if not cert_response.data:
+            raise HTTPException(status_code=404, detail="Certificate not found")
+        
+        cert = cert_response.data[0]
+        qr_code_image = cert.get("qr_code_image") or ""
+        if qr_code_image.startswith("data:"):
+            qr_bytes = base64.b64decode(qr_code_image.split(",", 1)[1])
+        else:
+            qr_bytes = base64.b64decode(generate_qr_code(cert.get("verification_url") or f"{APP_URL}/verify/{certificate_id}"))
+        
+        return Response(
+            content=qr_bytes,
+            media_type="image/png",
+            headers={
+                "ETag": f'"{hashlib.sha256(qr_bytes).hexdigest()[:32]}"',
+                "Cache-Control": CACHE_CONTROL_IMMUTABLE
+            }
+        )
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"QR code lookup failed: {str(e)}")
+
+
 @app.get("/api/nft/{nft_id}")
 async def get_nft_status(nft_id: str):
     """Get NFT status from Crossmint"""
+    import httpx
     try:
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=crossmint_transport) as client:
             response = await client.get(
                 f"{CROSSMINT_BASE_URL}/nfts/{nft_id}",
                 headers={"X-API-KEY": CROSSMINT_API_KEY}
@@ -1148,25 +2258,272 @@ async def get_nft_status(nft_id: str):
 # Log verification to database
 @app.post("/api/certificates/verify/{certificate_id}/log")
 async def log_verification(certificate_id: str, request_data: dict = None):
-    """Log certificate verification attempt"""
+    """Queue a certificate verification attempt for the batched audit-log writer"""
+    request_data = request_data or {}
+    accepted = verification_log_writer.enqueue({
+        "certificate_id": certificate_id,
+        # UTC with an explicit offset: the rollup day is verified_at[:10]
+        "verified_at": datetime.now(timezone.utc).isoformat(),
+        "verifier_ip": request_data.get("ip", ""),
+        "verifier_user_agent": request_data.get("user_agent", ""),
+        "trust_score": request_data.get("trust_score", 0),
+        "result_text": "Verification accessed"
+    })
+    return {"logged": True, "queued": True, "dropped_oldest": not accepted}
+
+
+STATUS_EVENT_COLUMNS = "id, certificate_id, previous_status, new_status, reason, replacement_certificate_id, created_at"
+
+async def get_certificate_for_status_change(certificate_id: str, user_id: str):
+    """Certificate, its group and the acting instructor, who must own the group"""
+    cert_response = supabase.table("certificates").select("id, certificate_id, group_id, status, canonical_payload").eq("certificate_id", certificate_id).limit(1).execute()
+    if not cert_response.data:
+        raise HTTPException(status_code=404, detail="Certificate not found")
+    cert = cert_response.data[0]
+    
+    group_response = supabase.table("groups").select("*").eq("id", cert["group_id"]).limit(1).execute()
+    if not group_response.data:
+        raise HTTPException(status_code=404, detail="Group not found")
+    group = group_response.data[0]
+    
+    instructor = await get_instructor_by_user_id(user_id)
+    if not instructor or instructor.get("id") != group.get("instructor_id"):
+        raise HTTPException(status_code=403, detail="Only the issuing instructor can change this certificate")
+    return cert, group, instructor
+
+def record_status_change(cert: dict, new_status: str, reason: str, instructor_id: str,
+                         replacement_certificate_id: Optional[str] = None) -> dict:
+    """Update the certificate status, append to the status-event log and notify caches"""
+    previous_status = cert.get("status")
+    update_response = supabase.table("certificates").update({
+        "status": new_status,
+        "updated_at": datetime.utcnow().isoformat()
+    }).eq("id", cert["id"]).neq("status", new_status).execute()
+    if not update_response.data:
+        raise HTTPException(status_code=409, detail=f"Certificate is already {new_status}")
+    
+    event = {
+        "certificate_pk": cert["id"],
+        "certificate_id": cert["certificate_id"],
+        "previous_status": previous_status,
+        "new_status": new_status,
+        "reason": reason,
+        "actor_instructor_id": instructor_id,
+        "replacement_certificate_id": replacement_certificate_id
+    }
+    supabase.table("certificate_status_events").insert(event).execute()
+    
+    status_events.publish(CERTIFICATE_STATUS_CHANNEL, {
+        "certificate_id": cert["certificate_id"],
+        "status": new_status,
+        "previous_status": previous_status,
+        "replacement_certificate_id": replacement_certificate_id
+    })
+    return event
+
+@app.post("/api/certificates/{certificate_id}/revoke")
+async def revoke_certificate(certificate_id: str, request: CertificateRevokeRequest):
+    """Revoke a certificate; verification reports it as revoked from now on"""
     try:
-        cert_response = supabase.table("certificates").select("id").eq("certificate_id", certificate_id).single().execute()
-        if not cert_response.data:
-            return {"logged": False}
-        
-        supabase.table("certificate_verifications").insert({
-            "certificate_pk": cert_response.data["id"],
-            "verified_at": datetime.utcnow().isoformat(),
-            "verifier_ip": request_data.get("ip", "") if request_data else "",
-            "verifier_user_agent": request_data.get("user_agent", "") if request_data else "",
-            "trust_score": request_data.get("trust_score", 0) if request_data else 0,
-            "result_text": "Verification accessed"
-        }).execute()
+        cert, group, instructor = await get_certificate_for_status_change(certificate_id, request.user_id)
+        event = record_status_change(cert, "revoked", request.reason, instructor["id"])
+        return {"success": True, "certificate_id": certificate_id, "status": "revoked", "previous_status": event["previous_status"]}
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Revocation failed: {str(e)}")
+
+@app.post("/api/certificates/{certificate_id}/reissue")
+async def reissue_certificate(certificate_id: str, request: CertificateReissueRequest):
+    """Issue a corrected replacement certificate, then revoke the original"""
+    try:
+        cert, group, instructor = await get_certificate_for_status_change(certificate_id, request.user_id)
+        if cert.get("status") == "revoked":
+            raise HTTPException(status_code=409, detail="Certificate is already revoked")
+        if not instructor.get("wallet_address"):
+            raise HTTPException(status_code=400, detail="Instructor has no signing wallet")
+        
+        payload = cert.get("canonical_payload") or {}
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        
+        # The replacement is issued first so a failed mint leaves the original valid
+        issued = await issue_certificate(
+            group=group,
+            issuer_wallet=instructor["wallet_address"],
+            issuer_id=instructor["id"],
+            recipient_name=request.recipient_name or payload.get("recipientName", ""),
+            recipient_email=request.recipient_email or payload.get("recipientEmail", ""),
+            student_id=request.student_id if request.student_id is not None else payload.get("studentId")
+        )
+        record_status_change(cert, "revoked", request.reason, instructor["id"],
+                             replacement_certificate_id=issued["certificate_id"])
         
-        return {"logged": True}
+        return {
+            "success": True,
+            "revoked_certificate_id": certificate_id,
+            "certificate_id": issued["certificate_id"],
+            "verification_url": issued["verification_url"],
+            "nft_id": issued["nft_id"],
+            "qr_code": issued["qr_code"],
+            "pdf_download_url": f"/api/certificates/{issued['certificate_id']}/download"
+        }
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reissue failed: {str(e)}")
+
+@app.get("/api/certificates/{certificate_id}/status-events")
+async def list_certificate_status_events(certificate_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """Revocation/reissue history of a certificate, newest first"""
+    try:
+        return run_keyset_query("certificate_status_events", STATUS_EVENT_COLUMNS, "certificate_id", certificate_id, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list status events: {str(e)}")
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (pipeline stage histograms, Crossmint response counts)"""
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit counters of the tiered (per-worker L1 + shared L2) caches"""
+    return {
+        "worker_pid": os.getpid(),
+        "verification": verification_response_cache.stats(),
+        "subscription": subscription_cache.stats(),
+        "template_images": template_image_cache.stats(),
+        "render_budget": render_budget.stats(),
+        "pdfs": pdf_cache.stats(),
+        "fonts": load_font.cache_info()._asdict()
+    }
+
+@app.get("/api/admission/stats")
+async def admission_stats():
+    """Loop lag, in-flight requests and rejection counts of the admission controller"""
+    return admission.stats()
+
+@app.get("/api/health/dependencies")
+async def dependency_health():
+    """Circuit breaker state of Supabase and Crossmint, and the deferred mint backlog"""
+    return {
+        "supabase": supabase_breaker.stats(),
+        "crossmint": crossmint_breaker.stats(),
+        "mint_queue": await asyncio.to_thread(mint_queue.stats)
+    }
+
+@app.get("/api/signer/stats")
+async def signer_stats():
+    """Mode, throughput and key cache counters of the issuer signer"""
+    return certificate_signer.stats()
+
+@app.get("/api/events/stats")
+async def status_event_stats():
+    """Published/failed counts and subscribers of the status-change channel"""
+    return status_events.stats()
+
+
+@app.get("/api/certificates/index/stats")
+async def certificate_index_stats():
+    """Size and hit counters of the issued/revoked certificate index"""
+    return certificate_index.stats()
+
+
+@app.get("/api/certificates/verify-log/stats")
+async def verification_log_stats():
+    """Queue depth and counters of the verification log writer"""
+    return verification_log_writer.stats()
+
+
+# ==========================================
+# VERIFICATION ANALYTICS (reads rollups only)
+# ==========================================
+
+def analytics_since(days: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=max(days, 1) - 1)).date().isoformat()
+
+@app.get("/api/analytics/certificates/{certificate_id}")
+async def certificate_scan_analytics(certificate_id: str, days: int = 30):
+    """Scans per day for one certificate"""
+    try:
+        cert = certificate_pk_cache.get(certificate_id)
+        if not cert:
+            cert_response = supabase.table("certificates").select("id, group_id").eq("certificate_id", certificate_id).limit(1).execute()
+            if not cert_response.data:
+                raise HTTPException(status_code=404, detail="Certificate not found")
+            cert = cert_response.data[0]
+            certificate_pk_cache.set(certificate_id, {"id": cert["id"], "group_id": cert.get("group_id")})
+        
+        since = analytics_since(days)
+        rollup_response = supabase.table("verification_daily_rollups").select("day, scan_count").eq("certificate_pk", cert["id"]).gte("day", since).execute()
+        pending = {day: count for day, count in verification_rollups.pending_for_certificate(cert["id"]).items() if day >= since}
+        
+        return {"certificate_id": certificate_id, "since": since, **summarize_days(rollup_response.data or [], pending)}
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analytics query failed: {str(e)}")
+
+@app.get("/api/analytics/groups/{group_id}")
+async def group_scan_analytics(group_id: str, days: int = 30, top: int = 10):
+    """Scans per day for a group, plus its most scanned certificates"""
+    try:
+        since = analytics_since(days)
+        rollup_response = supabase.table("verification_daily_rollups").select("certificate_pk, day, scan_count").eq("group_id", group_id).gte("day", since).execute()
+        rows = rollup_response.data or []
+        
+        per_certificate: Dict[str, int] = {}
+        pending_days: Dict[str, int] = {}
+        for row in rows:
+            per_certificate[row["certificate_pk"]] = per_certificate.get(row["certificate_pk"], 0) + row["scan_count"]
+        for (certificate_pk, day), count in verification_rollups.pending_for_group(group_id).items():
+            if day >= since:
+                per_certificate[certificate_pk] = per_certificate.get(certificate_pk, 0) + count
+                pending_days[day] = pending_days.get(day, 0) + count
+        
+        top_certificates = sorted(per_certificate.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "group_id": group_id,
+            "since": since,
+            **summarize_days(rows, pending_days),
+            "certificates_scanned": len(per_certificate),
+            "top_certificates": [{"certificate_pk": pk, "scans": count} for pk, count in top_certificates]
+        }
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analytics query failed: {str(e)}")
+
+@app.post("/api/analytics/compact", dependencies=[Depends(require_admin_token)])
+async def compact_verification_log(older_than_days: Optional[int] = None):
+    """Fold raw verification rows past retention into the rollups and delete them (admin only)"""
+    try:
+        if older_than_days is not None and older_than_days < verification_rollups.retention_days:
+            raise HTTPException(
+                status_code=400,
+                detail=f"older_than_days must be at least {verification_rollups.retention_days} (ANALYTICS_RAW_RETENTION_DAYS)"
+            )
+        await verification_rollups.flush()
+        removed = await verification_rollups.compact(older_than_days)
+        return {"success": True, "raw_rows_removed": removed}
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise dependency_unavailable(e)
     except Exception as e:
-        print(f"Log verification error: {e}")
-        return {"logged": False}
+        raise HTTPException(status_code=500, detail=f"Compaction failed: {str(e)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,451 @@
+"""
+Issuer signing service
+
+Request handlers never see issuer private keys: they ask the signer to sign a
+message on behalf of an instructor id. The signer loads the instructor's key
+from the database once, decrypts it (Fernet, when ISSUER_KEY_ENCRYPTION_KEY is
+set and the stored value is a Fernet token) and keeps the derived account in a
+lock-guarded cache until SIGNER_KEY_TTL expires, so a key rotated in the
+database is picked up without a restart.
+
+eth-keys signs in pure Python (~7ms per signature, holding the GIL), so two
+modes are available:
+
+- LocalSigner (default) signs on a worker thread of this process.
+- ProcessSigner (SIGNER_PROCESSES=N) runs N signer processes. Concurrent
+  sign() calls are coalesced into batches and sent over a multiprocessing pipe
+  to the least busy process, so batch mints and roster imports sign on N cores
+  while the event loop stays free. Keys then only ever live in the signer
+  processes, which build their own Supabase client from the environment.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from crypto_utils import sign_message_with_account
+
+# Fernet tokens are urlsafe base64 of a 0x80 version byte, which always encodes as "gAAAAA"
+FERNET_TOKEN_PREFIX = "gAAAAA"
+EPHEMERAL_PREFIX = "ephemeral:"
+
+
+class SigningKeyUnavailable(Exception):
+    """The issuer has no usable signing key (missing, undecryptable or expired ephemeral)"""
+
+
+class SigningError(Exception):
+    """The signer failed for a reason unrelated to the key (e.g. its process died)"""
+
+
+class Signature(NamedTuple):
+    signature: str
+    wallet: str
+
+
+def decrypt_private_key(stored: str, encryption_key: Optional[str]) -> str:
+    """Stored keys are either plaintext hex or Fernet tokens"""
+    if not stored.startswith(FERNET_TOKEN_PREFIX):
+        return stored
+    if not encryption_key:
+        raise SigningKeyUnavailable("Issuer key is encrypted but ISSUER_KEY_ENCRYPTION_KEY is not set")
+    from cryptography.fernet import Fernet, InvalidToken
+    try:
+        return Fernet(encryption_key.encode()).decrypt(stored.encode()).decode()
+    except InvalidToken:
+        raise SigningKeyUnavailable("Issuer key could not be decrypted")
+
+
+class IssuerKeyCache:
+    """instructor id -> eth_account LocalAccount, with expiry and LRU eviction"""
+
+    def __init__(self, client_factory: Callable[[], Any], ttl: float = 900.0, maxsize: int = 1024,
+                 encryption_key: Optional[str] = None):
+        self.client_factory = client_factory
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.encryption_key = encryption_key
+        self._accounts: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _store(self, issuer_id: str, account):
+        with self._lock:
+            self._accounts[issuer_id] = (account, time.monotonic() + self.ttl)
+            self._accounts.move_to_end(issuer_id)
+            while len(self._accounts) > self.maxsize:
+                self._accounts.popitem(last=False)
+
+    def account(self, issuer_id: str):
+        with self._lock:
+            entry = self._accounts.get(issuer_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._accounts.move_to_end(issuer_id)
+                self.hits += 1
+                return entry[0]
+            self._accounts.pop(issuer_id, None)
+        if issuer_id.startswith(EPHEMERAL_PREFIX):
+            raise SigningKeyUnavailable("Ephemeral issuer key expired")
+
+        rows = self.client_factory().table("instructors").select("private_key_encrypted").eq("id", issuer_id).limit(1).execute().data
+        if not rows or not rows[0].get("private_key_encrypted"):
+            raise SigningKeyUnavailable(f"Instructor {issuer_id} has no signing key")
+        from eth_account import Account
+        account = Account.from_key(decrypt_private_key(rows[0]["private_key_encrypted"], self.encryption_key))
+        self.loads += 1
+        self._store(issuer_id, account)
+        return account
+
+    def create_ephemeral(self, tag: str = "") -> Tuple[str, str]:
+        """Throwaway issuer for groups without a configured instructor wallet"""
+        from eth_account import Account
+        account = Account.create()
+        issuer_id = f"{EPHEMERAL_PREFIX}{tag}{account.address}"
+        self._store(issuer_id, account)
+        return issuer_id, account.address
+
+    def evict(self, issuer_id: Optional[str] = None):
+        with self._lock:
+            if issuer_id is None:
+                self._accounts.clear()
+            else:
+                self._accounts.pop(issuer_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._accounts)
+        return {"keys": size, "hits": self.hits, "loads": self.loads, "ttl": self.ttl}
+
+
+def sign_batch(keys: IssuerKeyCache, requests: List[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+    """(issuer_id, message) pairs -> ("ok", signature, wallet) / ("unavailable" | "error", message, "")"""
+    results = []
+    for issuer_id, message in requests:
+        try:
+            account = keys.account(issuer_id)
+            results.append(("ok", sign_message_with_account(message, account), account.address))
+        except SigningKeyUnavailable as e:
+            results.append(("unavailable", str(e), ""))
+        except Exception as e:
+            results.append(("error", f"{type(e).__name__}: {e}", ""))
+    return results
+
+
+def unpack_result(result: Tuple[str, str, str]) -> Signature:
+    status, value, wallet = result
+    if status == "ok":
+        return Signature(value, wallet)
+    if status == "unavailable":
+        raise SigningKeyUnavailable(value)
+    raise SigningError(value)
+
+
+class LocalSigner:
+    """Signs on a worker thread of this process"""
+
+    def __init__(self, keys: IssuerKeyCache):
+        self.keys = keys
+        self.signed = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def sign(self, issuer_id: str, message: str) -> Signature:
+        result = (await asyncio.to_thread(sign_batch, self.keys, [(issuer_id, message)]))[0]
+        self.signed += 1
+        return unpack_result(result)
+
+    async def create_ephemeral_issuer(self) -> Tuple[str, str]:
+        return self.keys.create_ephemeral()
+
+    async def evict(self, issuer_id: Optional[str] = None):
+        self.keys.evict(issuer_id)
+
+    def stats(self) -> dict:
+        return {"mode": "local", "signed": self.signed, "keys": self.keys.stats()}
+
+
+def supabase_client_from_env():
+    from supabase import create_client
+    return create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_ANON_KEY"])
+
+
+def signer_process_main(conn, client_factory: Callable[[], Any], tag: str, ttl: float, maxsize: int,
+                        encryption_key: Optional[str]):
+    """Entry point of one signer process: answers (request_id, op, payload) messages until "stop" or EOF"""
+    # Pay the eth_account import before the first batch arrives
+    import eth_account  # noqa: F401
+
+    client = None
+
+    def get_client():
+        nonlocal client
+        if client is None:
+            client = client_factory()
+        return client
+
+    keys = IssuerKeyCache(get_client, ttl, maxsize, encryption_key)
+    while True:
+        try:
+            request_id, op, payload = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if op == "stop":
+            return
+        try:
+            if op == "sign":
+                result = sign_batch(keys, payload)
+            elif op == "ephemeral":
+                result = keys.create_ephemeral(tag)
+            elif op == "evict":
+                result = keys.evict(payload)
+            elif op == "stats":
+                result = keys.stats()
+            else:
+                raise ValueError(f"Unknown signer op {op!r}")
+            conn.send((request_id, True, result))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+
+
+class SignerWorker:
+    """Parent-side handle of one signer process"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.reader = None
+        self.in_flight = 0
+        self.futures: Dict[int, Tuple[asyncio.Future, int]] = {}
+        self.send_lock = threading.Lock()
+
+
+class ProcessSigner:
+    """Batches sign requests to a pool of signer processes over pipes"""
+
+    def __init__(self, processes: int, client_factory: Callable[[], Any] = supabase_client_from_env,
+                 key_ttl: float = 900.0, maxsize: int = 1024, encryption_key: Optional[str] = None,
+                 max_batch: int = 64, batch_window: float = 0.002):
+        self.client_factory = client_factory
+        self.key_ttl = key_ttl
+        self.maxsize = maxsize
+        self.encryption_key = encryption_key
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.workers = [SignerWorker(index) for index in range(max(1, processes))]
+        self._context = multiprocessing.get_context("spawn")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._flush_handle = None
+        self._next_request_id = 0
+        self.signed = 0
+        self.batches = 0
+        self.restarts = 0
+
+    # -- process management -------------------------------------------------
+
+    def _spawn(self, worker: SignerWorker):
+        parent_conn, child_conn = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=signer_process_main,
+            args=(child_conn, self.client_factory, f"{worker.index}:", self.key_ttl, self.maxsize, self.encryption_key),
+            name=f"certichain-signer-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.reader = threading.Thread(target=self._read_responses, args=(worker, parent_conn),
+                                         name=f"signer-reader-{worker.index}", daemon=True)
+        worker.reader.start()
+
+    def _read_responses(self, worker: SignerWorker, conn):
+        while True:
+            try:
+                request_id, ok, result = conn.recv()
+            except (EOFError, OSError):
+                self._loop.call_soon_threadsafe(self._fail_worker, worker, conn)
+                return
+            self._loop.call_soon_threadsafe(self._resolve, worker, request_id, ok, result)
+
+    def _resolve(self, worker: SignerWorker, request_id: int, ok: bool, result):
+        future, size = worker.futures.pop(request_id, (None, 0))
+        worker.in_flight -= size
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(result)
+        else:
+            future.set_exception(SigningError(result))
+
+    def _fail_worker(self, worker: SignerWorker, conn):
+        if worker.conn is not conn:
+            return
+        worker.conn = None
+        for future, _ in worker.futures.values():
+            if not future.done():
+                future.set_exception(SigningError(f"Signer process {worker.index} exited"))
+        worker.futures.clear()
+        worker.in_flight = 0
+
+    def _ensure_running(self, worker: SignerWorker):
+        if worker.conn is None or not worker.process.is_alive():
+            if worker.process is not None:
+                self.restarts += 1
+                stale = worker.conn
+                self._fail_worker(worker, stale)
+                if stale is not None:
+                    stale.close()
+            self._spawn(worker)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            self._ensure_running(worker)
+
+    async def stop(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for worker in self.workers:
+            if worker.conn is not None:
+                try:
+                    worker.conn.send((0, "stop", None))
+                except OSError:
+                    pass
+        for worker in self.workers:
+            if worker.process is not None:
+                await asyncio.to_thread(worker.process.join, 5.0)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+
+    # -- requests -------------------------------------------------------------
+
+    def _request(self, worker: SignerWorker, op: str, payload, size: int = 1) -> asyncio.Future:
+        self._ensure_running(worker)
+        self._next_request_id += 1
+        request_id = self._next_request_id
+        future = self._loop.create_future()
+        worker.futures[request_id] = (future, size)
+        worker.in_flight += size
+        # Pipe buffers are small; a busy process must not block the event loop
+        self._loop.run_in_executor(None, self._send, worker, (request_id, op, payload))
+        return future
+
+    def _send(self, worker: SignerWorker, message):
+        conn = worker.conn
+        try:
+            with worker.send_lock:
+                conn.send(message)
+        except (OSError, AttributeError):
+            self._loop.call_soon_threadsafe(self._fail_worker, worker, conn)
+
+    def _worker_for(self, issuer_id: str) -> Optional[SignerWorker]:
+        """Ephemeral keys exist only in the process that created them"""
+        if issuer_id.startswith(EPHEMERAL_PREFIX):
+            index = issuer_id[len(EPHEMERAL_PREFIX):].split(":", 1)[0]
+            if index.isdigit() and int(index) < len(self.workers):
+                return self.workers[int(index)]
+        return None
+
+    def _flush(self):
+        self._flush_handle = None
+        pending, self._pending = self._pending, []
+        batches: Dict[int, List[Tuple[str, str, asyncio.Future]]] = {}
+        loads = {worker.index: worker.in_flight for worker in self.workers}
+        shared = []
+        for item in pending:
+            pinned = self._worker_for(item[0])
+            if pinned is not None:
+                batches.setdefault(pinned.index, []).append(item)
+                loads[pinned.index] += 1
+            else:
+                shared.append(item)
+        # Spread the rest so every process gets a similar amount of work
+        for item in shared:
+            index = min(loads, key=loads.get)
+            batches.setdefault(index, []).append(item)
+            loads[index] += 1
+
+        for index, items in batches.items():
+            for start in range(0, len(items), self.max_batch):
+                chunk = items[start:start + self.max_batch]
+                future = self._request(self.workers[index], "sign", [(issuer_id, message) for issuer_id, message, _ in chunk], len(chunk))
+                future.add_done_callback(lambda done, chunk=chunk: self._deliver(done, chunk))
+                self.batches += 1
+
+    def _deliver(self, done: asyncio.Future, chunk: List[Tuple[str, str, asyncio.Future]]):
+        error = done.exception()
+        for position, (_, _, future) in enumerate(chunk):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+                continue
+            try:
+                future.set_result(unpack_result(done.result()[position]))
+            except Exception as e:
+                future.set_exception(e)
+
+    async def sign(self, issuer_id: str, message: str) -> Signature:
+        if self._loop is None:
+            raise SigningError("Signer is not started")
+        future = self._loop.create_future()
+        self._pending.append((issuer_id, message, future))
+        if len(self._pending) >= self.max_batch * len(self.workers):
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.batch_window, self._flush)
+        signature = await future
+        self.signed += 1
+        return signature
+
+    async def create_ephemeral_issuer(self) -> Tuple[str, str]:
+        worker = min(self.workers, key=lambda w: w.in_flight)
+        issuer_id, wallet = await self._request(worker, "ephemeral", None)
+        return issuer_id, wallet
+
+    async def evict(self, issuer_id: Optional[str] = None):
+        await asyncio.gather(*(self._request(worker, "evict", issuer_id) for worker in self.workers))
+
+    def stats(self) -> dict:
+        return {
+            "mode": "process",
+            "processes": len(self.workers),
+            "alive": sum(1 for worker in self.workers if worker.process is not None and worker.process.is_alive()),
+            "in_flight": {worker.index: worker.in_flight for worker in self.workers},
+            "signed": self.signed,
+            "batches": self.batches,
+            "restarts": self.restarts,
+        }
+
+
+def create_signer(client_factory: Callable[[], Any]):
+    """ProcessSigner when SIGNER_PROCESSES > 0, otherwise LocalSigner over `client_factory`"""
+    key_ttl = float(os.getenv("SIGNER_KEY_TTL", "900"))
+    maxsize = int(os.getenv("SIGNER_KEY_CACHE_SIZE", "1024"))
+    encryption_key = os.getenv("ISSUER_KEY_ENCRYPTION_KEY")
+    processes = int(os.getenv("SIGNER_PROCESSES", "0"))
+    if processes > 0:
+        return ProcessSigner(
+            processes,
+            key_ttl=key_ttl,
+            maxsize=maxsize,
+            encryption_key=encryption_key,
+            max_batch=int(os.getenv("SIGNER_MAX_BATCH", "64")),
+            batch_window=float(os.getenv("SIGNER_BATCH_WINDOW_MS", "2")) / 1000,
+        )
+    return LocalSigner(IssuerKeyCache(client_factory, key_ttl, maxsize, encryption_key))
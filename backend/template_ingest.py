@@ -0,0 +1,195 @@
+"""
+Template ingestion: normalized base images and precomputed field layouts
+
+Instructors upload whatever they have: 6000px photos, CMYK or Display P3 JPEGs,
+palette PNGs with transparency, rotated phone pictures. Ingestion turns the
+upload into a render asset per output profile:
+
+- the image, EXIF-rotated, converted to sRGB RGB (transparency flattened onto
+  white), resized to the profile width and re-encoded without metadata;
+- the template_fields boxes, scaled once from the 800x560 editor design space
+  to that image's pixels.
+
+Rendering then composites straight onto the base image. An asset records the
+source URL and a digest of the fields it was computed from, so edits made after
+ingestion are detected (asset_is_current) and trigger a re-ingest.
+"""
+import hashlib
+import json
+from io import BytesIO
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Coordinate space of template_fields (the editor canvas)
+DESIGN_SIZE = (800, 560)
+
+# Output width per profile; height follows the template's aspect ratio.
+# "print" is A4 landscape width at 300 dpi and is only ingested on first print render.
+PRINT_DPI = 300
+RENDER_PROFILES = {"standard": 1600, "print": 3508}
+
+# JPEG settings of the rendered certificates per profile
+PROFILE_JPEG_OPTIONS = {
+    "standard": {"quality": 90},
+    "print": {"quality": 95, "subsampling": 0, "dpi": (PRINT_DPI, PRINT_DPI)},
+}
+
+# Bumped whenever the normalization or layout rules change, to re-ingest old assets
+ASSET_VERSION = 2
+
+MAX_SOURCE_PIXELS = 100_000_000
+BASE_JPEG_QUALITY = 95
+FIELD_TYPES = ("text", "qr")
+# template_fields text options copied into the layout (see text_layout.TextLayoutEngine.fit)
+TEXT_OPTIONS = (("text_align", "align"), ("vertical_align", "valign"), ("wrap", "wrap"),
+                ("max_lines", "max_lines"), ("ellipsize", "ellipsize"))
+EXIF_ORIENTATION = 0x0112
+
+
+class TemplateImageError(ValueError):
+    """The upload is not a usable template image"""
+
+
+class IngestedTemplate(NamedTuple):
+    image: bytes
+    width: int
+    height: int
+    layout: List[Dict[str, Any]]
+    digest: str
+
+
+def _to_srgb(image):
+    """Convert an image with an embedded ICC profile (CMYK, Display P3, ...) to sRGB"""
+    icc_profile = image.info.get("icc_profile")
+    if not icc_profile:
+        return None
+    try:
+        from PIL import ImageCms
+        source = ImageCms.ImageCmsProfile(BytesIO(icc_profile))
+        mode = "RGBA" if image.mode in ("RGBA", "LA", "PA") else "RGB"
+        return ImageCms.profileToProfile(image, source, ImageCms.createProfile("sRGB"), outputMode=mode)
+    except Exception:
+        # Broken or unsupported profile: fall back to PIL's plain conversion
+        return None
+
+
+def normalize_image(data: bytes, width: int):
+    """Open, rotate, color-convert and resize an upload to an RGB image `width` pixels wide"""
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(BytesIO(data))
+    except Exception as e:
+        raise TemplateImageError(f"Unreadable template image: {e}")
+    source_width, source_height = image.size
+    if source_width * source_height > MAX_SOURCE_PIXELS:
+        raise TemplateImageError(f"Template image is too large ({source_width}x{source_height})")
+    rotated = image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+    if rotated:
+        source_width, source_height = source_height, source_width
+    height = max(1, round(width * source_height / source_width))
+
+    # JPEG can decode at 1/2, 1/4 or 1/8 scale, which is most of the work for big photos
+    image.draft("RGB", (height, width) if rotated else (width, height))
+    image = ImageOps.exif_transpose(image)
+    converted = _to_srgb(image)
+    if converted is not None:
+        image = converted
+
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA", "PA"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    image.info = {}
+    return image
+
+
+def compute_field_layout(fields: List[Dict], size: Tuple[int, int],
+                         design_size: Tuple[int, int] = DESIGN_SIZE) -> List[Dict[str, Any]]:
+    """template_fields rows as pixel boxes on an image of `size`"""
+    scale_x = size[0] / design_size[0]
+    scale_y = size[1] / design_size[1]
+    layout = []
+    for field in fields:
+        field_type = field.get("type", "text")
+        if field_type not in FIELD_TYPES:
+            continue
+        box = {
+            "type": field_type,
+            "label": field.get("label", ""),
+            "x": int(field.get("x", 0) * scale_x),
+            "y": int(field.get("y", 0) * scale_y),
+            "width": int(field.get("width", 200) * scale_x),
+            "height": int(field.get("height", 40) * scale_y),
+        }
+        if field_type == "text":
+            # Font sizes are in design pixels, like the geometry
+            max_font_size = field.get("max_font_size")
+            min_font_size = field.get("min_font_size")
+            box["font_size"] = int(max_font_size * scale_y) if max_font_size else max(12, int(box["height"] * 0.6))
+            box["min_font_size"] = max(1, int(min_font_size * scale_y)) if min_font_size else 12
+            for column, key in TEXT_OPTIONS:
+                if field.get(column) is not None:
+                    box[key] = field[column]
+        layout.append(box)
+    return layout
+
+
+def fields_digest(fields: List[Dict]) -> str:
+    """Fingerprint of the field geometry and text options a layout was computed from"""
+    boxes = sorted(
+        json.dumps([field.get("type", "text"), field.get("label", ""), field.get("x", 0),
+                    field.get("y", 0), field.get("width", 200), field.get("height", 40),
+                    field.get("min_font_size"), field.get("max_font_size")]
+                   + [field.get(column) for column, _ in TEXT_OPTIONS])
+        for field in fields
+    )
+    return hashlib.sha256("\n".join(boxes).encode()).hexdigest()
+
+
+def ingest_template(data: bytes, fields: List[Dict], width: int) -> IngestedTemplate:
+    image = normalize_image(data, width)
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=BASE_JPEG_QUALITY, subsampling=0)
+    encoded = output.getvalue()
+    return IngestedTemplate(
+        image=encoded,
+        width=image.width,
+        height=image.height,
+        layout=compute_field_layout(fields, image.size),
+        digest=hashlib.sha256(encoded).hexdigest(),
+    )
+
+
+def render_asset(ingested: IngestedTemplate, url: str, source_url: str, fields: List[Dict]) -> Dict[str, Any]:
+    """The record stored under certificate_templates.render_assets[profile]"""
+    return {
+        "url": url,
+        "width": ingested.width,
+        "height": ingested.height,
+        "layout": ingested.layout,
+        "source_url": source_url,
+        "fields_digest": fields_digest(fields),
+        "version": ASSET_VERSION,
+    }
+
+
+def asset_is_current(asset: Optional[Dict[str, Any]], source_url: str, fields: List[Dict]) -> bool:
+    return bool(asset) and (
+        asset.get("version") == ASSET_VERSION
+        and asset.get("source_url") == source_url
+        and asset.get("fields_digest") == fields_digest(fields)
+    )
+
+
+def asset_fingerprint(asset: Dict[str, Any]) -> str:
+    """Changes whenever a render from `asset` could: its base image (the URL embeds the image digest) or layout"""
+    key = f"{asset['version']}\n{asset['url']}\n{asset['fields_digest']}"
+    return hashlib.sha256(key.encode()).hexdigest()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# fake_services (FakeSupabase) lives with the benchmarks
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+# Keep tests out of the shared cache the API workers use
+os.environ.setdefault("SHARED_CACHE_BACKEND", "none")
@@ -0,0 +1,44 @@
+from admission import AdmissionController, TokenBucketLimiter
+from cache import TieredCache
+
+
+def scope(peer: str, forwarded_for: str = None) -> dict:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return {"type": "http", "headers": headers, "client": (peer, 50000)}
+
+
+def test_token_bucket_allows_burst_then_limits():
+    limiter = TokenBucketLimiter(rate=1.0, burst=3)
+    assert [limiter.acquire("ip")[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = limiter.acquire("ip")
+    assert not allowed and 0 < retry_after <= 1.0
+    assert limiter.acquire("other-ip")[0]
+
+
+def test_client_ip_ignores_forwarded_for_without_a_proxy():
+    controller = AdmissionController(is_cached_verification=lambda certificate_id: False)
+    assert controller.client_ip(scope("203.0.113.9", "198.51.100.1")) == "203.0.113.9"
+
+
+def test_client_ip_behind_proxies_counts_hops_from_the_right():
+    one_proxy = AdmissionController(is_cached_verification=lambda certificate_id: False, proxy_hops=1)
+    # The client may prepend anything; our proxy appends the address it saw
+    assert one_proxy.client_ip(scope("10.0.0.2", "1.2.3.4, 198.51.100.1")) == "198.51.100.1"
+    two_proxies = AdmissionController(is_cached_verification=lambda certificate_id: False, proxy_hops=2)
+    assert two_proxies.client_ip(scope("10.0.0.2", "1.2.3.4, 198.51.100.1, 10.0.0.3")) == "198.51.100.1"
+    assert one_proxy.client_ip(scope("10.0.0.2")) == "10.0.0.2"
+
+
+class ExplodingBackend:
+    def get(self, key):
+        raise AssertionError("shared cache read on the admission path")
+
+    def set(self, key, value, ttl=None):
+        pass
+
+
+def test_cached_verification_check_reads_l1_only():
+    cache = TieredCache("verify", ExplodingBackend())
+    assert cache.get_local("CERT-MISSING") is None
+    cache.set("CERT-CACHED", {"verified": True})
+    assert cache.get_local("CERT-CACHED") == {"verified": True}
@@ -0,0 +1,134 @@
+import asyncio
+import sys
+import threading
+
+import pytest
+
+from analytics import MIN_RETENTION_DAYS, VerificationRollups, summarize_days
+
+
+class RecordingClient:
+    """Stands in for the Supabase client; remembers every increment_verification_rollups batch"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batches = []
+
+    def rpc(self, name, params):
+        assert name == "increment_verification_rollups"
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.batches.append(params["rows"])
+        return self
+
+    def execute(self):
+        return self
+
+    def total(self) -> int:
+        return sum(row["scan_count"] for rows in self.batches for row in rows)
+
+
+def test_pending_counts_merge_per_day():
+    rollups = VerificationRollups(client_factory=RecordingClient)
+    rollups.record("cert-1", "group-1", "2026-01-15")
+    rollups.record("cert-1", "group-1", "2026-01-15")
+    rollups.record("cert-1", "group-1", "2026-01-16")
+    rollups.record("cert-2", "group-2", "2026-01-15")
+    assert rollups.pending_for_certificate("cert-1") == {"2026-01-15": 2, "2026-01-16": 1}
+    assert rollups.pending_for_group("group-2") == {("cert-2", "2026-01-15"): 1}
+
+
+def test_flush_sends_deltas_once():
+    client = RecordingClient()
+    rollups = VerificationRollups(client_factory=lambda: client)
+    rollups.record("cert-1", None, "2026-01-15", count=3)
+    asyncio.run(rollups.flush())
+    asyncio.run(rollups.flush())
+    assert client.batches == [[{"certificate_pk": "cert-1", "day": "2026-01-15", "group_id": "", "scan_count": 3}]]
+    assert rollups.pending_for_certificate("cert-1") == {}
+
+
+def test_failed_flush_keeps_counts_for_the_next_one():
+    client = RecordingClient(fail=True)
+    rollups = VerificationRollups(client_factory=lambda: client)
+    rollups.record("cert-1", "group-1", "2026-01-15", count=2)
+    with pytest.raises(RuntimeError):
+        asyncio.run(rollups.flush())
+    assert rollups.pending_for_certificate("cert-1") == {"2026-01-15": 2}
+
+
+def test_no_increment_is_lost_while_flushing_from_the_loop():
+    client = RecordingClient()
+    rollups = VerificationRollups(client_factory=lambda: client)
+    threads, per_thread = 4, 20000
+
+    def writer():
+        for i in range(per_thread):
+            rollups.record(f"cert-{i % 7}", "group-1", "2026-01-15")
+
+    async def scenario():
+        workers = [threading.Thread(target=writer) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            await rollups.flush()
+        for worker in workers:
+            worker.join()
+        await rollups.flush()
+
+    # Switch threads as often as possible so increments race the delta table swap
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        asyncio.run(scenario())
+    finally:
+        sys.setswitchinterval(interval)
+    assert client.total() == threads * per_thread
+
+
+def test_summarize_days_adds_unflushed_counts():
+    summary = summarize_days(
+        [{"day": "2026-01-15", "scan_count": 5}, {"day": "2026-01-16", "scan_count": 1}],
+        {"2026-01-16": 2, "2026-01-17": 4},
+    )
+    assert summary["total_scans"] == 12
+    assert summary["daily"] == [
+        {"day": "2026-01-15", "scans": 5},
+        {"day": "2026-01-16", "scans": 3},
+        {"day": "2026-01-17", "scans": 4},
+    ]
+
+
+def test_compaction_never_reaches_inside_retention():
+    client = RecordingClient()
+    rollups = VerificationRollups(client_factory=lambda: client, retention_days=30)
+    with pytest.raises(ValueError):
+        asyncio.run(rollups.compact(older_than_days=0))
+    assert VerificationRollups(client_factory=lambda: client, retention_days=0).retention_days == MIN_RETENTION_DAYS
+
+
+def test_compact_endpoint_is_admin_only_and_keeps_retention(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import server
+    from fake_services import FakeSupabase
+
+    monkeypatch.setattr(server, "supabase", FakeSupabase())
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "test-admin-token")
+    client = TestClient(server.app)
+    assert client.post("/api/analytics/compact").status_code == 403
+    assert client.post("/api/analytics/compact", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    admin = {"X-Admin-Token": "test-admin-token"}
+    assert client.post("/api/analytics/compact?older_than_days=0", headers=admin).status_code == 400
+    response = client.post("/api/analytics/compact", headers=admin)
+    assert response.status_code == 200 and response.json()["success"]
+    monkeypatch.setattr(server, "ADMIN_TOKEN", None)
+    assert client.post("/api/analytics/compact", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_stop_survives_a_failed_final_flush(capsys):
+    rollups = VerificationRollups(client_factory=lambda: RecordingClient(fail=True))
+    rollups.record("cert-1", "group-1", "2026-01-15")
+    asyncio.run(rollups.stop())
+    assert "Final analytics flush failed" in capsys.readouterr().out
+    assert rollups.pending_for_certificate("cert-1") == {"2026-01-15": 1}
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from analytics import VerificationRollups
+from audit_log import VerificationLogWriter
+from cache import LRUCache
+from fake_services import FakeSupabase
+
+
+def event(certificate_id: str, verified_at: str = "2026-01-15T10:00:00+00:00") -> dict:
+    return {"certificate_id": certificate_id, "verified_at": verified_at, "trust_score": 100}
+
+
+@pytest.fixture
+def world():
+    db = FakeSupabase()
+    cert = db.seed("certificates", [{"certificate_id": "CERT-A", "group_id": "group-1", "status": "minted"}])[0]
+    rollups = VerificationRollups(client_factory=lambda: db)
+    writer = VerificationLogWriter(client_factory=lambda: db, pk_cache=LRUCache(), rollups=rollups)
+    return db, cert, rollups, writer
+
+
+def test_batch_insert_skips_unknown_certificates(world):
+    db, cert, rollups, writer = world
+    for certificate_id in ("CERT-A", "CERT-A", "CERT-UNKNOWN"):
+        writer.enqueue(event(certificate_id))
+    asyncio.run(writer.flush())
+    rows = db.tables["certificate_verifications"]
+    assert [row["certificate_pk"] for row in rows] == [cert["id"], cert["id"]]
+    assert writer.stats()["written"] == 2
+
+
+def test_rows_are_marked_rolled_up_only_by_the_flush_that_counts_them(world):
+    db, cert, rollups, writer = world
+    writer.enqueue(event("CERT-A"))
+    writer.enqueue(event("CERT-A"))
+    asyncio.run(writer.flush())
+    rows = db.tables["certificate_verifications"]
+    # A crash here must leave the rows for compaction to count
+    assert not any(row["rolled_up"] for row in rows)
+    assert rollups.pending_for_certificate(cert["id"]) == {"2026-01-15": 2}
+
+    asyncio.run(rollups.flush())
+    assert all(row["rolled_up"] for row in rows)
+    assert db.tables["verification_daily_rollups"][0]["scan_count"] == 2
+
+
+def test_failed_rollup_flush_leaves_rows_uncounted_and_retries(world):
+    db, cert, rollups, writer = world
+    writer.enqueue(event("CERT-A"))
+    asyncio.run(writer.flush())
+    handler = db.rpc_handlers.pop("increment_verification_rollups")
+    with pytest.raises(Exception):
+        asyncio.run(rollups.flush())
+    assert not db.tables["certificate_verifications"][0]["rolled_up"]
+
+    db.rpc_handlers["increment_verification_rollups"] = handler
+    asyncio.run(rollups.flush())
+    assert db.tables["certificate_verifications"][0]["rolled_up"]
+    assert db.tables["verification_daily_rollups"][0]["scan_count"] == 1
+
+
+def test_full_queue_drops_oldest(world):
+    db, cert, rollups, writer = world
+    writer.max_queue = 2
+    assert writer.enqueue(event("CERT-A", "2026-01-15T10:00:00+00:00"))
+    assert writer.enqueue(event("CERT-A", "2026-01-15T11:00:00+00:00"))
+    assert not writer.enqueue(event("CERT-A", "2026-01-15T12:00:00+00:00"))
+    assert writer.stats()["dropped"] == 1
+    asyncio.run(writer.flush())
+    assert [row["verified_at"][11:13] for row in db.tables["certificate_verifications"]] == ["11", "12"]
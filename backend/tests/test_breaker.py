@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def test_opens_after_consecutive_failures_and_rejects():
+    breaker = CircuitBreaker("dep", failure_threshold=3, recovery_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure("HTTP 503")
+    breaker.before_call()
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure("HTTP 503")
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert 1 <= raised.value.retry_after <= 30
+    assert breaker.stats()["rejections"] == 1
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("dep", failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure("timeout")
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    assert breaker.allow()
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("dep", failure_threshold=1, slow_call_threshold=1.0)
+    breaker.record_success(0.5)
+    assert breaker.state == CLOSED
+    breaker.record_success(2.5)
+    assert breaker.state == OPEN
+    assert breaker.stats()["last_failure"] == "slow call (2.5s)"
+
+
+class OpenCircuitSupabase:
+    """A Supabase client whose breaker is open: every query is rejected"""
+
+    def table(self, name):
+        raise CircuitOpenError("supabase", 12)
+
+    def rpc(self, name, params=None):
+        raise CircuitOpenError("supabase", 12)
+
+
+@pytest.mark.parametrize("call", [
+    lambda: server.get_subscription_status("breaker-test-user"),
+    lambda: server.check_mint_limit("breaker-test-user-2"),
+    lambda: server.get_group("group-1"),
+    lambda: server.get_group_by_join_code("JOINCODE"),
+    lambda: server.export_group_certificates("group-1"),
+    lambda: server.certificate_scan_analytics("CERT-01JAB3ZK4M9X7E2Q5R8T1V6W3Y"),
+], ids=["subscription", "mint-limit", "group", "join-code", "export", "analytics"])
+def test_endpoints_answer_503_while_supabase_is_unavailable(monkeypatch, call):
+    monkeypatch.setattr(server, "supabase", OpenCircuitSupabase())
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(call())
+    assert raised.value.status_code == 503
+    assert raised.value.headers["Retry-After"] == "12"
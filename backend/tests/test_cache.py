@@ -0,0 +1,105 @@
+import time
+
+import cache
+from cache import LRUCache, SqliteCacheBackend, TieredCache, create_shared_backend
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert "b" not in lru
+    assert (lru.get("a"), lru.get("c"), len(lru)) == (1, 3, 2)
+
+
+def test_lru_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = LRUCache(ttl=10)
+    lru.set("default", 1)
+    lru.set("short", 2, ttl=1)
+    now[0] += 5
+    assert lru.get("short", "gone") == "gone"
+    assert lru.get("default") == 1
+    now[0] += 6
+    assert lru.get("default") is None
+    assert len(lru) == 0
+
+
+def test_lru_delete_and_clear():
+    lru = LRUCache()
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.delete("a")
+    lru.delete("missing")
+    assert "a" not in lru and "b" in lru
+    lru.clear()
+    assert len(lru) == 0
+
+
+def two_workers(tmp_path, **options):
+    """Two processes' caches over the same SQLite file"""
+    path = str(tmp_path / "shared.sqlite3")
+    return (TieredCache("verify", SqliteCacheBackend(path), **options),
+            TieredCache("verify", SqliteCacheBackend(path), **options))
+
+
+def test_values_set_by_one_worker_are_read_by_another(tmp_path):
+    first, second = two_workers(tmp_path)
+    first.set("CERT-1", {"status": "minted"})
+    assert second.get("CERT-1") == {"status": "minted"}
+    assert second.get("CERT-1") == {"status": "minted"}
+    assert (second.l2_hits, second.l1_hits) == (1, 1)
+    # L1 only never falls through to the shared backend
+    assert first.get_local("CERT-2", "none") == "none"
+    first.set("CERT-2", 2)
+    assert second.get_local("CERT-2") is None
+
+
+def test_deletes_reach_other_workers_after_l1_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    first, second = two_workers(tmp_path, ttl=300, l1_ttl=5)
+    first.set("CERT-1", "minted")
+    assert second.get("CERT-1") == "minted"
+    first.delete("CERT-1")
+    assert first.get("CERT-1") is None
+    # The other worker's L1 copy is bounded by l1_ttl
+    assert second.get("CERT-1") == "minted"
+    now[0] += 6
+    assert second.get("CERT-1") is None
+
+
+def test_shared_entries_expire(tmp_path, monkeypatch):
+    backend = SqliteCacheBackend(str(tmp_path / "shared.sqlite3"))
+    backend.set("key", b"value", ttl=10)
+    assert backend.get("key") == b"value"
+    later = time.time() + 11
+    monkeypatch.setattr(cache.time, "time", lambda: later)
+    assert backend.get("key") is None
+
+
+class BrokenBackend:
+    def get(self, key, *args):
+        raise ConnectionError("redis went away")
+
+    set = delete = get
+
+
+def test_backend_failures_degrade_to_per_process_caching():
+    tiered = TieredCache("verify", BrokenBackend())
+    tiered.set("CERT-1", "minted")
+    assert tiered.get("CERT-1") == "minted"
+    tiered.delete("CERT-1")
+    assert tiered.get("CERT-1", "missing") == "missing"
+    assert tiered.stats()["backend"] == "BrokenBackend"
+
+
+def test_shared_backend_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHARED_CACHE_BACKEND", "none")
+    assert create_shared_backend() is None
+    monkeypatch.setenv("SHARED_CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("SHARED_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    assert isinstance(create_shared_backend(), SqliteCacheBackend)
@@ -0,0 +1,112 @@
+import random
+import time
+
+from certificate_index import BloomFilter, CertificateIndex
+from fake_services import FakeSupabase
+from ids import CERTIFICATE_ID_PREFIX, encode_base32, generate_certificate_id
+
+rng = random.Random(36)
+
+
+def certificate_id(days_ago: float) -> str:
+    created_ms = int((time.time() - days_ago * 86400) * 1000)
+    return f"{CERTIFICATE_ID_PREFIX}{encode_base32((created_ms << 80) | rng.getrandbits(80), 26)}"
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(5000, error_rate=0.01)
+    members = [f"member-{index}" for index in range(5000)]
+    for member in members:
+        bloom.add(member)
+    assert all(member in bloom for member in members)
+    false_positives = sum(f"other-{index}" in bloom for index in range(20000))
+    assert false_positives < 20000 * 0.02
+
+
+def build_index(rows) -> CertificateIndex:
+    db = FakeSupabase()
+    db.seed("certificates", rows)
+    index = CertificateIndex(client_factory=lambda: db)
+    index.build()
+    return index
+
+
+def test_unbuilt_index_never_rejects():
+    index = CertificateIndex(client_factory=lambda: None)
+    assert index.might_exist(certificate_id(days_ago=30))
+    assert not index.is_revoked("CERT-anything")
+
+
+def test_index_rejects_only_old_ids_that_were_never_issued():
+    # More rows than one keyset page, so the build pages through the table
+    issued = [certificate_id(days_ago=rng.uniform(1, 300)) for _ in range(450)]
+    index = build_index(
+        [{"certificate_id": value, "status": "minted"} for value in issued]
+        + [{"certificate_id": None, "status": "pending"}]
+    )
+    assert index.stats()["issued"] == 450
+    assert all(index.might_exist(value) for value in issued)
+
+    unknown = [certificate_id(days_ago=rng.uniform(1, 300)) for _ in range(200)]
+    rejected = sum(not index.might_exist(value) for value in unknown)
+    assert rejected >= 195
+    assert index.rejections == rejected
+    # Issued by another worker after the build: newer than the watermark, so it goes to the database
+    assert index.might_exist(generate_certificate_id())
+    # Legacy IDs from the same period are rejected the same way
+    assert not index.might_exist("CERT-1600000000-ABC123")
+
+
+def test_certificates_added_after_the_build_are_known():
+    index = build_index([{"certificate_id": certificate_id(days_ago=10), "status": "minted"}])
+    late = certificate_id(days_ago=5)
+    assert not index.might_exist(late)
+    index.add(late)
+    assert index.might_exist(late)
+
+
+def test_revocations_survive_a_rebuild():
+    revoked = certificate_id(days_ago=3)
+    index = build_index([{"certificate_id": revoked, "status": "revoked"},
+                         {"certificate_id": certificate_id(days_ago=2), "status": "minted"}])
+    assert index.is_revoked(revoked)
+    index.mark_revoked("CERT-revoked-during-rebuild")
+    index.build()
+    assert index.is_revoked(revoked) and index.is_revoked("CERT-revoked-during-rebuild")
+    index.unmark_revoked(revoked)
+    assert not index.is_revoked(revoked)
+
+
+def test_refresh_reads_only_rows_changed_since_the_last_sync():
+    db = FakeSupabase()
+    db.seed("certificates", [{"certificate_id": certificate_id(days_ago=rng.uniform(1, 300)), "status": "minted"}
+                             for _ in range(450)])
+    index = CertificateIndex(client_factory=lambda: db)
+    index.build()
+    selects = db.calls["select:certificates"]
+
+    # Another worker issued one certificate and revoked another after the build
+    late = certificate_id(days_ago=5)
+    db.seed("certificates", [{"certificate_id": late, "status": "minted"}])
+    revoked = db.tables["certificates"][0]["certificate_id"]
+    db.table("certificates").update({"status": "revoked"}).eq("certificate_id", revoked).execute()
+    # Rows updated before the build (minus the skew) are not read again
+    for row in db.tables["certificates"][1:400]:
+        row["updated_at"] = "2020-01-01T00:00:00+00:00"
+    assert not index.might_exist(late)
+
+    index.refresh()
+    assert db.calls["select:certificates"] - selects <= 1
+    assert index.might_exist(late) and index.is_revoked(revoked)
+    assert index.stats()["refreshes"] == 1 and index.stats()["rebuilds"] == 1
+
+    db.table("certificates").update({"status": "minted"}).eq("certificate_id", revoked).execute()
+    index.refresh()
+    assert not index.is_revoked(revoked)
+
+
+def test_full_filter_asks_for_a_rebuild():
+    index = build_index([{"certificate_id": certificate_id(days_ago=1), "status": "minted"}])
+    assert not index.needs_rebuild
+    index.bloom.count = index.bloom.capacity
+    assert index.needs_rebuild
@@ -0,0 +1,120 @@
+import gzip
+import json
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from compression import CompressionMiddleware, encoded_etag, negotiate_encoding
+from http_cache import ConditionalGetMiddleware
+
+DOCUMENT = {"items": [{"certificate_id": f"CERT-{i:04d}", "status": "minted"} for i in range(200)]}
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 5000
+
+
+def document(request):
+    return JSONResponse(DOCUMENT, headers={"ETag": '"doc-1"'})
+
+
+def small(request):
+    return JSONResponse({"ok": True})
+
+
+def pdf(request):
+    return Response(PDF_BYTES, media_type="application/pdf")
+
+
+def pdf_range(request):
+    return Response(PDF_BYTES[:2000], status_code=206, media_type="application/pdf",
+                    headers={"Content-Range": f"bytes 0-1999/{len(PDF_BYTES)}"})
+
+
+def ndjson(request):
+    async def lines():
+        for item in DOCUMENT["items"]:
+            yield json.dumps(item).encode() + b"\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+app = Starlette(routes=[
+    Route("/document", document),
+    Route("/small", small),
+    Route("/pdf", pdf),
+    Route("/pdf-range", pdf_range),
+    Route("/ndjson", ndjson),
+])
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
+client = TestClient(app)
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def test_compresses_large_json():
+    response = client.get("/document", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.json() == DOCUMENT
+
+
+def test_keeps_small_json_uncompressed():
+    response = client.get("/small", headers=GZIP)
+    assert "content-encoding" not in response.headers
+
+
+def test_never_compresses_downloads():
+    response = client.get("/pdf", headers=GZIP)
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == str(len(PDF_BYTES))
+    assert response.content == PDF_BYTES
+
+
+def test_never_compresses_partial_responses():
+    response = client.get("/pdf-range", headers=GZIP)
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == "2000"
+
+
+def test_streams_compressed_ndjson():
+    with client.stream("GET", "/ndjson", headers=GZIP) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        raw = b"".join(response.iter_raw())
+    lines = gzip.decompress(raw).splitlines()
+    assert [json.loads(line) for line in lines] == DOCUMENT["items"]
+
+
+def test_respects_accept_encoding():
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("deflate, gzip;q=0.5") == "gzip"
+    response = client.get("/document", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+
+def test_encoded_responses_get_their_own_etag():
+    compressed = client.get("/document", headers=GZIP)
+    identity = client.get("/document", headers={"Accept-Encoding": "identity"})
+    assert compressed.headers["etag"] == '"doc-1-gzip"'
+    assert identity.headers["etag"] == '"doc-1"'
+    assert encoded_etag('W/"doc-1"', "br") == 'W/"doc-1-br"'
+
+
+def test_vary_is_set_on_every_compressible_response():
+    for path, headers in (("/document", {"Accept-Encoding": "identity"}), ("/small", GZIP), ("/document", GZIP)):
+        assert "accept-encoding" in client.get(path, headers=headers).headers.get("vary", "").lower()
+    assert "vary" not in client.get("/pdf", headers=GZIP).headers
+
+
+def test_conditional_requests_match_the_encoded_variant():
+    # Same order as server.py: ConditionalGetMiddleware wraps CompressionMiddleware
+    conditional_app = Starlette(routes=[Route("/document", document)])
+    conditional_app.add_middleware(CompressionMiddleware, minimum_size=1000)
+    conditional_app.add_middleware(ConditionalGetMiddleware)
+    conditional = TestClient(conditional_app)
+    etag = conditional.get("/document", headers=GZIP).headers["etag"]
+    revalidated = conditional.get("/document", headers={**GZIP, "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert "accept-encoding" in revalidated.headers["vary"].lower()
+    # The identity validator does not vouch for the gzip bytes, nor the other way round
+    assert conditional.get("/document", headers={**GZIP, "If-None-Match": '"doc-1"'}).status_code == 200
+    assert conditional.get("/document", headers={"Accept-Encoding": "identity", "If-None-Match": etag}).status_code == 200
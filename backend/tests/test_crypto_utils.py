@@ -0,0 +1,95 @@
+import pytest
+from eth_account import Account
+
+import crypto_utils
+from crypto_utils import (
+    canonical_json, canonical_payload_candidates, create_canonical_payload, hash_message, legacy_canonical_payload,
+    sign_message, verify_signature,
+)
+
+PRIVATE_KEY = "0x" + "4c" * 32
+WALLET = Account.from_key(PRIVATE_KEY).address
+
+PAYLOAD = {
+    "recipientName": "Zoë Ångström",
+    "certificateId": "CERT-01JAB3ZK4M9X7E2Q5R8T1V6W3Y",
+    "fieldData": {"Score": "98", "Course": "Kryptografie – Grundlagen"},
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(crypto_utils, "orjson", None)
+    elif crypto_utils.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_canonical_payload_sorts_keys_at_every_depth(encoder):
+    assert create_canonical_payload(PAYLOAD) == (
+        '{"certificateId":"CERT-01JAB3ZK4M9X7E2Q5R8T1V6W3Y",'
+        '"fieldData":{"Course":"Kryptografie – Grundlagen","Score":"98"},'
+        '"recipientName":"Zoë Ångström"}'
+    )
+
+
+def test_canonical_payload_ignores_insertion_order(encoder):
+    reordered = {"fieldData": {"Score": "98", "Course": "Kryptografie – Grundlagen"},
+                 "recipientName": "Zoë Ångström", "certificateId": "CERT-01JAB3ZK4M9X7E2Q5R8T1V6W3Y"}
+    assert create_canonical_payload(reordered) == create_canonical_payload(PAYLOAD)
+
+
+def test_legacy_encoding_is_a_second_candidate_only_when_it_differs():
+    legacy = legacy_canonical_payload(PAYLOAD)
+    assert "\\u00eb" in legacy and '"Score":"98","Course"' in legacy
+    assert canonical_payload_candidates(PAYLOAD) == [create_canonical_payload(PAYLOAD), legacy]
+    ascii_flat = {"b": "2", "a": "1"}
+    assert canonical_payload_candidates(ascii_flat) == ['{"a":"1","b":"2"}']
+
+
+def test_sign_and_verify_round_trip():
+    message = create_canonical_payload(PAYLOAD)
+    signature = sign_message(message, PRIVATE_KEY)
+    assert verify_signature(message, signature, WALLET)
+    assert verify_signature(message, signature, WALLET.lower())
+    assert not verify_signature(message.replace("98", "99"), signature, WALLET)
+    assert not verify_signature(message, "0xnot-a-signature", WALLET)
+
+
+def test_hash_is_keccak_of_the_utf8_text():
+    assert hash_message("") == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert hash_message(create_canonical_payload(PAYLOAD)) != hash_message(legacy_canonical_payload(PAYLOAD))
+
+
+EDGE_CASES = {
+    "controls": "tab\tnewline\nbell\x07del\x7f",
+    "quotes": 'say "hi" \\ bye',
+    "unicode": "Zoë – 日本語 – 🎓 – \u2028",
+    "integers": [0, -1, 2 ** 63 - 1, -(2 ** 63), 2 ** 64 - 1],
+    "flags": [True, False, None],
+    "nested": {"b": [{"d": 1, "c": ""}], "a": {}},
+    "": "empty key",
+}
+
+
+def test_orjson_and_json_encoders_produce_identical_bytes(monkeypatch):
+    if crypto_utils.orjson is None:
+        pytest.skip("orjson is not installed")
+    for payload in (PAYLOAD, EDGE_CASES):
+        with_orjson = canonical_json(payload).encode()
+        monkeypatch.setattr(crypto_utils, "orjson", None)
+        with_json = canonical_json(payload).encode()
+        monkeypatch.undo()
+        assert with_orjson == with_json
+
+
+@pytest.mark.parametrize("value", [1.5, 1.0, float("nan"), 2 ** 64, -(2 ** 63) - 1, {1: "int key"}, b"bytes"])
+def test_values_the_encoders_disagree_on_are_rejected(encoder, value):
+    with pytest.raises(ValueError):
+        create_canonical_payload({"fieldData": {"value": value}})
+
+
+def test_legacy_payloads_with_floats_still_have_a_candidate():
+    legacy_only = {"score": 97.5, "name": "Zoë"}
+    assert canonical_payload_candidates(legacy_only) == [legacy_canonical_payload(legacy_only)]
@@ -0,0 +1,61 @@
+import events
+import server
+from events import CERTIFICATE_STATUS_CHANNEL, LocalPubSub, create_pubsub
+
+
+def test_publish_reaches_every_subscriber_of_the_channel():
+    pubsub = LocalPubSub()
+    received = []
+    pubsub.subscribe(CERTIFICATE_STATUS_CHANNEL, lambda message: received.append(("a", message)))
+    pubsub.subscribe(CERTIFICATE_STATUS_CHANNEL, lambda message: received.append(("b", message)))
+    pubsub.subscribe("other", lambda message: received.append(("other", message)))
+    pubsub.publish(CERTIFICATE_STATUS_CHANNEL, {"certificate_id": "CERT-1"})
+    assert received == [("a", {"certificate_id": "CERT-1"}), ("b", {"certificate_id": "CERT-1"})]
+
+
+def test_failing_subscriber_does_not_stop_the_others():
+    pubsub = LocalPubSub()
+    received = []
+
+    def broken(message):
+        raise KeyError("certificate_id")
+
+    pubsub.subscribe(CERTIFICATE_STATUS_CHANNEL, broken)
+    pubsub.subscribe(CERTIFICATE_STATUS_CHANNEL, received.append)
+    pubsub.publish(CERTIFICATE_STATUS_CHANNEL, {"certificate_id": "CERT-1"})
+    assert received == [{"certificate_id": "CERT-1"}]
+    assert pubsub.stats()["failures"] == 1
+
+
+def test_unsubscribe():
+    pubsub = LocalPubSub()
+    received = []
+    pubsub.subscribe(CERTIFICATE_STATUS_CHANNEL, received.append)
+    pubsub.unsubscribe(CERTIFICATE_STATUS_CHANNEL, received.append)
+    pubsub.unsubscribe(CERTIFICATE_STATUS_CHANNEL, received.append)
+    pubsub.publish(CERTIFICATE_STATUS_CHANNEL, {"certificate_id": "CERT-1"})
+    assert received == []
+    assert pubsub.stats() == {"backend": "local", "published": 1, "failures": 0,
+                              "subscribers": {CERTIFICATE_STATUS_CHANNEL: 0}}
+
+
+def test_without_redis_status_changes_stay_in_process(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    assert type(create_pubsub()) is LocalPubSub
+
+    def unavailable(url):
+        raise ConnectionError("redis is not reachable")
+
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setattr(events, "RedisPubSub", unavailable)
+    assert type(create_pubsub()) is LocalPubSub
+
+
+def test_revocation_invalidates_cached_verification_and_index():
+    server.verification_response_cache.set("CERT-EVT", {"full": ("{}", {})})
+    server.status_events.publish(CERTIFICATE_STATUS_CHANNEL, {"certificate_id": "CERT-EVT", "status": "revoked"})
+    assert server.verification_response_cache.get("CERT-EVT") is None
+    assert server.certificate_index.is_revoked("CERT-EVT")
+
+    server.status_events.publish(CERTIFICATE_STATUS_CHANNEL, {"certificate_id": "CERT-EVT", "status": "minted"})
+    assert not server.certificate_index.is_revoked("CERT-EVT")
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import zipfile
+from io import BytesIO
+
+import httpx
+
+import export
+from export import fetch_images, stream_ndjson, stream_zip
+from fake_services import FakeSupabase
+
+CERTIFICATES = 2 * export.EXPORT_PAGE_SIZE + 3
+
+
+def seeded_db() -> FakeSupabase:
+    db = FakeSupabase()
+    db.seed("certificates", [
+        {"certificate_id": f"CERT-{index:03d}", "group_id": "group-1", "status": "minted",
+         "canonical_payload": {"recipientName": f"Student {index}"}, "nft_id": f"nft-{index}",
+         "ipfs_url": None, "created_at": f"2026-01-01T00:00:{index % 60:02d}+00:00"}
+        for index in range(CERTIFICATES)
+    ])
+    db.seed("certificates", [{"certificate_id": "CERT-OTHER", "group_id": "group-2", "created_at": "2026-01-01"}])
+    return db
+
+
+async def collect(stream) -> list:
+    return [chunk async for chunk in stream]
+
+
+def test_ndjson_streams_one_page_per_chunk():
+    db = seeded_db()
+    chunks = asyncio.run(collect(stream_ndjson(lambda: db, "group-1")))
+    assert len(chunks) == 3
+    records = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert sorted(record["certificate_id"] for record in records) == [f"CERT-{index:03d}" for index in range(CERTIFICATES)]
+    assert records[0]["nft"]["nft_id"].startswith("nft-")
+    assert records[0]["canonical_payload"]["recipientName"].startswith("Student")
+
+
+def test_zip_is_written_entry_by_entry():
+    db = seeded_db()
+    chunks = asyncio.run(collect(stream_zip(lambda: db, "group-1")))
+    # One chunk per certificate plus the central directory
+    assert len(chunks) == CERTIFICATES + 1
+    archive = zipfile.ZipFile(BytesIO(b"".join(chunks)))
+    names = archive.namelist()
+    assert len([name for name in names if name.startswith("certificates/")]) == CERTIFICATES
+    assert "certificates/CERT-OTHER.json" not in names
+    assert archive.read("README.txt").decode() == f"CertiChain export of group group-1: {CERTIFICATES} certificates\n"
+    assert json.loads(archive.read("certificates/CERT-007.json"))["status"] == "minted"
+
+
+def test_image_fetch_skips_missing_and_failed_downloads():
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        return httpx.Response(200, content=b"jpeg:" + request.url.path.encode())
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            return await fetch_images(http, ["https://cdn/a", None, "ipfs://cid", "https://cdn/missing", "https://cdn/down"])
+
+    assert asyncio.run(scenario()) == [b"jpeg:/a", None, None, None, None]
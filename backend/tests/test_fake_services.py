@@ -0,0 +1,46 @@
+import pytest
+
+from fake_services import FakeAPIError, FakeSupabase, parse_select
+
+
+@pytest.fixture
+def db():
+    db = FakeSupabase()
+    db.seed("certificates", [{
+        "certificate_id": "CERT-A",
+        "status": "minted",
+        "canonical_payload": {"recipientName": "Ada", "issuerWallet": "0xabc"},
+    }])
+    return db
+
+
+def test_parse_select_aliases_and_json_paths():
+    assert parse_select("id, recipient_name:canonical_payload->>recipientName, canonical_payload->issuerWallet") == [
+        ("id", "id"),
+        ("recipient_name", "canonical_payload->>recipientName"),
+        ("issuerWallet", "canonical_payload->issuerWallet"),
+    ]
+
+
+def test_projection_resolves_aliases_and_json_paths(db):
+    rows = db.table("certificates").select("certificate_id, issuer_wallet:canonical_payload->>issuerWallet").execute().data
+    assert rows == [{"certificate_id": "CERT-A", "issuer_wallet": "0xabc"}]
+
+
+def test_unknown_columns_are_rejected_like_postgrest(db):
+    with pytest.raises(FakeAPIError, match="field_data does not exist"):
+        db.table("certificates").select("id, field_data").execute()
+    with pytest.raises(FakeAPIError, match="does not exist"):
+        db.table("certificates").select("id").eq("recipient_nickname", "x").execute()
+    with pytest.raises(FakeAPIError, match="schema cache"):
+        db.table("certificates").insert({"certificate_id": "CERT-B", "field_data": {}}).execute()
+    with pytest.raises(FakeAPIError, match="schema cache"):
+        db.table("certificates").update({"field_data": {}}).eq("certificate_id", "CERT-A").execute()
+
+
+def test_tables_without_a_schema_accept_their_seeded_columns():
+    db = FakeSupabase(schema={})
+    db.seed("widgets", [{"name": "gear"}])
+    assert db.table("widgets").select("id, name").execute().data[0]["name"] == "gear"
+    with pytest.raises(FakeAPIError):
+        db.table("widgets").select("colour").execute()
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+import hot_paths
+
+
+@pytest.fixture(scope="module")
+def benchmarks():
+    return dict(hot_paths.build_benchmarks())
+
+
+def test_compare_flags_only_medians_beyond_tolerance():
+    baseline = {"fast": {"median_us": 100.0}, "slow": {"median_us": 100.0}}
+    results = {"fast": {"median_us": 124.0}, "slow": {"median_us": 130.0}, "new": {"median_us": 5.0}}
+    regressions = hot_paths.compare(results, baseline, tolerance=0.25)
+    assert regressions == ["slow: 130.0 us vs baseline 100.0 us (+30%, allowed +25%)"]
+
+
+def test_baseline_covers_every_benchmark(benchmarks):
+    with open(hot_paths.DEFAULT_BASELINE) as f:
+        baseline = json.load(f)["results"]
+    assert set(benchmarks) <= set(baseline)
+
+
+def test_benchmarked_verification_documents_verify(benchmarks):
+    full = json.loads(benchmarks["verify.full_document"]())
+    compact = json.loads(benchmarks["verify.compact_document"]())
+    assert full["verified"] is True
+    assert compact["verified"] is True
+
+
+def test_measure_reports_per_call_microseconds():
+    result = hot_paths.measure(lambda: sum(range(100)), rounds=3, min_round_time=0.001)
+    assert result["rounds"] == 3 and result["loops"] >= 1
+    assert 0 < result["min_us"] <= result["median_us"] <= result["max_us"]
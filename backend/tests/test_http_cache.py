@@ -0,0 +1,78 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from http_cache import (
+    CACHE_CONTROL_MINTED, CACHE_CONTROL_PENDING, ConditionalGetMiddleware, cache_headers, certificate_etag,
+    etag_matches, is_final,
+)
+
+MINTED = {"certificate_id": "CERT-1", "certificate_hash": "0xabc", "status": "minted", "nft_id": "nft-1"}
+
+
+@pytest.mark.parametrize("changes, final", [
+    ({}, True),
+    ({"status": "revoked"}, True),
+    ({"status": "pending"}, False),
+    ({"nft_id": None}, False),
+    ({"nft_id": "pending-CERT-1"}, False),
+    ({"nft_id": "queued-CERT-1"}, False),
+    ({"nft_id": "error-timeout"}, False),
+])
+def test_only_settled_certificates_are_final(changes, final):
+    cert = {**MINTED, **changes}
+    assert is_final(cert) is final
+    assert cache_headers(cert)["Cache-Control"] == (CACHE_CONTROL_MINTED if final else CACHE_CONTROL_PENDING)
+
+
+def test_etag_changes_with_status_nft_and_variant():
+    etag = certificate_etag(MINTED)
+    assert etag == certificate_etag(dict(MINTED))
+    assert etag != certificate_etag({**MINTED, "status": "revoked"})
+    assert etag != certificate_etag({**MINTED, "nft_id": "nft-2"})
+    assert etag != certificate_etag(MINTED, "compact")
+    assert cache_headers(MINTED)["ETag"] == f'"{etag}"'
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches(" * ", '"anything"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(ConditionalGetMiddleware)
+
+    @app.get("/certificate")
+    async def certificate():
+        return JSONResponse({"id": "CERT-1"}, headers=cache_headers(MINTED))
+
+    @app.get("/missing")
+    async def missing():
+        return JSONResponse({"detail": "Not found"}, status_code=404, headers=cache_headers(MINTED))
+
+    @app.post("/certificate")
+    async def update():
+        return JSONResponse({"ok": True}, headers=cache_headers(MINTED))
+
+    return TestClient(app)
+
+
+def test_matching_get_is_answered_with_304(client):
+    etag = client.get("/certificate").headers["etag"]
+    response = client.get("/certificate", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == CACHE_CONTROL_MINTED
+    assert "content-type" not in response.headers
+
+
+def test_other_requests_pass_through(client):
+    etag = cache_headers(MINTED)["ETag"]
+    assert client.get("/certificate", headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert client.get("/missing", headers={"If-None-Match": etag}).status_code == 404
+    assert client.post("/certificate", headers={"If-None-Match": etag}).status_code == 200
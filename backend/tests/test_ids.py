@@ -0,0 +1,77 @@
+import threading
+import time
+
+import ids
+from ids import (
+    CERTIFICATE_ID_PREFIX, CROCKFORD_ALPHABET, IdGenerator, allocate_certificate_ids, certificate_id_timestamp_ms,
+    decode_base32, encode_base32, generate_certificate_id, generate_join_code,
+)
+
+
+def test_base32_round_trip():
+    for value in (0, 1, 31, 32, (1 << 128) - 1, 0x0123456789ABCDEF):
+        assert decode_base32(encode_base32(value, 26)) == value
+    assert decode_base32("01jab3zk") == decode_base32("01JAB3ZK")
+
+
+def test_certificate_ids_are_ulids_stamped_with_now():
+    before = time.time_ns() // 1_000_000
+    certificate_id = generate_certificate_id()
+    after = time.time_ns() // 1_000_000
+    body = certificate_id[len(CERTIFICATE_ID_PREFIX):]
+    assert certificate_id.startswith(CERTIFICATE_ID_PREFIX) and len(body) == 26
+    assert set(body) <= set(CROCKFORD_ALPHABET)
+    assert before <= certificate_id_timestamp_ms(certificate_id) <= after
+
+
+def test_ids_increase_strictly_within_a_millisecond():
+    generator = IdGenerator()
+    values = [generator.new_ulid() for _ in range(2000)]
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+
+
+def test_allocate_returns_consecutive_ids():
+    allocated = allocate_certificate_ids(50)
+    values = [decode_base32(certificate_id[len(CERTIFICATE_ID_PREFIX):]) for certificate_id in allocated]
+    assert values == list(range(values[0], values[0] + 50))
+    assert allocate_certificate_ids(0) == []
+    assert generate_certificate_id() > allocated[-1]
+
+
+def test_exhausted_sequence_borrows_the_next_millisecond(monkeypatch):
+    generator = IdGenerator()
+    monkeypatch.setattr(ids.time, "time_ns", lambda: 1_700_000_000_000 * 1_000_000)
+    first = generator.new_ulid()
+    generator._last_random = ids._RANDOM_MAX - 1
+    batch = generator.allocate(3)
+    assert decode_base32(batch[0]) >> ids._RANDOM_BITS == 1_700_000_000_001
+    assert [first] + batch == sorted([first] + batch)
+
+
+def test_threads_never_collide():
+    generator = IdGenerator()
+    results = []
+
+    def worker():
+        results.extend(generator.new_ulid() for _ in range(500))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 4000
+
+
+def test_timestamp_of_legacy_and_foreign_ids():
+    assert certificate_id_timestamp_ms("CERT-1700000000-ABC123") == 1_700_000_000_000
+    assert certificate_id_timestamp_ms("CERT-not-a-timestamp") is None
+    assert certificate_id_timestamp_ms("CERT-" + "U" * 26) is None
+    assert certificate_id_timestamp_ms("NFT-01JAB3ZK4M9X7E2Q5R8T1V6W3Y") is None
+
+
+def test_join_codes():
+    code = generate_join_code()
+    assert len(code) == 8 and code.isalnum() and code == code.upper()
+    assert len(generate_join_code(12)) == 12
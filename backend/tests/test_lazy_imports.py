@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import server
+from import_time import BACKEND_DIR, HEAVY_MODULES
+
+PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted(name for name in {heavy!r} if name in sys.modules)))
+"""
+
+
+def loaded_heavy_modules(module: str, **env) -> list:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, "SHARED_CACHE_BACKEND": "none", **env},
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", ["server", "crypto_utils", "verification_bundle"])
+def test_importing_loads_no_heavy_library(module, tmp_path):
+    assert loaded_heavy_modules(module, MINT_QUEUE_PATH=str(tmp_path / "queue.sqlite3")) == []
+
+
+def test_supabase_client_needs_configuration(monkeypatch):
+    monkeypatch.setattr(server, "SUPABASE_URL", "")
+    assert server.create_supabase_client() is None
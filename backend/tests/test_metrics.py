@@ -0,0 +1,40 @@
+from prometheus_client import REGISTRY
+
+from metrics import PipelineTimer, record_breaker_rejection, record_crossmint_response, render_latest
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stages_are_timed_back_to_back():
+    stage_count = {"pipeline": "test-mint", "stage": "render", "outcome": "ok"}
+    before = sample("certichain_pipeline_stage_seconds_count", **stage_count)
+    timer = PipelineTimer("test-mint")
+    timer.stage("lookup")
+    timer.stage("render")
+    timer.stage("upload")
+    timer.finish()
+    assert list(timer.durations) == ["lookup", "render", "upload"]
+    assert sample("certichain_pipeline_stage_seconds_count", **stage_count) == before + 1
+    assert sample("certichain_pipeline_seconds_count", pipeline="test-mint", outcome="ok") >= 1
+
+
+def test_finish_labels_only_the_running_stage_with_the_outcome():
+    timer = PipelineTimer("test-claim")
+    timer.stage("sign")
+    timer.stage("crossmint")
+    timer.finish("error")
+    assert sample("certichain_pipeline_stage_seconds_count", pipeline="test-claim", stage="sign", outcome="ok") == 1
+    assert sample("certichain_pipeline_stage_seconds_count", pipeline="test-claim", stage="crossmint", outcome="error") == 1
+    assert sample("certichain_pipeline_seconds_count", pipeline="test-claim", outcome="error") == 1
+
+
+def test_counters_show_up_in_the_exposition():
+    record_crossmint_response("test-mint", 429)
+    record_breaker_rejection("test-dependency")
+    payload, content_type = render_latest()
+    assert content_type.startswith("text/plain")
+    text = payload.decode()
+    assert 'certichain_crossmint_responses_total{operation="test-mint",status="429"} 1.0' in text
+    assert 'certichain_breaker_rejections_total{dependency="test-dependency"} 1.0' in text
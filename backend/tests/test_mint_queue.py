@@ -0,0 +1,91 @@
+import asyncio
+
+from mint_queue import MintQueue
+
+
+def test_file_is_created_on_start_not_construction(tmp_path):
+    path = tmp_path / "mint-queue.sqlite3"
+    queue = MintQueue(str(path))
+    assert not path.exists()
+
+    async def scenario():
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert path.exists()
+    assert queue.stats()["queued"] == 0
+
+
+def test_enqueue_before_start_creates_the_table(tmp_path):
+    queue = MintQueue(str(tmp_path / "mint-queue.sqlite3"))
+    queue.enqueue("CERT-1", {"mint": {"name": "a"}})
+    queue.enqueue("CERT-1", {"mint": {"name": "duplicate"}})
+    jobs = queue.claim_due(10)
+    assert [(job["certificate_id"], job["payload"]) for job in jobs] == [("CERT-1", {"mint": {"name": "a"}})]
+
+
+def test_claimed_jobs_are_leased(tmp_path):
+    queue = MintQueue(str(tmp_path / "mint-queue.sqlite3"), lease=60)
+    queue.enqueue("CERT-1", {})
+    assert len(queue.claim_due(10)) == 1
+    # Another worker polling during the lease gets nothing
+    assert queue.claim_due(10) == []
+
+
+def test_retry_backs_off_then_drops(tmp_path):
+    queue = MintQueue(str(tmp_path / "mint-queue.sqlite3"), base_delay=0, max_attempts=2)
+    queue.enqueue("CERT-1", {})
+    job = queue.claim_due(10)[0]
+    assert queue.retry(job, "HTTP 500")
+    job = queue.claim_due(10)[0]
+    assert job["attempts"] == 1
+    # Out of attempts: the job stays until the caller has recorded the failure
+    assert not queue.retry(job, "HTTP 500")
+    assert queue.stats()["queued"] == 1 and queue.dropped == 0
+    queue.complete(job["id"], dropped=True)
+    stats = queue.stats()
+    assert (stats["queued"], stats["completed"], stats["dropped"]) == (0, 0, 1)
+
+
+def test_drain_completes_or_retries_jobs(tmp_path):
+    handled = []
+
+    async def handler(job):
+        handled.append(job["certificate_id"])
+        if job["certificate_id"] == "CERT-BAD":
+            raise RuntimeError("Crossmint said no")
+        queue.complete(job["id"])
+
+    queue = MintQueue(str(tmp_path / "mint-queue.sqlite3"), handler=handler)
+    queue.enqueue("CERT-OK", {})
+    queue.enqueue("CERT-BAD", {})
+    asyncio.run(queue.drain())
+    assert sorted(handled) == ["CERT-BAD", "CERT-OK"]
+    stats = queue.stats()
+    assert (stats["queued"], stats["due"], stats["completed"], stats["max_attempts_so_far"]) == (1, 0, 1, 1)
+
+
+def test_exhausted_deferred_mint_is_recorded_and_counted_once(tmp_path, monkeypatch):
+    import server
+    from fake_services import FakeSupabase
+
+    db = FakeSupabase()
+    queue = MintQueue(str(tmp_path / "mint-queue.sqlite3"), handler=server.process_mint_job, base_delay=0, max_attempts=2)
+    monkeypatch.setattr(server, "supabase", db)
+    monkeypatch.setattr(server, "mint_queue", queue)
+
+    async def failing_mint(**kwargs):
+        return {"nft_id": "error-CERT-1", "token_id": "error", "transaction_hash": "error",
+                "recipient_wallet": "error", "contract_address": "", "retryable": True}
+
+    monkeypatch.setattr(server, "mint_nft_crossmint", failing_mint)
+    db.seed("certificates", [{"certificate_id": "CERT-1", "nft_id": "queued-CERT-1", "status": "pending"}])
+    queue.enqueue("CERT-1", {"mint": {}})
+    asyncio.run(queue.drain())
+    assert queue.stats()["queued"] == 1
+    asyncio.run(queue.drain())
+
+    stats = queue.stats()
+    assert (stats["queued"], stats["completed"], stats["dropped"]) == (0, 0, 1)
+    assert db.tables["certificates"][0]["nft_id"] == "error-CERT-1"
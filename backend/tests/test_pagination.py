@@ -0,0 +1,60 @@
+import pytest
+
+from fake_services import FakeSupabase
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, clamp_limit, decode_cursor, encode_cursor, keyset_page,
+    page_result,
+)
+
+
+def test_cursor_round_trip_is_url_safe():
+    cursor = encode_cursor('2026-01-15T10:00:00+00:00 "quoted"', "00000000-0000-0000-0000-0000000000ff")
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == ('2026-01-15T10:00:00+00:00 "quoted"', "00000000-0000-0000-0000-0000000000ff")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", encode_cursor("only-one-value", "x")[:-3], "W10"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_limits_are_clamped():
+    assert clamp_limit(None) == clamp_limit(0) == clamp_limit(-5) == DEFAULT_PAGE_SIZE
+    assert clamp_limit(10) == 10
+    assert clamp_limit(10_000) == MAX_PAGE_SIZE
+
+
+def test_pages_cover_every_row_once_in_order_despite_ties():
+    db = FakeSupabase()
+    # Batches of certificates share a created_at, so the id tiebreak matters
+    rows = db.seed("certificates", [
+        {"id": f"00000000-0000-0000-0000-{index:012d}", "group_id": "group-1",
+         "created_at": f"2026-01-{1 + index // 4:02d}T00:00:00+00:00"}
+        for index in range(23)
+    ])
+    db.seed("certificates", [{"id": "00000000-0000-0000-0000-999999999999", "group_id": "group-2",
+                              "created_at": "2026-01-01T00:00:00+00:00"}])
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        query = db.table("certificates").select("id, created_at").eq("group_id", "group-1")
+        page = page_result(keyset_page(query, 5, cursor).execute().data, 5)
+        seen.extend(row["id"] for row in page["items"])
+        pages += 1
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            break
+        cursor = page["next_cursor"]
+
+    expected = [row["id"] for row in sorted(rows, key=lambda row: (row["created_at"], row["id"]), reverse=True)]
+    assert pages == 5
+    assert len(seen) == len(set(seen)) == 23
+    assert seen == expected
+
+
+def test_page_result_of_an_exact_fit_has_no_next_page():
+    rows = [{"id": str(index), "created_at": "2026-01-01"} for index in range(3)]
+    assert page_result(rows, 3, estimated_total=3) == {
+        "items": rows, "next_cursor": None, "has_more": False, "estimated_total": 3,
+    }
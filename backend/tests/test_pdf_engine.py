@@ -0,0 +1,161 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from pdf_engine import PdfCache, file_response, render_text_pdf
+
+CONTENT = bytes(range(256)) * 4
+
+
+def test_path_for_normalizes_hashes(tmp_path):
+    pdf_cache = PdfCache(str(tmp_path))
+    assert pdf_cache.path_for("0xABCdef") == str(tmp_path / "abcdef.pdf")
+    # Anything that is not hex (e.g. a certificate ID fallback) is hashed, never used as a path
+    assert pdf_cache.path_for("../../etc/passwd").startswith(str(tmp_path))
+    assert len(os.path.basename(pdf_cache.path_for("CERT-1"))) == 64 + 4
+
+
+def test_concurrent_requests_render_once(tmp_path):
+    pdf_cache = PdfCache(str(tmp_path))
+    renders = []
+
+    def render(path):
+        renders.append(path)
+        render_text_pdf(["Certificate of Completion"], path)
+
+    async def scenario():
+        return await asyncio.gather(*(pdf_cache.get_or_create("0xfeed", render) for _ in range(5)))
+
+    paths = asyncio.run(scenario())
+    assert len(renders) == 1
+    assert set(paths) == {pdf_cache.path_for("0xfeed")}
+    with open(paths[0], "rb") as f:
+        assert f.read(5) == b"%PDF-"
+
+
+def test_failed_render_leaves_nothing_behind(tmp_path):
+    pdf_cache = PdfCache(str(tmp_path))
+
+    def render(path):
+        with open(path, "wb") as f:
+            f.write(b"half a PDF")
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(pdf_cache.get_or_create("0xbad", render))
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "file.pdf"
+    path.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def serve(request: Request):
+        return file_response(request, str(path), etag="abc", media_type="application/pdf", filename="file.pdf")
+
+    return TestClient(app)
+
+
+def test_full_response_and_etag(client):
+    response = client.get("/file")
+    assert response.status_code == 200 and response.content == CONTENT
+    assert response.headers["etag"] == '"abc"' and response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-disposition"] == "attachment; filename=file.pdf"
+    assert client.get("/file", headers={"If-None-Match": 'W/"x", "abc"'}).status_code == 304
+
+
+@pytest.mark.parametrize("range_header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+])
+def test_single_ranges(client, range_header, start, end):
+    response = client.get("/file", headers={"Range": range_header})
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+
+
+def test_unsatisfiable_and_stale_ranges(client):
+    response = client.get("/file", headers={"Range": "bytes=2000-"})
+    assert response.status_code == 416 and response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+    # If-Range for another version of the file: send it whole
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert response.status_code == 200 and len(response.content) == len(CONTENT)
+
+
+def write_pdf(size):
+    def render(path):
+        with open(path, "wb") as f:
+            f.write(b"%PDF-" + b"x" * (size - 5))
+    return render
+
+
+def test_cache_evicts_least_recently_used_files_past_the_byte_budget(tmp_path):
+    pdf_cache = PdfCache(str(tmp_path), max_bytes=2500)
+
+    async def scenario():
+        first = await pdf_cache.get_or_create("0xaa", write_pdf(1000))
+        await pdf_cache.get_or_create("0xbb", write_pdf(1000))
+        await pdf_cache.get_or_create("0xaa", write_pdf(1000))
+        await pdf_cache.get_or_create("0xcc", write_pdf(1000))
+        return first
+
+    first = asyncio.run(scenario())
+    assert os.path.exists(first)
+    assert not os.path.exists(pdf_cache.path_for("0xbb"))
+    assert pdf_cache.stats() == {"files": 2, "bytes": 2000, "max_bytes": 2500, "evictions": 1}
+    # A restarted process counts the files left on disk against the budget
+    assert PdfCache(str(tmp_path), max_bytes=1500).stats()["files"] == 1
+
+
+def test_render_version_is_part_of_the_key(tmp_path):
+    pdf_cache = PdfCache(str(tmp_path))
+    renders = []
+
+    def render(path):
+        renders.append(path)
+        write_pdf(100)(path)
+
+    async def scenario():
+        await pdf_cache.get_or_create("0xaa", render, version="v1")
+        await pdf_cache.get_or_create("0xaa", render, version="v1")
+        await pdf_cache.get_or_create("0xaa", render, version="v2")
+
+    asyncio.run(scenario())
+    assert len(renders) == 2
+    assert pdf_cache.path_for("0xaa", "v1") != pdf_cache.path_for("0xaa", "v2")
+
+
+def test_download_renders_a_new_pdf_when_the_template_changes(tmp_path, monkeypatch):
+    import fixtures
+    import server
+    from crypto_utils import create_canonical_payload, hash_message, sign_message
+    from fake_services import FakeSupabase
+
+    db = FakeSupabase()
+    monkeypatch.setattr(server, "supabase", db)
+    monkeypatch.setattr(server, "pdf_cache", PdfCache(str(tmp_path)))
+    server.template_image_cache.set("https://cdn/pdf-template.png", fixtures.make_template(800, 560))
+    template = db.seed("certificate_templates", [{"pdf_url": "https://cdn/pdf-template.png"}])[0]
+    db.seed("template_fields", [{**field, "template_id": template["id"]} for field in fixtures.TEMPLATE_FIELDS])
+    cert = {**fixtures.certificate_row(create_canonical_payload, hash_message, sign_message), "ipfs_url": None}
+    db.seed("groups", [{"id": cert["group_id"], "name": "PDF", "join_code": "PDF", "template_id": template["id"]}])
+    db.seed("certificates", [cert])
+    client = TestClient(server.app)
+
+    url = f"/api/certificates/{cert['certificate_id']}/download"
+    first = client.get(url)
+    assert first.status_code == 200 and first.content.startswith(b"%PDF-")
+    assert client.get(url, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    db.tables["template_fields"][0]["x"] += 10
+    second = client.get(url)
+    assert second.headers["etag"] != first.headers["etag"]
+    assert server.pdf_cache.stats()["files"] == 2
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import fixtures
+import server
+from crypto_utils import create_canonical_payload, hash_message, sign_message
+from fake_services import FakeSupabase
+
+TEMPLATE_URL = "https://cdn/print-template.png"
+
+
+@pytest.fixture
+def world(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(server, "supabase", db)
+    monkeypatch.setattr(server, "print_render_urls", server.LRUCache(maxsize=16))
+    server.template_image_cache.set(TEMPLATE_URL, fixtures.make_template(800, 560))
+    template = db.seed("certificate_templates", [{"pdf_url": TEMPLATE_URL}])[0]
+    db.seed("template_fields", [{**field, "template_id": template["id"]} for field in fixtures.TEMPLATE_FIELDS])
+    cert = fixtures.certificate_row(create_canonical_payload, hash_message, sign_message)
+    db.seed("groups", [{"id": cert["group_id"], "name": "Print", "join_code": "PRINT", "template_id": template["id"]}])
+    db.seed("certificates", [cert])
+
+    renders = []
+    render_to_storage = server.render_to_storage
+
+    def counting_render(*args):
+        renders.append(args[5])
+        return render_to_storage(*args)
+
+    monkeypatch.setattr(server, "render_to_storage", counting_render)
+    return db, cert, renders
+
+
+def print_url(cert) -> str:
+    return asyncio.run(server.render_print_certificate(cert["certificate_id"]))["print_url"]
+
+
+def test_print_render_in_storage_is_reused_after_a_restart(world):
+    db, cert, renders = world
+    url = print_url(cert)
+    # A new worker has an empty print_render_urls but finds the object in storage
+    server.print_render_urls.clear()
+    assert print_url(cert) == url
+    assert len(renders) == 1
+    assert ("certificate-pdfs", renders[0]) in db.objects
+
+
+def test_print_render_path_changes_with_the_template_layout(world):
+    db, cert, renders = world
+    first = print_url(cert)
+    db.tables["template_fields"][0]["x"] += 10
+    second = print_url(cert)
+    assert first != second
+    assert len(renders) == 2
+    # Both named after the same certificate hash; only the asset part differs
+    assert all(cert["certificate_hash"][:16] in path for path in renders)
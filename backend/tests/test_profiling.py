@@ -0,0 +1,91 @@
+import threading
+import time
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import collapse, install_profiling, sample_stacks
+
+TOKEN = "test-admin-token"
+ADMIN = {"X-Admin-Token": TOKEN}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(range(10000))}
+
+    install_profiling(app, TOKEN, max_profiles=2)
+    return TestClient(app)
+
+
+def test_admin_routes_require_the_token(client):
+    assert client.get("/api/admin/profile/requests").status_code == 403
+    assert client.get("/api/admin/profile/requests", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/admin/profile/requests", headers=ADMIN).json() == {"profiles": []}
+
+
+def test_only_admin_requests_with_x_profile_are_profiled(client):
+    assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "1"}).headers
+    assert "x-profile-id" not in client.get("/work", headers=ADMIN).headers
+
+    response = client.get("/work", headers={**ADMIN, "X-Profile": "1"})
+    assert response.json() == {"total": 49995000}
+    profile_id = response.headers["x-profile-id"]
+    listed = client.get("/api/admin/profile/requests", headers=ADMIN).json()["profiles"]
+    assert [(entry["id"], entry["path"]) for entry in listed] == [(profile_id, "/work")]
+
+    report = client.get(f"/api/admin/profile/requests/{profile_id}", headers=ADMIN)
+    assert report.status_code == 200 and "function calls" in report.text
+    assert client.get(f"/api/admin/profile/requests/{profile_id}?sort=bogus", headers=ADMIN).status_code == 400
+    assert client.get("/api/admin/profile/requests/missing", headers=ADMIN).status_code == 404
+
+
+def test_request_profiles_keep_only_the_newest(client):
+    ids = [client.get("/work", headers={**ADMIN, "X-Profile": "1"}).headers["x-profile-id"] for _ in range(3)]
+    listed = client.get("/api/admin/profile/requests", headers=ADMIN).json()["profiles"]
+    assert [entry["id"] for entry in listed] == [ids[2], ids[1]]
+
+
+def test_sampling_sees_other_threads_as_collapsed_stacks():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=busy_worker, name="busy-worker")
+    thread.start()
+    try:
+        counts = sample_stacks(0.05, 0.005)
+    finally:
+        stop.set()
+        thread.join()
+    stacks = [stack for stack in counts if stack.startswith("busy-worker;")]
+    assert stacks and all("busy_worker (test_profiling.py:" in stack for stack in stacks)
+    line = collapse(counts).splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit()
+
+
+def test_sample_duration_is_bounded(client):
+    response = client.get("/api/admin/profile/sample?seconds=600", headers=ADMIN)
+    assert response.status_code == 400
+
+
+def test_memory_snapshots_diff_against_the_previous_one(client):
+    try:
+        assert client.post("/api/admin/memory/start?frames=5", headers=ADMIN).json() == {"tracing": True, "frames": 5}
+        first = client.get("/api/admin/memory/snapshot?top=5", headers=ADMIN).json()
+        second = client.get("/api/admin/memory/snapshot?top=5", headers=ADMIN).json()
+        assert not first["compared_to_previous"] and second["compared_to_previous"]
+        assert all("size_diff_kb" in entry for entry in second["top"])
+        assert client.get("/api/admin/memory/snapshot?group_by=module", headers=ADMIN).status_code == 400
+    finally:
+        client.post("/api/admin/memory/stop", headers=ADMIN)
+    assert not tracemalloc.is_tracing()
+    assert client.get("/api/admin/memory/snapshot", headers=ADMIN).status_code == 409
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from render_budget import MemoryBudget, estimate_ingest_bytes, estimate_render_bytes, frame_bytes
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_estimates_count_four_bytes_per_pixel():
+    assert frame_bytes(3508, 2480) == 3508 * 2480 * 4
+    assert estimate_render_bytes(1600, 1120) > frame_bytes(1600, 1120)
+    assert estimate_ingest_bytes(1600, 1120) > estimate_render_bytes(1600, 1120)
+
+
+def test_grants_immediately_within_limit():
+    async def scenario():
+        budget = MemoryBudget(100)
+        assert await budget.acquire(40) == 40
+        assert await budget.acquire(60) == 60
+        assert budget.in_use == 100
+        budget.release(40)
+        budget.release(60)
+        return budget
+
+    budget = run(scenario())
+    assert budget.in_use == 0
+    assert budget.peak == 100
+    assert budget.waited == 0
+
+
+def test_oversized_reservation_is_capped_and_runs_alone():
+    async def scenario():
+        budget = MemoryBudget(100)
+        granted = await budget.acquire(500)
+        assert granted == 100
+        waiter = asyncio.create_task(budget.acquire(10))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        budget.release(granted)
+        assert await waiter == 10
+
+    run(scenario())
+
+
+def test_waiters_are_served_first_come_first_served():
+    async def scenario():
+        budget = MemoryBudget(100)
+        order = []
+
+        async def render(name, nbytes):
+            async with budget.reserve(nbytes):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        held = await budget.acquire(100)
+        tasks = [asyncio.create_task(render("big", 90)), asyncio.create_task(render("small", 10))]
+        await asyncio.sleep(0)
+        # The small render fits next to nothing but must not overtake the big one
+        budget.release(held)
+        await asyncio.gather(*tasks)
+        return order, budget
+
+    order, budget = run(scenario())
+    assert order == ["big", "small"]
+    assert budget.in_use == 0
+
+
+def test_cancelled_waiter_is_removed_from_queue():
+    async def scenario():
+        budget = MemoryBudget(100)
+        held = await budget.acquire(100)
+        waiter = asyncio.create_task(budget.acquire(50))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert budget.stats()["queued"] == 0
+        budget.release(held)
+        return budget
+
+    assert run(scenario()).in_use == 0
+
+
+def test_cancelled_waiter_dropped_by_release_still_raises_cancelled():
+    # A client disconnects while its render is queued and another render finishes
+    # before the cancelled task resumes: release() drops the cancelled waiter first.
+    async def scenario():
+        budget = MemoryBudget(100)
+        held = await budget.acquire(100)
+        waiter = asyncio.create_task(budget.acquire(50))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        budget.release(held)
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return budget
+
+    budget = run(scenario())
+    assert budget.in_use == 0
+    assert budget.stats()["queued"] == 0
+
+
+def test_cancel_after_grant_returns_the_reservation():
+    async def scenario():
+        budget = MemoryBudget(100)
+        held = await budget.acquire(100)
+        waiter = asyncio.create_task(budget.acquire(50))
+        await asyncio.sleep(0)
+        # Granted by release(), cancelled before the waiter got to run
+        budget.release(held)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return budget
+
+    assert run(scenario()).in_use == 0
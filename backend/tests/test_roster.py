@@ -0,0 +1,75 @@
+from io import BytesIO
+
+import pytest
+
+from roster import RosterFormatError, iter_roster_rows, iter_validated_chunks, normalize_headers
+
+
+def csv_file(text: str) -> BytesIO:
+    return BytesIO(text.encode("utf-8"))
+
+
+def test_header_aliases():
+    assert normalize_headers(["Full Name", " E-mail ", "Student Number", "Notes"]) == [
+        "recipient_name", "recipient_email", "student_id", None,
+    ]
+    with pytest.raises(RosterFormatError):
+        normalize_headers(["name", "phone"])
+
+
+def test_rows_skip_blanks_and_keep_line_numbers():
+    # Excel writes a BOM; blank lines and unknown columns are ignored
+    roster = csv_file("\ufeffName,Email,Notes\nAda Lovelace, ada@example.com ,x\n,,\n\nAlan Turing,alan@example.com,\n")
+    assert list(iter_roster_rows(roster, "roster.csv")) == [
+        (2, {"recipient_name": "Ada Lovelace", "recipient_email": "ada@example.com"}),
+        (5, {"recipient_name": "Alan Turing", "recipient_email": "alan@example.com"}),
+    ]
+
+
+def test_empty_roster():
+    with pytest.raises(RosterFormatError, match="empty"):
+        list(iter_roster_rows(csv_file(""), "roster.csv"))
+
+
+def test_chunks_split_valid_and_invalid_rows():
+    lines = ["name,email,student id"]
+    lines += [f"Student {index},student{index}@example.com,S-{index}" for index in range(5)]
+    lines += ["No Email,,S-9", "Bad Email,not-an-email,"]
+    chunks = list(iter_validated_chunks(csv_file("\n".join(lines)), "roster.csv", chunk_size=3))
+
+    assert [len(valid) + len(invalid) for valid, invalid in chunks] == [3, 3, 1]
+    valid = [row for chunk_valid, _ in chunks for row in chunk_valid]
+    invalid = [row for _, chunk_invalid in chunks for row in chunk_invalid]
+    assert [line for line, _ in valid] == [2, 3, 4, 5, 6]
+    assert valid[0][1].student_id == "S-0"
+    assert [line for line, _ in invalid] == [7, 8]
+    assert all("recipient_email" in message for _, message in invalid)
+
+
+def test_xlsx_rosters():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Student Name", "Email Address", "ID"])
+    workbook.active.append(["Ada Lovelace", "ada@example.com", 1815])
+    workbook.active.append([None, None, None])
+    upload = BytesIO()
+    workbook.save(upload)
+    upload.seek(0)
+    assert list(iter_roster_rows(upload, "Roster.XLSX")) == [
+        (2, {"recipient_name": "Ada Lovelace", "recipient_email": "ada@example.com", "student_id": "1815"}),
+    ]
+
+
+def test_existing_recipients_match_emails_case_insensitively(monkeypatch):
+    import server
+    from fake_services import FakeSupabase
+
+    db = FakeSupabase()
+    monkeypatch.setattr(server, "supabase", db)
+    group_id = "00000000-0000-0000-0000-000000000001"
+    db.seed("certificates", [
+        {"group_id": group_id, "certificate_id": "CERT-A", "canonical_payload": {"recipientEmail": "Alice@Example.com"}},
+        {"group_id": "other-group", "certificate_id": "CERT-B", "canonical_payload": {"recipientEmail": "bob@example.com"}},
+    ])
+    existing = server.existing_recipient_emails(group_id, ["alice@example.com", "BOB@example.com", "carol@example.com"])
+    assert existing == {"alice@example.com"}
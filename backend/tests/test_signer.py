@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from cryptography.fernet import Fernet
+from eth_account import Account
+
+import fixtures
+import signer
+from crypto_utils import verify_signature
+from fake_services import FakeSupabase
+from signer import (
+    IssuerKeyCache,
+    LocalSigner,
+    ProcessSigner,
+    SigningError,
+    SigningKeyUnavailable,
+    create_signer,
+    decrypt_private_key,
+    sign_batch,
+    unpack_result,
+)
+
+ISSUER_WALLET = Account.from_key(fixtures.ISSUER_PRIVATE_KEY).address
+
+
+def seed_instructor(db, private_key_encrypted):
+    return db.seed("instructors", [{
+        "user_id": "signer-test-user",
+        "name": "Signer Test Instructor",
+        "private_key_encrypted": private_key_encrypted,
+    }])[0]["id"]
+
+
+def test_decrypt_private_key_accepts_plaintext_and_fernet_tokens():
+    encryption_key = Fernet.generate_key().decode()
+    token = Fernet(encryption_key.encode()).encrypt(fixtures.ISSUER_PRIVATE_KEY.encode()).decode()
+    assert token.startswith(signer.FERNET_TOKEN_PREFIX)
+    assert decrypt_private_key(fixtures.ISSUER_PRIVATE_KEY, None) == fixtures.ISSUER_PRIVATE_KEY
+    assert decrypt_private_key(token, encryption_key) == fixtures.ISSUER_PRIVATE_KEY
+    with pytest.raises(SigningKeyUnavailable):
+        decrypt_private_key(token, None)
+    with pytest.raises(SigningKeyUnavailable):
+        decrypt_private_key(token, Fernet.generate_key().decode())
+
+
+def test_keys_are_loaded_once_until_they_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(signer.time, "monotonic", lambda: now[0])
+    db = FakeSupabase()
+    issuer_id = seed_instructor(db, fixtures.ISSUER_PRIVATE_KEY)
+    keys = IssuerKeyCache(lambda: db, ttl=60)
+    assert keys.account(issuer_id).address == ISSUER_WALLET
+    assert keys.account(issuer_id).address == ISSUER_WALLET
+    assert (keys.loads, keys.hits) == (1, 1)
+    now[0] += 61
+    keys.account(issuer_id)
+    assert keys.loads == 2
+    keys.evict(issuer_id)
+    keys.account(issuer_id)
+    assert keys.loads == 3
+
+
+def test_key_cache_evicts_least_recently_used():
+    db = FakeSupabase()
+    first, second, third = (seed_instructor(db, fixtures.ISSUER_PRIVATE_KEY) for _ in range(3))
+    keys = IssuerKeyCache(lambda: db, maxsize=2)
+    keys.account(first)
+    keys.account(second)
+    keys.account(first)
+    keys.account(third)
+    assert keys.stats()["keys"] == 2
+    keys.account(first)
+    assert keys.loads == 3
+    keys.account(second)
+    assert keys.loads == 4
+
+
+def test_missing_and_expired_keys_are_unavailable(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(signer.time, "monotonic", lambda: now[0])
+    db = FakeSupabase()
+    keyless = seed_instructor(db, None)
+    keys = IssuerKeyCache(lambda: db, ttl=60)
+    with pytest.raises(SigningKeyUnavailable):
+        keys.account(keyless)
+    issuer_id, wallet = keys.create_ephemeral()
+    assert issuer_id.startswith(signer.EPHEMERAL_PREFIX) and keys.account(issuer_id).address == wallet
+    now[0] += 61
+    with pytest.raises(SigningKeyUnavailable):
+        keys.account(issuer_id)
+
+
+def test_sign_batch_reports_each_request_separately():
+    db = FakeSupabase()
+    issuer_id = seed_instructor(db, fixtures.ISSUER_PRIVATE_KEY)
+    keyless = seed_instructor(db, None)
+    keys = IssuerKeyCache(lambda: db)
+    ok, unavailable = sign_batch(keys, [(issuer_id, "hello"), (keyless, "hello")])
+    assert ok[0] == "ok" and ok[2] == ISSUER_WALLET
+    assert verify_signature("hello", ok[1], ISSUER_WALLET)
+    assert unavailable[0] == "unavailable"
+    assert unpack_result(ok) == (ok[1], ISSUER_WALLET)
+    with pytest.raises(SigningKeyUnavailable):
+        unpack_result(unavailable)
+    with pytest.raises(SigningError):
+        unpack_result(("error", "RuntimeError: boom", ""))
+
+
+def test_local_signer_signs_verifiable_messages():
+    db = FakeSupabase()
+    issuer_id = seed_instructor(db, fixtures.ISSUER_PRIVATE_KEY)
+    local = LocalSigner(IssuerKeyCache(lambda: db))
+
+    async def run():
+        signature = await local.sign(issuer_id, "certificate payload")
+        ephemeral_id, ephemeral_wallet = await local.create_ephemeral_issuer()
+        ephemeral = await local.sign(ephemeral_id, "certificate payload")
+        return signature, ephemeral, ephemeral_wallet
+
+    signature, ephemeral, ephemeral_wallet = asyncio.run(run())
+    assert signature.wallet == ISSUER_WALLET
+    assert verify_signature("certificate payload", signature.signature, ISSUER_WALLET)
+    assert ephemeral.wallet == ephemeral_wallet
+    assert verify_signature("certificate payload", ephemeral.signature, ephemeral_wallet)
+    assert local.stats()["signed"] == 2
+
+
+def test_create_signer_picks_the_mode_from_the_environment(monkeypatch):
+    monkeypatch.setenv("SIGNER_PROCESSES", "0")
+    monkeypatch.setenv("SIGNER_KEY_TTL", "30")
+    local = create_signer(FakeSupabase)
+    assert isinstance(local, LocalSigner) and local.keys.ttl == 30
+    monkeypatch.setenv("SIGNER_PROCESSES", "2")
+    monkeypatch.setenv("SIGNER_MAX_BATCH", "8")
+    pooled = create_signer(FakeSupabase)
+    assert isinstance(pooled, ProcessSigner)
+    assert (len(pooled.workers), pooled.max_batch, pooled.key_ttl) == (2, 8, 30)
+
+
+def test_process_signer_batches_ephemeral_keys_to_their_process():
+    pool = ProcessSigner(2, max_batch=4)
+
+    async def run():
+        await pool.start()
+        try:
+            issuers = [await pool.create_ephemeral_issuer() for _ in range(2)]
+            requests = [(issuer_id, wallet, f"message {n}") for n in range(10) for issuer_id, wallet in issuers]
+            signatures = await asyncio.gather(*(pool.sign(issuer_id, message) for issuer_id, _, message in requests))
+            with pytest.raises(SigningKeyUnavailable):
+                await pool.sign(f"{signer.EPHEMERAL_PREFIX}0:0xunknown", "message")
+            return requests, signatures
+        finally:
+            await pool.stop()
+
+    requests, signatures = asyncio.run(run())
+    for (_, wallet, message), signature in zip(requests, signatures):
+        assert signature.wallet == wallet
+        assert verify_signature(message, signature.signature, wallet)
+    assert pool.signed == 20 and pool.batches >= 5
+    assert pool.stats()["alive"] == 0
@@ -0,0 +1,125 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+import requests
+from fastapi import HTTPException
+
+import fixtures
+import server
+from fake_services import FakeSupabase
+from template_ingest import (
+    ASSET_VERSION, TemplateImageError, asset_is_current, compute_field_layout, fields_digest, ingest_template,
+    normalize_image, render_asset,
+)
+
+FIELDS = [
+    {"type": "text", "label": "Recipient Name", "x": 200, "y": 200, "width": 400, "height": 60,
+     "text_align": "left", "wrap": True, "max_lines": 2},
+    {"type": "qr", "label": "QR Code", "x": 650, "y": 400, "width": 100, "height": 100},
+]
+
+
+def png(mode: str, color) -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new(mode, (400, 280), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_layout_scales_design_boxes_and_copies_text_options():
+    layout = compute_field_layout(FIELDS, (1600, 1120))
+    text, qr = layout
+    assert (text["x"], text["y"], text["width"], text["height"]) == (400, 400, 800, 120)
+    assert text["font_size"] == 72
+    assert (text["align"], text["wrap"], text["max_lines"]) == ("left", True, 2)
+    assert "valign" not in text
+    assert (qr["type"], qr["width"]) == ("qr", 200)
+
+
+def test_fields_digest_ignores_order_but_not_geometry_or_options():
+    assert fields_digest(FIELDS) == fields_digest(list(reversed(FIELDS)))
+    moved = [{**FIELDS[0], "x": 201}, FIELDS[1]]
+    restyled = [{**FIELDS[0], "max_font_size": 30}, FIELDS[1]]
+    assert len({fields_digest(FIELDS), fields_digest(moved), fields_digest(restyled)}) == 3
+
+
+def test_transparency_is_flattened_onto_white():
+    image = normalize_image(png("RGBA", (0, 0, 0, 0)), 200)
+    assert image.mode == "RGB"
+    assert image.size == (200, 140)
+    assert image.getpixel((100, 70)) == (255, 255, 255)
+
+
+def test_unreadable_upload_is_a_template_image_error():
+    with pytest.raises(TemplateImageError):
+        normalize_image(b"%PDF-1.4 not an image", 200)
+
+
+def test_asset_is_stale_after_field_or_source_changes():
+    ingested = ingest_template(png("RGB", (250, 247, 240)), FIELDS, 800)
+    asset = render_asset(ingested, "https://cdn/base.jpg", "https://cdn/source.png", FIELDS)
+    assert asset["version"] == ASSET_VERSION
+    assert asset_is_current(asset, "https://cdn/source.png", FIELDS)
+    assert not asset_is_current(asset, "https://cdn/other.png", FIELDS)
+    assert not asset_is_current(asset, "https://cdn/source.png", FIELDS[:1])
+    assert not asset_is_current(None, "https://cdn/source.png", FIELDS)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(server, "supabase", db)
+    return db
+
+
+def seed_template(db, source_url: str) -> dict:
+    server.template_image_cache.set(source_url, fixtures.make_template(800, 560))
+    return db.seed("certificate_templates", [{"pdf_url": source_url, "render_assets": None}])[0]
+
+
+def test_ingestion_keeps_a_profile_stored_concurrently(db):
+    template = seed_template(db, "https://cdn/merge-source.png")
+    stale_copy = dict(template)
+    # Another worker stores the print asset after this request read the template
+    print_asset = {"url": "https://cdn/print.jpg", "version": ASSET_VERSION}
+    db.rpc("merge_template_render_assets", {"template_id": template["id"], "assets": {"print": print_asset}}).execute()
+
+    assets = server.ingest_template_record(stale_copy, FIELDS, ("standard",))
+
+    stored = db.tables["certificate_templates"][0]["render_assets"]
+    assert set(stored) == {"standard", "print"}
+    assert stored["print"] == print_asset
+    assert assets == stored == stale_copy["render_assets"]
+
+
+class FakeResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.content = b""
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+
+@pytest.mark.parametrize("outcome, status", [
+    (FakeResponse(404), 400),
+    (FakeResponse(403), 400),
+    (FakeResponse(503), 502),
+    (requests.ConnectionError("connection refused"), 502),
+    (requests.Timeout("read timed out"), 502),
+])
+def test_ingest_endpoint_maps_unreachable_sources(db, monkeypatch, outcome, status):
+    template = db.seed("certificate_templates", [{"pdf_url": f"https://cdn/missing-{status}-{id(outcome)}.png"}])[0]
+
+    def fake_get(url, timeout):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(server.ingest_certificate_template(template["id"]))
+    assert raised.value.status_code == status
@@ -0,0 +1,102 @@
+import pytest
+
+from text_layout import ELLIPSIS, FIT_MARGIN, REFERENCE_SIZE, TextLayoutEngine
+
+
+class MonospaceFont:
+    """Every glyph is half the font size wide; lines are exactly the font size tall"""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def getmetrics(self):
+        return int(self.size * 0.8), int(self.size * 0.2)
+
+    def getlength(self, text: str) -> float:
+        return len(text) * self.size / 2
+
+
+@pytest.fixture
+def engine():
+    return TextLayoutEngine(MonospaceFont)
+
+
+def box(**options):
+    return {"x": 10, "y": 20, "width": 100, "height": 50, **options}
+
+
+def test_single_line_takes_the_largest_size_that_fits(engine):
+    fitted = engine.fit("Hello", box(font_size=40))
+    # 5 glyphs of 0.5 units fit 97 px up to size 38
+    assert fitted.font_size == 38 and not fitted.truncated
+    assert [line for line, _, _ in fitted.lines] == ["Hello"]
+    assert engine.fit("Hi", box(font_size=20)).font_size == 20
+
+
+@pytest.mark.parametrize("align, valign, position", [
+    ("left", "top", (10, 20)),
+    ("right", "bottom", (15, 32)),
+    ("center", "middle", (12, 26)),
+])
+def test_alignment(engine, align, valign, position):
+    fitted = engine.fit("Hello", box(font_size=40, align=align, valign=valign))
+    assert fitted.lines == [("Hello", *position)]
+
+
+def test_wrapping_prefers_more_lines_at_a_larger_size(engine):
+    text = "aaaa bbbb cccc"
+    assert engine.fit(text, box(height=100, font_size=60)).font_size == 13
+    fitted = engine.fit(text, box(height=100, font_size=60, wrap=True, valign="top"))
+    assert fitted.font_size == 30
+    assert [line for line, _, _ in fitted.lines] == ["aaaa", "bbbb", "cccc"]
+    assert [y for _, _, y in fitted.lines] == [20, 54, 89]
+
+
+def test_wrapping_respects_max_lines(engine):
+    fitted = engine.fit("aaaa bbbb cccc", box(height=100, font_size=60, wrap=True, max_lines=2))
+    assert fitted.font_size == 21
+    assert [line for line, _, _ in fitted.lines] == ["aaaa bbbb", "cccc"]
+
+
+def test_overflowing_line_is_ellipsized_at_the_minimum_size(engine):
+    text = "x" * 40
+    fitted = engine.fit(text, box(height=20, font_size=20, min_font_size=12))
+    assert fitted.font_size == 12 and fitted.truncated
+    assert fitted.lines[0][0] == "x" * 15 + ELLIPSIS
+
+    overflowing = engine.fit(text, box(height=20, font_size=20, min_font_size=12, ellipsize=False))
+    assert overflowing.font_size == 12 and not overflowing.truncated
+    assert overflowing.lines[0][0] == text
+
+
+def test_overflowing_wrap_keeps_the_lines_that_fit(engine):
+    text = " ".join(["word"] * 30)
+    fitted = engine.fit(text, box(height=40, font_size=20, min_font_size=12, wrap=True, max_lines=2))
+    lines = [line for line, _, _ in fitted.lines]
+    assert fitted.font_size == 12 and fitted.truncated
+    assert len(lines) == 2 and lines[-1].endswith(ELLIPSIS)
+    assert all(engine.metrics.units(line) * 12 <= 100 * FIT_MARGIN for line in lines)
+
+
+def test_glyph_advances_are_measured_once():
+    loaded = []
+    counting = TextLayoutEngine(lambda size: loaded.append(size) or MonospaceFont(size))
+    counting.fit("Hello", box())
+    counting.fit("Hello world", box(wrap=True))
+    assert loaded == [REFERENCE_SIZE]
+
+
+def test_fitted_text_fits_the_box_with_the_certificate_font():
+    from PIL import Image, ImageDraw, ImageFont
+
+    import server
+    if not isinstance(server.load_font(REFERENCE_SIZE), ImageFont.FreeTypeFont):
+        pytest.skip("no TrueType certificate font installed")
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    field = {"x": 0, "y": 0, "width": 420, "height": 90, "font_size": 64, "wrap": True, "max_lines": 2}
+    fitted = server.text_layout.fit("Certificate of Advanced Distributed Systems Engineering", field)
+    assert not fitted.truncated and len(fitted.lines) == 2
+    font = server.load_font(fitted.font_size)
+    for line, x, y in fitted.lines:
+        left, _, right, _ = draw.textbbox((x, y), line, font=font)
+        assert left >= field["x"] - 1 and right <= field["x"] + field["width"] + 1
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from eth_account import Account
+
+import verify_offline
+from crypto_utils import create_canonical_payload, hash_message, sign_message
+from verification_bundle import build_bundle, bundle_signing_message, verify_bundle, verify_certificate_offline
+
+ISSUER_KEY = "0x" + "4c" * 32
+FORGER_KEY = "0x" + "7d" * 32
+ISSUER_WALLET = Account.from_key(ISSUER_KEY).address
+FORGER_WALLET = Account.from_key(FORGER_KEY).address
+
+
+def signed_certificate(private_key: str, wallet: str, certificate_id: str = "CERT-01JAB3ZK4M9X7E2Q5R8T1V6W3Y"):
+    payload = create_canonical_payload({
+        "certificateId": certificate_id,
+        "recipientName": "Ada Lovelace",
+        "courseName": "Analytical Engines",
+        "issuerWallet": wallet,
+    })
+    return payload, {
+        "certificate_id": certificate_id,
+        "certificate_hash": hash_message(payload),
+        "issuer_signature": sign_message(payload, private_key),
+        "status": "minted",
+    }
+
+
+def signed_bundle(private_key: str, wallet: str, certificates):
+    bundle = build_bundle("group", "group-1", wallet, certificates)
+    bundle["bundle_signature"] = sign_message(bundle_signing_message(bundle), private_key)
+    return bundle
+
+
+def run_cli(monkeypatch, tmp_path, bundle, payload, *extra):
+    bundle_path, payload_path = tmp_path / "bundle.json", tmp_path / "payload.json"
+    bundle_path.write_text(json.dumps(bundle))
+    payload_path.write_text(payload)
+    monkeypatch.setattr("sys.argv", ["verify_offline.py", str(bundle_path), str(payload_path), *extra])
+    return verify_offline.main()
+
+
+def test_genuine_certificate_verifies():
+    payload, cert = signed_certificate(ISSUER_KEY, ISSUER_WALLET)
+    bundle = signed_bundle(ISSUER_KEY, ISSUER_WALLET, [cert])
+    assert verify_bundle(bundle, trusted_issuer=ISSUER_WALLET)
+    result = verify_certificate_offline(bundle, payload)
+    assert result["verified"] and result["status"] == "minted"
+
+
+def test_tampered_payload_is_not_in_bundle():
+    payload, cert = signed_certificate(ISSUER_KEY, ISSUER_WALLET)
+    bundle = signed_bundle(ISSUER_KEY, ISSUER_WALLET, [cert])
+    result = verify_certificate_offline(bundle, payload.replace("Ada", "Eve"))
+    assert not result["verified"]
+
+
+def test_bundle_from_another_issuer_is_rejected():
+    _, cert = signed_certificate(FORGER_KEY, FORGER_WALLET)
+    forged = signed_bundle(FORGER_KEY, FORGER_WALLET, [cert])
+    assert verify_bundle(forged)
+    assert not verify_bundle(forged, trusted_issuer=ISSUER_WALLET)
+
+
+def test_cli_exit_codes(monkeypatch, tmp_path, capsys):
+    payload, cert = signed_certificate(ISSUER_KEY, ISSUER_WALLET)
+    bundle = signed_bundle(ISSUER_KEY, ISSUER_WALLET, [cert])
+    assert run_cli(monkeypatch, tmp_path, bundle, payload, "--issuer", ISSUER_WALLET) == 0
+    assert "✅ VERIFIED" in capsys.readouterr().out
+    assert run_cli(monkeypatch, tmp_path, bundle, payload.replace("Ada", "Eve"), "--issuer", ISSUER_WALLET) == 1
+
+
+@pytest.mark.parametrize("issuer_args", [[], ["--issuer", ISSUER_WALLET]])
+def test_cli_never_verifies_a_self_signed_forgery(monkeypatch, tmp_path, capsys, issuer_args):
+    payload, cert = signed_certificate(FORGER_KEY, FORGER_WALLET)
+    forged = signed_bundle(FORGER_KEY, FORGER_WALLET, [cert])
+    status = run_cli(monkeypatch, tmp_path, forged, payload, *issuer_args)
+    output = capsys.readouterr().out
+    assert status != 0
+    if not issuer_args:
+        assert "ISSUER NOT PINNED" in output
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import fixtures
+import server
+from cache import TieredCache
+from crypto_utils import create_canonical_payload, hash_message, sign_message
+from fake_services import FakeSupabase
+
+
+@pytest.fixture
+def cert(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(server, "supabase", db)
+    monkeypatch.setattr(server, "verification_response_cache", TieredCache("verify", None))
+    return db.seed("certificates", [fixtures.certificate_row(create_canonical_payload, hash_message, sign_message)])[0]
+
+
+def verify(certificate_id: str, **params) -> dict:
+    response = asyncio.run(server.verify_certificate(certificate_id, **params))
+    return json.loads(response.body)
+
+
+def test_compact_view_summarizes_the_checks(cert):
+    compact = verify(cert["certificate_id"], view="compact")
+    assert compact == {
+        "verified": True,
+        "trustScore": 100,
+        "certificateId": cert["certificate_id"],
+        "status": "minted",
+        "revoked": False,
+        "recipient": fixtures.FIELD_DATA["Recipient Name"],
+        "course": fixtures.FIELD_DATA["Course Name"],
+        "issuer": "Benchmark Instructor",
+        "issuedAt": "2026-01-15",
+        "checks": {"dataIntegrity": True, "issuerSignature": True, "blockchainNFT": True},
+    }
+
+
+def test_fields_keep_only_the_requested_sections(cert):
+    full = verify(cert["certificate_id"])
+    projected = verify(cert["certificate_id"], fields="blockchain, verification")
+    assert list(projected) == ["blockchain", "verification"]
+    assert projected == {key: full[key] for key in ("blockchain", "verification")}
+
+
+def test_projection_selects_only_the_columns_it_needs():
+    columns = server.verify_select_columns(["blockchain"]).split(", ")
+    assert columns == server.VERIFY_CORE_COLUMNS + ["contract_address", "token_id", "blockchain_tx"]
+    assert "ipfs_url" in server.verify_select_columns().split(", ")
+
+
+@pytest.mark.parametrize("params", [{"view": "summary"}, {"fields": "verified,secrets"}])
+def test_unknown_views_and_fields_are_rejected(cert, params):
+    with pytest.raises(HTTPException) as error:
+        verify(cert["certificate_id"], **params)
+    assert error.value.status_code == 400
+
+
+def test_each_view_is_cached_separately(cert):
+    compact = verify(cert["certificate_id"], view="compact")
+    full = verify(cert["certificate_id"])
+    assert "certificate" in full and "certificate" not in compact
+    assert verify(cert["certificate_id"], view="compact") == compact
+    assert set(server.verification_response_cache.get(cert["certificate_id"])) == {"verify", "verify:compact"}
+
+
+def test_unknown_certificate_is_not_verified(cert):
+    assert verify("CERT-MISSING", view="compact") == {"verified": False, "message": "Certificate not found"}
@@ -0,0 +1,211 @@
+"""
+Text layout for template fields: auto-fit, wrapping, ellipsis and alignment
+
+Fitting a value to its field box means trying font sizes, and measuring text
+with ImageDraw.textbbox at every candidate size costs a FreeType layout each
+time. Instead, FontMetrics measures each glyph's advance once, at
+REFERENCE_SIZE, and scales linearly: at size s a string is
+sum(advances) * s / REFERENCE_SIZE wide. That ignores hinting and kerning,
+which stay within about 2% for the certificate fonts, so fitting keeps
+FIT_MARGIN of the box width in reserve.
+
+TextLayoutEngine.fit() binary-searches the largest font size between a
+field's min and max at which the value fits: on one line, or greedily wrapped
+within max_lines and the box height. When even the minimum size overflows, it
+ellipsizes (if enabled) and otherwise lets the text run over. Per field that
+is a few dozen dict lookups and no FreeType calls once the glyphs are cached.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+REFERENCE_SIZE = 256
+FIT_MARGIN = 0.97
+LINE_SPACING = 1.15
+ELLIPSIS = "…"
+
+ALIGNMENTS = ("left", "center", "right")
+VERTICAL_ALIGNMENTS = ("top", "middle", "bottom")
+
+
+class FittedText(NamedTuple):
+    font_size: int
+    # (text, x, y) per line; y is the top of the line (PIL's default "la" anchor)
+    lines: List[Tuple[str, int, int]]
+    truncated: bool
+
+
+class FontMetrics:
+    """Glyph advances and vertical metrics of one font, per pixel of font size"""
+
+    def __init__(self, font):
+        self.font = font
+        ascent, descent = font.getmetrics()
+        self.line_units = (ascent + descent) / REFERENCE_SIZE
+        self._advances: Dict[str, float] = {}
+
+    def units(self, text: str) -> float:
+        """Width of `text` at font size 1"""
+        advances = self._advances
+        total = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = self.font.getlength(char) / REFERENCE_SIZE
+            total += advance
+        return total
+
+    def line_height(self, size: int) -> float:
+        return self.line_units * size
+
+
+def _wrap(words: List[str], word_units: List[float], space_units: float, limit: float) -> Optional[List[List[int]]]:
+    """Greedy wrap of word indexes into lines `limit` units wide; None if a single word is wider"""
+    lines: List[List[int]] = []
+    current: List[int] = []
+    width = 0.0
+    for index, units in enumerate(word_units):
+        if units > limit:
+            return None
+        if current and width + space_units + units <= limit:
+            current.append(index)
+            width += space_units + units
+        else:
+            if current:
+                lines.append(current)
+            current, width = [index], units
+    if current:
+        lines.append(current)
+    return lines
+
+
+class TextLayoutEngine:
+    def __init__(self, font_loader: Callable[[int], object]):
+        """`font_loader(size)` returns the (cached) font at `size`"""
+        self.font_loader = font_loader
+        self._metrics: Optional[FontMetrics] = None
+
+    @property
+    def metrics(self) -> FontMetrics:
+        if self._metrics is None:
+            self._metrics = FontMetrics(self.font_loader(REFERENCE_SIZE))
+        return self._metrics
+
+    def _ellipsize(self, text: str, limit: float) -> str:
+        """Longest prefix of `text` that fits `limit` units with an ellipsis appended"""
+        metrics = self.metrics
+        if metrics.units(text) <= limit:
+            return text
+        budget = limit - metrics.units(ELLIPSIS)
+        width = 0.0
+        for index, char in enumerate(text):
+            width += metrics.units(char)
+            if width > budget:
+                return text[:index].rstrip() + ELLIPSIS
+        return text + ELLIPSIS
+
+    def block_height(self, line_count: int, size: int) -> float:
+        return self.metrics.line_height(size) * (1 + (line_count - 1) * LINE_SPACING)
+
+    def fit(self, text: str, box: Dict) -> FittedText:
+        """Lay out `text` in a layout box (x, y, width, height and the text options of the field)"""
+        metrics = self.metrics
+        box_width = box["width"] * FIT_MARGIN
+        box_height = box["height"]
+        max_size = box.get("font_size") or max(12, int(box_height * 0.6))
+        min_size = min(box.get("min_font_size") or 12, max_size)
+        wrap = bool(box.get("wrap"))
+        max_lines = box.get("max_lines") or 0
+        ellipsize = box.get("ellipsize", True) is not False
+
+        words = text.split() if wrap else []
+        wrap = len(words) > 1
+        word_units = [metrics.units(word) for word in words]
+        space_units = metrics.units(" ")
+        text_units = metrics.units(text)
+
+        def lines_at(size: int) -> Optional[List[str]]:
+            """The lines of `text` at `size`, or None if they do not fit the box"""
+            limit = box_width / size
+            if not wrap:
+                return [text] if text_units <= limit and metrics.line_height(size) <= box_height else None
+            wrapped = _wrap(words, word_units, space_units, limit)
+            if wrapped is None or (max_lines and len(wrapped) > max_lines) \
+                    or self.block_height(len(wrapped), size) > box_height:
+                return None
+            return [" ".join(words[i] for i in line) for line in wrapped]
+
+        low, high, best = min_size, max_size, None
+        while low <= high:
+            size = (low + high) // 2
+            lines = lines_at(size)
+            if lines is not None:
+                best, low = (size, lines), size + 1
+            else:
+                high = size - 1
+
+        truncated = False
+        if best is None:
+            # Nothing fits, even at the minimum size
+            size, limit = min_size, box_width / min_size
+            if wrap:
+                lines, truncated = self._overflow_lines(words, limit, size, box_height, max_lines, ellipsize)
+            elif ellipsize:
+                lines = [self._ellipsize(text, limit)]
+                truncated = lines[0] != text
+            else:
+                lines = [text]
+            best = (size, lines)
+
+        size, lines = best
+        return FittedText(size, self._position(lines, size, box), truncated)
+
+    def _overflow_lines(self, words: List[str], limit: float, size: int, box_height: float,
+                        max_lines: int, ellipsize: bool) -> Tuple[List[str], bool]:
+        """Wrap at the minimum size; with `ellipsize`, cut to the lines that fit and mark the cut with an ellipsis"""
+        metrics = self.metrics
+        lines: List[str] = []
+        current = ""
+        for word in words:
+            candidate = f"{current} {word}" if current else word
+            if current and metrics.units(candidate) > limit:
+                lines.append(current)
+                candidate = word
+            current = candidate
+        lines.append(current)
+        if not ellipsize:
+            return lines, False
+
+        allowed = 1
+        while allowed < len(lines) and self.block_height(allowed + 1, size) <= box_height:
+            allowed += 1
+        if max_lines:
+            allowed = min(allowed, max_lines)
+        fitted = [self._ellipsize(line, limit) for line in lines[:allowed]]
+        if len(lines) > allowed and not fitted[-1].endswith(ELLIPSIS):
+            fitted[-1] = self._ellipsize(fitted[-1] + ELLIPSIS, limit)
+        return fitted, fitted != lines
+
+    def _position(self, lines: List[str], size: int, box: Dict) -> List[Tuple[str, int, int]]:
+        metrics = self.metrics
+        step = metrics.line_height(size) * LINE_SPACING
+        block_height = self.block_height(len(lines), size)
+
+        valign = box.get("valign") or "middle"
+        if valign == "top":
+            top = box["y"]
+        elif valign == "bottom":
+            top = box["y"] + box["height"] - block_height
+        else:
+            top = box["y"] + (box["height"] - block_height) / 2
+
+        align = box.get("align") or "center"
+        positioned = []
+        for index, line in enumerate(lines):
+            width = metrics.units(line) * size
+            if align == "left":
+                x = box["x"]
+            elif align == "right":
+                x = box["x"] + box["width"] - width
+            else:
+                x = box["x"] + (box["width"] - width) / 2
+            positioned.append((line, int(round(x)), int(round(top + index * step))))
+        return positioned
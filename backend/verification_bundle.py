@@ -0,0 +1,103 @@
+"""
+Signed offline verification bundles
+
+A bundle is a compact index of certificate_hash -> [certificate_id, issuer
+wallet, issuer signature, status] for one group or issuer, signed with the
+issuing instructor's key. build_bundle() sets bundle_hash; the caller adds
+bundle_signature over bundle_signing_message() through the issuer signer.
+Anyone holding a bundle can verify a certificate payload locally with the same
+canonical payload / hash / signature logic the API uses, without calling the API.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from crypto_utils import canonical_payload_candidates, hash_message, verify_signature
+
+BUNDLE_VERSION = 1
+
+# Positions inside an entry array
+ENTRY_CERTIFICATE_ID = 0
+ENTRY_ISSUER_WALLET = 1
+ENTRY_SIGNATURE = 2
+ENTRY_STATUS = 3
+
+
+def bundle_signing_message(bundle: Dict[str, Any]) -> str:
+    """The exact string the bundle signature covers (everything but the signature fields)"""
+    body = {key: value for key, value in bundle.items() if key not in ("bundle_hash", "bundle_signature")}
+    return json.dumps(body, sort_keys=True, separators=(",", ":"))
+
+
+def build_bundle(
+    scope_type: str,
+    scope_id: str,
+    issuer_wallet: str,
+    certificates: Iterable[Dict[str, Any]],
+) -> Dict[str, Any]:
+    entries = {}
+    for cert in certificates:
+        if not cert.get("certificate_hash"):
+            continue
+        entries[cert["certificate_hash"]] = [
+            cert.get("certificate_id", ""),
+            cert.get("issuer_wallet") or issuer_wallet,
+            cert.get("issuer_signature", ""),
+            cert.get("status", ""),
+        ]
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "scope": {"type": scope_type, "id": scope_id},
+        "issuer_wallet": issuer_wallet,
+        "generated_at": datetime.utcnow().isoformat(),
+        "entries": entries,
+    }
+    bundle["bundle_hash"] = hash_message(bundle_signing_message(bundle))
+    return bundle
+
+
+def verify_bundle(bundle: Dict[str, Any], trusted_issuer: Optional[str] = None) -> bool:
+    """Check the bundle signature, and optionally that it was signed by `trusted_issuer`"""
+    if bundle.get("version") != BUNDLE_VERSION:
+        return False
+    issuer_wallet = bundle.get("issuer_wallet", "")
+    if trusted_issuer and issuer_wallet.lower() != trusted_issuer.lower():
+        return False
+    message = bundle_signing_message(bundle)
+    return hash_message(message) == bundle.get("bundle_hash") and verify_signature(
+        message, bundle.get("bundle_signature", ""), issuer_wallet
+    )
+
+
+def verify_certificate_offline(bundle: Dict[str, Any], payload: Any) -> Dict[str, Any]:
+    """
+    Verify a certificate payload (the canonical JSON string, or the payload dict)
+    against a bundle that has already passed verify_bundle()
+    """
+    entries = bundle.get("entries", {})
+    # A dict may come from a certificate signed over the current or the legacy encoding
+    for canonical_payload in [payload] if isinstance(payload, str) else canonical_payload_candidates(payload):
+        certificate_hash = hash_message(canonical_payload)
+        if certificate_hash in entries:
+            break
+    payload_data = json.loads(canonical_payload)
+
+    entry = entries.get(certificate_hash)
+    if entry is None:
+        return {"verified": False, "certificateHash": certificate_hash, "reason": "Certificate not in bundle (unknown or tampered)"}
+
+    issuer_wallet = entry[ENTRY_ISSUER_WALLET]
+    wallet_matches = (payload_data.get("issuerWallet") or "").lower() == issuer_wallet.lower()
+    signature_valid = wallet_matches and verify_signature(canonical_payload, entry[ENTRY_SIGNATURE], issuer_wallet)
+    status = entry[ENTRY_STATUS]
+    revoked = status == "revoked"
+
+    return {
+        "verified": signature_valid and not revoked,
+        "certificateId": entry[ENTRY_CERTIFICATE_ID],
+        "certificateHash": certificate_hash,
+        "issuerWallet": issuer_wallet,
+        "signatureValid": signature_valid,
+        "status": status,
+        "reason": "Revoked" if revoked else ("" if signature_valid else "Issuer signature does not match"),
+    }
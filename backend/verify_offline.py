@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Verify CertiChain certificates locally against a signed verification bundle
+
+Usage:
+    python verify_offline.py bundle.json payload.json --issuer 0xWALLET
+
+`bundle.json` comes from GET /api/groups/{group_id}/verification-bundle (or the
+instructor variant). `payload.json` is the certificate's canonical payload, as
+found in the NFT's "Canonical Payload" attribute or the export archive.
+
+`--issuer` is the instructor wallet you trust, obtained out of band (e.g. from
+the issuing institution). A bundle only proves that whoever signed it vouches
+for its certificates, and anyone can sign a bundle with their own key, so
+without `--issuer` the result is printed with an "issuer not pinned" warning
+and the exit status is 3, never 0.
+"""
+import argparse
+import json
+import sys
+
+from verification_bundle import verify_bundle, verify_certificate_offline
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verify a certificate without calling the CertiChain API")
+    parser.add_argument("bundle", help="Path to the verification bundle JSON")
+    parser.add_argument("payload", help="Path to the certificate canonical payload JSON")
+    parser.add_argument("--issuer", help="Issuer wallet to trust (required for a successful exit status)")
+    args = parser.parse_args()
+
+    with open(args.bundle) as f:
+        bundle = json.load(f)
+    with open(args.payload) as f:
+        raw_payload = f.read().strip()
+
+    if not verify_bundle(bundle, trusted_issuer=args.issuer):
+        print("❌ Bundle signature is invalid or not from the trusted issuer")
+        return 2
+
+    # Use the file text as-is when it is already the canonical string
+    try:
+        payload = json.loads(raw_payload)
+        if isinstance(payload, dict) and "canonical_payload" in payload:
+            payload = payload["canonical_payload"]
+    except json.JSONDecodeError:
+        print("❌ Payload file is not valid JSON")
+        return 2
+
+    result = verify_certificate_offline(bundle, payload)
+    print(json.dumps(result, indent=2))
+    if not args.issuer:
+        print(f"⚠️  ISSUER NOT PINNED: the bundle is self-signed by {bundle.get('issuer_wallet', '')}, "
+              "which proves nothing about who issued it. Re-run with --issuer <trusted wallet>.")
+        return 3
+    if result["verified"]:
+        print(f"✅ VERIFIED: {result['certificateId']} (signed by {result['issuerWallet']})")
+        return 0
+    print(f"❌ NOT VERIFIED: {result['reason']}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())